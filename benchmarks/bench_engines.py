@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Compara o Grupo B no engine de threads (requests + ThreadPoolExecutor) com
+o engine async (aiohttp, um event loop) contra o servidor mock local.
+
+    python benchmarks/bench_engines.py --parents 2000 --latency 0.05 \
+        --threads 8,32 --async 64,256,1024
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from betha_extractor.async_client import AsyncHttpClient
+from betha_extractor.endpoints import build_group_b_jobs
+from betha_extractor.extractors.group_b import GroupBExtractor
+from betha_extractor.http_client import HttpClient
+from betha_extractor.mock_server import MockConfig, start_in_thread
+
+
+def _ints(raw: str) -> List[int]:
+    return [int(x) for x in raw.split(",") if x.strip()]
+
+
+def _bench(engine: str, concurrency: int, base_url: str, a_data: Dict[str, List[dict]]) -> dict:
+    jobs = list(build_group_b_jobs(base_url, a_data))
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp)
+        if engine == "threads":
+            client = HttpClient(base_url, "mock", "mock", timeout=30, max_in_flight=0)
+            gb = GroupBExtractor(client, out, 50, concurrency)
+            t0 = time.perf_counter()
+            res = gb.run_jobs(jobs, total_jobs=len(jobs))
+        else:
+            aclient = AsyncHttpClient(base_url, "mock", "mock", timeout=30)
+            gb = GroupBExtractor(None, out, 50, concurrency)
+            t0 = time.perf_counter()
+            res = gb.run_async(aclient, a_data, base_url)
+        elapsed = time.perf_counter() - t0
+    rows = sum(r.count for r in res.values())
+    return {
+        "engine": engine,
+        "concurrency": concurrency,
+        "jobs": len(jobs),
+        "rows": rows,
+        "seconds": round(elapsed, 3),
+        "jobs_per_s": round(len(jobs) / elapsed, 1) if elapsed else None,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--parents", type=int, default=1000, help="imóveis e contribuintes sintéticos")
+    ap.add_argument("--latency", type=float, default=0.05, help="latência do mock por request (s)")
+    ap.add_argument("--threads", type=_ints, default=[8, 32], help="concorrências do engine threads")
+    ap.add_argument("--async", dest="async_", type=_ints, default=[64, 256], help="concorrências do engine async")
+    ap.add_argument("--json", action="store_true", help="saída em JSON (uma linha por cenário)")
+    args = ap.parse_args()
+
+    sizes = {"imoveis": args.parents, "contribuintes": args.parents}
+    server, base_url = start_in_thread(MockConfig(sizes=sizes, latency=args.latency))
+    a_data = {k: [{"id": i + 1} for i in range(n)] for k, n in sizes.items()}
+    try:
+        results = [_bench("threads", c, base_url, a_data) for c in args.threads]
+        results += [_bench("async", c, base_url, a_data) for c in args.async_]
+    finally:
+        server.shutdown()
+
+    if args.json:
+        for r in results:
+            print(json.dumps(r))
+        return
+    print(f"{'engine':<8} {'conc':>6} {'jobs':>7} {'rows':>8} {'seg':>8} {'jobs/s':>9}")
+    for r in results:
+        print(f"{r['engine']:<8} {r['concurrency']:>6} {r['jobs']:>7} {r['rows']:>8} {r['seconds']:>8} {r['jobs_per_s']:>9}")
+
+
+if __name__ == "__main__":
+    main()
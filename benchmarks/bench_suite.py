@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""Suíte de benchmarks com fixtures locais (mock + dados sintéticos): cada
+cenário roda num subprocesso próprio, para o pico de RSS ser só dele, e o
+resultado sai em JSON para comparar execuções ao longo do tempo.
+
+    python benchmarks/bench_suite.py --out bench.json
+    python benchmarks/bench_suite.py --only dedupe,writers --rows 1000000
+    python benchmarks/bench_suite.py --out novo.json --compare bench.json
+
+Cenários: pagination (next_page_state puro), group_a (páginas/s contra o
+mock), group_b (jobs/s por concorrência e --post-workers), dedupe
+(registros/s), writers
+(MB/s gravados e registros/s por formato; no parquet, compare registros/s)
+e json (decode de páginas e encode de registros por backend instalado).
+`--json-backend` fixa o backend dos demais cenários.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List
+
+from betha_extractor import audit, jsonlib
+from betha_extractor.dedupe import Deduper
+from betha_extractor.endpoints import build_group_b_jobs
+from betha_extractor.extractors.group_a import GroupAExtractor
+from betha_extractor.extractors.group_b import GroupBExtractor
+from betha_extractor.http_client import HttpClient
+from betha_extractor.mock_server import MockConfig, start_in_thread
+from betha_extractor.pagination import next_page_state
+from betha_extractor.writers import FORMATS, NO_COMPRESSION, Compression, open_sink, require_format, write_json
+
+SCENARIOS = ("pagination", "group_a", "group_b", "dedupe", "writers", "json")
+CHUNK = 10_000
+
+
+def _ints(raw: str) -> List[int]:
+    return [int(x) for x in raw.split(",") if x.strip()]
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KiB; macOS, bytes
+    return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+def _record(i: int) -> dict:
+    return {
+        "id": i,
+        "codigo": f"IMO-{i:07d}",
+        "descricao": f"imovel {i}",
+        "situacao": "ATIVO" if i % 7 else "INATIVO",
+        "endereco": {"logradouro": f"Rua {i % 97}", "numero": str(i % 1000)},
+    }
+
+
+def _rows(n: int) -> Iterator[List[dict]]:
+    """Registros sintéticos em blocos de CHUNK (gerados fora da medição);
+    ~1/4 repetidos, para o dedupe ter o que descartar."""
+    distinct = max(1, n * 3 // 4)
+    for start in range(0, n, CHUNK):
+        yield [_record(i % distinct + 1) for i in range(start, min(n, start + CHUNK))]
+
+
+def _result(case: str, metric: str, value: float, seconds: float, **extra: Any) -> Dict[str, Any]:
+    return {"case": case, "metric": metric, "value": round(value, 1), "seconds": round(seconds, 3), **extra}
+
+
+def bench_pagination(args) -> List[Dict[str, Any]]:
+    limit = 200
+    bodies = [
+        {"content": [{"id": p * limit + i} for i in range(limit)], "hasNext": True, "totalElements": 10**9}
+        for p in range(100)
+    ]
+    pages = args.pages
+    t0 = time.perf_counter()
+    offset = page = seq = 0
+    sig = None
+    for n in range(pages):
+        _, offset, page, seq, sig, _ = next_page_state(bodies[n % len(bodies)], limit, offset, page, seq, sig)
+    elapsed = time.perf_counter() - t0
+    return [_result("next_page_state", "pages_per_s", pages / elapsed, elapsed, pages=pages)]
+
+
+def bench_group_a(args) -> List[Dict[str, Any]]:
+    sizes = {"imoveis": args.a_rows}
+    server, base_url = start_in_thread(MockConfig(sizes=sizes, latency=args.latency))
+    out = []
+    try:
+        for workers in args.page_workers:
+            with tempfile.TemporaryDirectory() as tmp:
+                client = HttpClient(base_url, "mock", "mock", timeout=30, max_in_flight=0)
+                ga = GroupAExtractor(client, Path(tmp), args.limit, page_workers=workers, fmt="jsonl")
+                pages = 0
+
+                def on_page(*_a, **_k):
+                    nonlocal pages
+                    pages += 1
+
+                t0 = time.perf_counter()
+                res = ga.run({"imoveis": "imoveis"}, progress_cb=on_page)
+                elapsed = time.perf_counter() - t0
+                audit.flush_all()
+            out.append(_result(
+                f"page_workers={workers}", "pages_per_s", pages / elapsed, elapsed,
+                pages=pages, rows=res["imoveis"].count,
+            ))
+    finally:
+        server.shutdown()
+    return out
+
+
+def bench_group_b(args) -> List[Dict[str, Any]]:
+    sizes = {"imoveis": args.parents, "contribuintes": args.parents}
+    server, base_url = start_in_thread(MockConfig(sizes=sizes, latency=args.latency))
+    a_data = {k: [{"id": i + 1} for i in range(n)] for k, n in sizes.items()}
+    total = sum(1 for _ in build_group_b_jobs(base_url, a_data))
+    out = []
+    try:
+        for conc in args.concurrency:
+            for post in args.post_workers:
+                with tempfile.TemporaryDirectory() as tmp:
+                    client = HttpClient(base_url, "mock", "mock", timeout=30, max_in_flight=0)
+                    gb = GroupBExtractor(client, Path(tmp), args.limit, conc, fmt="jsonl", post_workers=post)
+                    t0 = time.perf_counter()
+                    res = gb.run_jobs(build_group_b_jobs(base_url, a_data), total_jobs=total)
+                    elapsed = time.perf_counter() - t0
+                    audit.flush_all()
+                label = f"threads concurrency={conc}" + (f" post_workers={post}" if post else "")
+                out.append(_result(
+                    label, "jobs_per_s", total / elapsed, elapsed,
+                    jobs=total, rows=sum(r.count for r in res.values()),
+                ))
+    finally:
+        server.shutdown()
+    return out
+
+
+def bench_dedupe(args) -> List[Dict[str, Any]]:
+    out = []
+    for mode in ("record", "key"):
+        d = Deduper(mode)
+        elapsed = 0.0
+        kept = 0
+        for chunk in _rows(args.rows):
+            t0 = time.perf_counter()
+            kept += len(d.filter(chunk))
+            elapsed += time.perf_counter() - t0
+        out.append(_result(f"mode={mode}", "rows_per_s", args.rows / elapsed, elapsed, rows=args.rows, kept=kept))
+    return out
+
+
+def bench_writers(args) -> List[Dict[str, Any]]:
+    n = args.writer_rows
+    out = []
+    cases = [(fmt, NO_COMPRESSION) for fmt in FORMATS]
+    cases += [("jsonl", Compression("gzip")), ("jsonl", Compression("zstd")), ("json", Compression("zstd"))]
+    for fmt, comp in cases:
+        try:
+            require_format(fmt, comp.codec)
+        except RuntimeError:
+            continue  # extra não instalado (pyarrow, zstandard)
+        label = fmt if comp.codec == "none" else f"{fmt}+{comp.codec}"
+        with tempfile.TemporaryDirectory() as tmp:
+            elapsed = 0.0
+            sink = open_sink(Path(tmp), "imoveis", fmt, compression=comp)
+            for chunk in _rows(n):
+                t0 = time.perf_counter()
+                sink.write(chunk)
+                elapsed += time.perf_counter() - t0
+            t0 = time.perf_counter()
+            size = sink.close().stat().st_size
+            elapsed += time.perf_counter() - t0
+        out.append(_result(
+            f"RowSink {label}", "mb_per_s", size / 2**20 / elapsed, elapsed,
+            rows=n, bytes=size, rows_per_s=round(n / elapsed),
+        ))
+
+    # caminho antigo: lista inteira em memória e um json.dump só
+    rows = [r for chunk in _rows(n) for r in chunk]
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        size = write_json(Path(tmp), "imoveis", rows).stat().st_size
+        elapsed = time.perf_counter() - t0
+    out.append(_result(
+        "write_json", "mb_per_s", size / 2**20 / elapsed, elapsed,
+        rows=n, bytes=size, rows_per_s=round(n / elapsed),
+    ))
+    return out
+
+
+def bench_json(args) -> List[Dict[str, Any]]:
+    pages = [json.dumps({"content": chunk, "hasNext": True}).encode("utf-8") for chunk in _rows(args.writer_rows)]
+    rows = [r for chunk in _rows(args.writer_rows) for r in chunk]
+    size = sum(len(p) for p in pages)
+    # fixtures fora do GC: senão cada coleta varre as 100k+ linhas vivas
+    gc.collect()
+    gc.freeze()
+    out = []
+    for backend, ok in jsonlib.available().items():
+        if not ok:
+            continue
+        jsonlib.use(backend)
+        t0 = time.perf_counter()
+        for page in pages:
+            jsonlib.loads(page)
+        elapsed = time.perf_counter() - t0
+        out.append(_result(f"decode {backend}", "mb_per_s", size / 2**20 / elapsed, elapsed, bytes=size))
+        t0 = time.perf_counter()
+        for r in rows:
+            jsonlib.dumps(r)
+        elapsed = time.perf_counter() - t0
+        out.append(_result(f"encode {backend}", "rows_per_s", len(rows) / elapsed, elapsed, rows=len(rows)))
+    return out
+
+
+BENCHES: Dict[str, Callable[[Any], List[Dict[str, Any]]]] = {
+    "pagination": bench_pagination,
+    "group_a": bench_group_a,
+    "group_b": bench_group_b,
+    "dedupe": bench_dedupe,
+    "writers": bench_writers,
+    "json": bench_json,
+}
+
+
+def _child_argv(args, scenario: str) -> List[str]:
+    return [
+        sys.executable, __file__, "--child", scenario,
+        "--rows", str(args.rows), "--writer-rows", str(args.writer_rows),
+        "--pages", str(args.pages), "--a-rows", str(args.a_rows),
+        "--parents", str(args.parents), "--limit", str(args.limit),
+        "--latency", str(args.latency),
+        "--page-workers", ",".join(map(str, args.page_workers)),
+        "--concurrency", ",".join(map(str, args.concurrency)),
+        "--post-workers", ",".join(map(str, args.post_workers)),
+        "--json-backend", args.json_backend,
+    ]
+
+
+def _git_rev() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).resolve().parent,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _compare(results: List[Dict[str, Any]], baseline_path: Path) -> None:
+    base = {
+        (r["scenario"], r["case"]): r
+        for r in json.loads(baseline_path.read_text(encoding="utf-8"))["results"]
+    }
+    print(f"\n{'cenário':<12} {'caso':<28} {'métrica':<12} {'antes':>11} {'agora':>11} {'Δ':>8} {'RSS MB':>8}", file=sys.stderr)
+    for r in results:
+        old = base.get((r["scenario"], r["case"]))
+        before = f"{old['value']:.1f}" if old else "-"
+        delta = f"{(r['value'] / old['value'] - 1) * 100:+.1f}%" if old and old["value"] else "-"
+        print(
+            f"{r['scenario']:<12} {r['case']:<28} {r['metric']:<12} {before:>11} {r['value']:>11.1f} "
+            f"{delta:>8} {r['peak_rss_mb']:>8}",
+            file=sys.stderr,
+        )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--only", type=lambda s: [x for x in s.split(",") if x], default=list(SCENARIOS),
+                    help=f"cenários separados por vírgula ({', '.join(SCENARIOS)})")
+    ap.add_argument("--rows", type=int, default=1_000_000, help="registros do cenário dedupe")
+    ap.add_argument("--writer-rows", type=int, default=200_000, help="registros do cenário writers")
+    ap.add_argument("--pages", type=int, default=200_000, help="páginas do cenário pagination")
+    ap.add_argument("--a-rows", type=int, default=40_000, help="imóveis do mock no cenário group_a")
+    ap.add_argument("--parents", type=int, default=1000, help="imóveis e contribuintes do cenário group_b")
+    ap.add_argument("--limit", type=int, default=200, help="tamanho da página")
+    ap.add_argument("--latency", type=float, default=0.0, help="latência do mock por request (s)")
+    ap.add_argument("--page-workers", type=_ints, default=[1, 4], help="page_workers do cenário group_a")
+    ap.add_argument("--concurrency", type=_ints, default=[8, 32], help="concorrências do cenário group_b")
+    ap.add_argument("--post-workers", type=_ints, default=[0], help="processos de pós-processamento do cenário group_b (0 = sem)")
+    ap.add_argument("--json-backend", default="auto", help="backend JSON (auto, orjson, msgspec, stdlib)")
+    ap.add_argument("--out", type=Path, help="grava o JSON neste arquivo (padrão: stdout)")
+    ap.add_argument("--compare", type=Path, help="JSON de uma execução anterior para comparar")
+    ap.add_argument("--child", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        jsonlib.use(args.json_backend)
+        results = BENCHES[args.child](args)
+        rss = _peak_rss_mb()
+        for r in results:
+            r.update(scenario=args.child, peak_rss_mb=rss)
+        print(json.dumps(results))
+        return
+
+    unknown = [s for s in args.only if s not in BENCHES]
+    if unknown:
+        ap.error(f"cenário desconhecido: {', '.join(unknown)}")
+    results: List[Dict[str, Any]] = []
+    for scenario in args.only:
+        print(f"· {scenario}...", file=sys.stderr)
+        proc = subprocess.run(_child_argv(args, scenario), capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(proc.stderr, file=sys.stderr)
+            raise SystemExit(f"cenário {scenario} falhou")
+        results.extend(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    doc = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git": _git_rev(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {k: v for k, v in vars(args).items() if k not in ("out", "compare", "child", "only")},
+        },
+        "results": results,
+    }
+    text = json.dumps(doc, indent=2, ensure_ascii=False)
+    if args.out:
+        args.out.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    if args.compare:
+        _compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
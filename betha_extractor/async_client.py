@@ -0,0 +1,284 @@
+from __future__ import annotations
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+import requests
+
+from . import jsonlib
+from .limiter import AdaptiveLimiter
+from .http_client import STATUS_FORCELIST, retry_delay
+from .ratelimit import RateLimiter
+from .cache import CacheEntry, ResponseCache
+from .corpus import CorpusRecorder
+from .tracing import Span, Tracer, mark_start
+
+try:  # dependência opcional: pip install "betha_extractor[async]"
+    import aiohttp
+except ImportError:  # pragma: no cover - depende do ambiente
+    aiohttp = None
+
+@dataclass
+class AsyncResponse:
+    """Resposta já lida por completo, com a mesma cara do requests.Response
+    usada pelos extratores (status_code, json(), raise_for_status())."""
+
+    url: str
+    status_code: int
+    headers: Dict[str, str] = field(default_factory=dict)
+    content: bytes = b""
+    reason: str = ""
+
+    def json(self) -> Any:
+        return jsonlib.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            kind = "Client" if self.status_code < 500 else "Server"
+            raise requests.HTTPError(
+                f"{self.status_code} {kind} Error: {self.reason} for url: {self.url}",
+                response=None,
+            )
+
+
+def _trace_config() -> "aiohttp.TraceConfig":
+    """Fases do request no Span passado em `trace_request_ctx`: DNS, conexão
+    (com TLS), TTFB; o corpo é medido em `_request`."""
+    tc = aiohttp.TraceConfig()
+
+    def hook(fn):
+        async def cb(_session, ctx, _params):
+            span = ctx.trace_request_ctx
+            if isinstance(span, Span):
+                fn(span, ctx, time.monotonic())
+        return cb
+
+    def request_start(span: Span, ctx, now: float) -> None:
+        mark_start(span, now)
+        span.attempts += 1
+        span.sent = now
+        ctx.dns = 0.0
+
+    def dns_start(span: Span, ctx, now: float) -> None:
+        ctx.dns_at = now
+
+    def dns_end(span: Span, ctx, now: float) -> None:
+        ctx.dns = now - ctx.dns_at
+        span.phases["dns"] = ctx.dns
+
+    def conn_start(span: Span, ctx, now: float) -> None:
+        ctx.conn_at = now
+
+    def conn_end(span: Span, ctx, now: float) -> None:
+        span.phases["connect"] = max(0.0, now - ctx.conn_at - ctx.dns)
+        span.sent = now
+
+    def request_end(span: Span, ctx, now: float) -> None:
+        span.headers_at = now
+        span.phases["ttfb"] = now - span.sent
+
+    tc.on_request_start.append(hook(request_start))
+    tc.on_dns_resolvehost_start.append(hook(dns_start))
+    tc.on_dns_resolvehost_end.append(hook(dns_end))
+    tc.on_connection_create_start.append(hook(conn_start))
+    tc.on_connection_create_end.append(hook(conn_end))
+    tc.on_request_end.append(hook(request_end))
+    return tc
+
+
+def cached_response(entry: CacheEntry) -> AsyncResponse:
+    return AsyncResponse(
+        url=entry.url,
+        status_code=entry.status,
+        headers=dict(entry.headers),
+        content=entry.body,
+        reason="OK (cache)",
+    )
+
+
+class AsyncHttpClient:
+    """Cliente asyncio (aiohttp) com a mesma superfície do HttpClient:
+    `await get(path_or_url, params)` e a mesma política de retry/backoff."""
+
+    def __init__(
+        self,
+        base_url: str,
+        user_access: str,
+        bearer: str,
+        timeout: int = 10,
+        max_retries: int = 5,
+        max_in_flight: int = 0,
+        limiter: Optional[AdaptiveLimiter] = None,
+        cache: Optional[ResponseCache] = None,
+        recorder: Optional[CorpusRecorder] = None,
+        rate: Optional[RateLimiter] = None,
+        tracer: Optional[Tracer] = None,
+    ):
+        if aiohttp is None:
+            raise RuntimeError(
+                "Engine async requer aiohttp. Instale com: pip install 'betha_extractor[async]'"
+            )
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_in_flight = max_in_flight
+        self.headers = {
+            "User-Access": user_access,
+            "Authorization": f"Bearer {bearer}",
+            "Content-Type": "application/json",
+        }
+        self.limiter = limiter
+        self.rate = rate
+        self.tracer = tracer
+        self.cache = cache
+        self.recorder = recorder
+        self._session: Optional["aiohttp.ClientSession"] = None
+        self._in_flight: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self) -> "AsyncHttpClient":
+        # limit=0 no connector: quem limita é o semáforo (ou a janela do extrator)
+        connector = aiohttp.TCPConnector(limit=0, ttl_dns_cache=300)
+        self._session = aiohttp.ClientSession(
+            headers=self.headers,
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=None, sock_connect=self.timeout, sock_read=self.timeout),
+            trace_configs=[_trace_config()] if self.tracer is not None else None,
+        )
+        if self.max_in_flight > 0:
+            self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _once(
+        self,
+        url: str,
+        params: Dict[str, Any],
+        headers: Dict[str, str],
+        span: Optional[Span] = None,
+    ) -> AsyncResponse:
+        if self.limiter is None:
+            return await self._request(url, params, headers, span)
+        await self.limiter.acquire_async()
+        t0 = time.monotonic()
+        try:
+            resp = await self._request(url, params, headers, span)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self.limiter.release(time.monotonic() - t0, error=True)
+            raise
+        except BaseException:
+            # cancelamento: só devolve a vaga
+            self.limiter.release(time.monotonic() - t0)
+            raise
+        self.limiter.release(time.monotonic() - t0, status=resp.status_code)
+        return resp
+
+    async def _request(
+        self,
+        url: str,
+        params: Dict[str, Any],
+        headers: Dict[str, str],
+        span: Optional[Span] = None,
+    ) -> AsyncResponse:
+        async with self._session.get(url, params=params, headers=headers or None, trace_request_ctx=span) as resp:
+            content = await resp.read()
+            if span is not None and span.headers_at:
+                span.phases["body"] = time.monotonic() - span.headers_at
+            return AsyncResponse(
+                url=str(resp.url),
+                status_code=resp.status,
+                headers=dict(resp.headers),
+                content=content,
+                reason=resp.reason or "",
+            )
+
+    async def get(self, path_or_url: str, params: Dict[str, Any] | None = None) -> AsyncResponse:
+        if self._session is None:
+            raise RuntimeError("AsyncHttpClient precisa ser usado com 'async with'")
+        if path_or_url.startswith("http"):
+            url = path_or_url
+        else:
+            url = f"{self.base_url}/{path_or_url.lstrip('/')}"
+        # _ts anti-cache
+        params = {k: str(v) for k, v in (params or {}).items()}
+        params.setdefault("_ts", str(int(time.time() * 1000)))
+        resp = await self._cached(url, params)
+        if self.recorder is not None:
+            # gzip + escrita em disco: fora do event loop
+            await self._offload(self.recorder.record, url, params, resp.status_code, resp.content)
+        return resp
+
+    async def _offload(self, fn, *args):
+        """Chamadas síncronas de disco (cache sqlite, corpus) no executor
+        padrão; ResponseCache e CorpusRecorder já são thread-safe."""
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    async def _cached(self, url: str, params: Dict[str, Any]) -> AsyncResponse:
+        if self.cache is None:
+            return await self._get(url, params, {})
+
+        # mesmas regras do HttpClient: hit no TTL, depois revalidação (304)
+        key, entry, fresh = await self._offload(self.cache.lookup, url, params)
+        if fresh:
+            return cached_response(entry)
+        resp = await self._get(url, params, self.cache.conditional_headers(entry))
+        if resp.status_code == 304 and entry is not None:
+            await self._offload(self.cache.revalidated, entry)
+            return cached_response(entry)
+        await self._offload(self.cache.store, key, url, resp.status_code, resp.headers, resp.content)
+        return resp
+
+    async def _get(self, url: str, params: Dict[str, Any], headers: Dict[str, str]) -> AsyncResponse:
+        if self.tracer is None:
+            return await self._attempts(url, params, headers)
+        span = self.tracer.span(url)
+        try:
+            resp = await self._attempts(url, params, headers, span)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.tracer.finish(span, error=e)
+            raise
+        self.tracer.finish(span, resp.status_code, len(resp.content))
+        return resp
+
+    async def _attempts(
+        self,
+        url: str,
+        params: Dict[str, Any],
+        headers: Dict[str, str],
+        span: Optional[Span] = None,
+    ) -> AsyncResponse:
+        errors = 0
+        while True:
+            resp: Optional[AsyncResponse] = None
+            if self.rate is not None:
+                # token antes da vaga em voo; cada nova tentativa também espera
+                delay = self.rate.reserve(url)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            try:
+                if self._in_flight is None:
+                    resp = await self._once(url, params, headers, span)
+                else:
+                    async with self._in_flight:
+                        resp = await self._once(url, params, headers, span)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                errors += 1
+                if errors > self.max_retries:
+                    raise
+            else:
+                if self.rate is not None:
+                    self.rate.observe(url, resp.status_code, resp.headers)
+                if resp.status_code not in STATUS_FORCELIST or errors >= self.max_retries:
+                    return resp
+                errors += 1
+            # mesma espera do HttpClient, fora das vagas
+            delay = retry_delay(errors, resp)
+            if delay > 0:
+                await asyncio.sleep(delay)
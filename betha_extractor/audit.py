@@ -1,45 +1,183 @@
-
 from __future__ import annotations
+import atexit
 import csv
+import gzip
+import io
+import threading
 from dataclasses import dataclass, asdict
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional
 
 @dataclass
 class AuditRow:
     ts: str
     group: str           # "A" | "B"
     endpoint: str
-    unit: str            # "page" | "job"
+    unit: str            # "page" | "job" | "failed"
     index: int
     fetched: int
     accumulated: int
     total_hint: Optional[int]
     percent: Optional[float]
     file: str
+    limit: Optional[int] = None  # limite adaptativo de requests em voo
+    reason: str = ""             # motivo da última mudança do limite
 
-class Auditor:
-    def __init__(self, output_dir: Path):
-        self.output_dir = output_dir
-        self.path = output_dir / "_audit.csv"
+HEADER = ["ts","group","endpoint","unit","index","fetched","accumulated","total_hint","percent","file","limit","reason"]
+
+# csv: _audit.csv; csv.gz: _audit.csv.gz (um membro gzip por lote); off: nada
+AUDIT_FORMATS = ("csv", "csv.gz", "off")
+_FILE = {"csv": "_audit.csv", "csv.gz": "_audit.csv.gz"}
+
+# lote gravado quando acumula FLUSH_ROWS linhas ou a cada FLUSH_SECONDS
+FLUSH_ROWS = 2000
+FLUSH_SECONDS = 1.0
+
+def _cells(row: AuditRow) -> list:
+    return [
+        row.ts, row.group, row.endpoint, row.unit, row.index,
+        row.fetched, row.accumulated,
+        row.total_hint if row.total_hint is not None else "",
+        f"{row.percent:.2f}" if row.percent is not None else "",
+        row.file,
+        row.limit if row.limit is not None else "",
+        row.reason,
+    ]
+
+class _AuditWriter:
+    """Um por diretório de saída, compartilhado por todos os Auditors: as
+    linhas vão para um buffer em memória e uma thread grava em lotes."""
+
+    def __init__(self, output_dir: Path, fmt: str):
+        if fmt not in AUDIT_FORMATS:
+            raise ValueError(f"Formato de auditoria inválido: {fmt} (use {', '.join(AUDIT_FORMATS)})")
+        self.fmt = fmt
+        self.path: Optional[Path] = output_dir / _FILE[fmt] if fmt != "off" else None
+        self._buf: List[AuditRow] = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        if self.path is None:
+            return
+        self._prepare()
+        self._thread = threading.Thread(target=self._loop, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def _open_text(self, mode: str):
+        if self.fmt == "csv.gz":
+            return gzip.open(self.path, mode + "t", newline="", encoding="utf-8")
+        return self.path.open(mode, newline="", encoding="utf-8")
+
+    def _prepare(self) -> None:
+        # Arquivo de uma versão com outras colunas: guarda ao lado e recomeça
+        if self.path.exists():
+            try:
+                with self._open_text("r") as f:
+                    first = next(csv.reader(f), None)
+            except (OSError, EOFError):
+                first = None
+            if first != HEADER:
+                stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+                self.path.rename(self.path.with_name(self.path.name.replace("_audit.", f"_audit.{stamp}.", 1)))
         # Write header if file not exists
         if not self.path.exists():
             self.path.parent.mkdir(parents=True, exist_ok=True)
-            with self.path.open("w", newline="", encoding="utf-8") as f:
-                w = csv.writer(f)
-                w.writerow(["ts","group","endpoint","unit","index","fetched","accumulated","total_hint","percent","file"])
+            with self._open_text("w") as f:
+                csv.writer(f).writerow(HEADER)
+
+    def put(self, row: AuditRow) -> None:
+        if self.path is None:
+            return
+        with self._cond:
+            if self._thread is None:
+                # writer já encerrado (depois do flush_all): grava direto
+                self._write([row])
+                return
+            self._buf.append(row)
+            if len(self._buf) >= FLUSH_ROWS:
+                self._cond.notify()
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                if not self._closed and len(self._buf) < FLUSH_ROWS:
+                    self._cond.wait(FLUSH_SECONDS)
+                batch, self._buf = self._buf, []
+                closed = self._closed
+            self._write(batch)
+            if closed:
+                return
+
+    def _write(self, batch: List[AuditRow]) -> None:
+        if not batch:
+            return
+        text = io.StringIO()
+        w = csv.writer(text)
+        for row in batch:
+            w.writerow(_cells(row))
+        data = text.getvalue().encode("utf-8")
+        if self.fmt == "csv.gz":
+            # cada lote vira um membro gzip completo: o arquivo é sempre legível
+            data = gzip.compress(data, compresslevel=6)
+        try:
+            with self.path.open("ab") as f:
+                f.write(data)
+        except OSError:
+            pass  # auditoria não derruba a extração
+
+    def close(self) -> None:
+        if self._thread is None:
+            return
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        with self._cond:
+            self._thread = None
+
+_writers: Dict[Path, _AuditWriter] = {}
+_writers_lock = threading.Lock()
+
+def configure(output_dir: Path, fmt: str = "csv") -> None:
+    """Define o formato da auditoria do diretório (antes de criar os extratores)."""
+    key = Path(output_dir).resolve()
+    with _writers_lock:
+        old = _writers.pop(key, None)
+        if old is not None:
+            old.close()
+        _writers[key] = _AuditWriter(Path(output_dir), fmt)
+
+def _writer(output_dir: Path) -> _AuditWriter:
+    key = Path(output_dir).resolve()
+    with _writers_lock:
+        w = _writers.get(key)
+        if w is None:
+            w = _writers[key] = _AuditWriter(Path(output_dir), "csv")
+        return w
+
+def audit_path(output_dir: Path) -> Optional[Path]:
+    """Arquivo de auditoria em uso no diretório (None com AUDIT_FORMAT=off)."""
+    return _writer(output_dir).path
+
+def flush_all() -> None:
+    """Grava o que estiver no buffer e encerra as threads (no fim ou no Ctrl-C)."""
+    with _writers_lock:
+        writers = list(_writers.values())
+    for w in writers:
+        w.close()
+
+atexit.register(flush_all)
+
+class Auditor:
+    def __init__(self, output_dir: Path):
+        self.output_dir = output_dir
+        self._writer = _writer(output_dir)
+        self.path = self._writer.path
 
     def write(self, row: AuditRow) -> None:
-        with self.path.open("a", newline="", encoding="utf-8") as f:
-            w = csv.writer(f)
-            w.writerow([
-                row.ts, row.group, row.endpoint, row.unit, row.index,
-                row.fetched, row.accumulated,
-                row.total_hint if row.total_hint is not None else "",
-                f"{row.percent:.2f}" if row.percent is not None else "",
-                row.file
-            ])
+        # só enfileira; formatação e disco ficam com a thread do writer
+        self._writer.put(row)
 
 def now_iso() -> str:
     return datetime.utcnow().isoformat(timespec="seconds") + "Z"
@@ -0,0 +1,419 @@
+from __future__ import annotations
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, fields, replace
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from . import audit
+from .audit import AUDIT_FORMATS
+from .cache import ResponseCache, credential_scope
+from .checkpoint import CheckpointStore
+from .config import ENGINES, Settings
+from .corpus import CorpusRecorder
+from .dedupe import DEDUPE_MODES
+from .delta import DeltaTracker
+from .endpoints import GROUP_A
+from .extractors.base import ExtractResult
+from .extractors.group_a import GroupAExtractor
+from .extractors.group_b import GroupBExtractor
+from .http_client import HttpClient
+from .ids import parent_inputs
+from .limiter import AdaptiveLimiter
+from .ratelimit import RateLimiter, parse_rules
+from .pipeline import run_pipelined
+from .tracing import METRICS_FILE, TRACE_FILE, Tracer
+from .writers import COMPRESSIONS, FORMATS, Compression, Sharding, read_counts, require_format, safe_name
+
+# on_event(tenant: str, phase: str, detail: str) -> None
+# phase: "fila" | "A" | "B" | "A+B" | "ok" | "erro"
+EventCB = Callable[[str, str, str], None]
+
+_PATH_FIELDS = ("output_dir", "http_cache_dir", "record_dir")
+# valem para o processo inteiro: ficam no .env, não no manifesto
+_GLOBAL_FIELDS = ("json_backend", "batch_tenants", "batch_in_flight")
+_TRUE = ("1", "true", "yes", "sim")
+
+
+class FairGate:
+    """Teto global de requests em voo compartilhado pelos tenants. Com fila,
+    cada vaga liberada vai para o próximo tenant da vez (round-robin), e não
+    para quem tem mais threads esperando: um município grande não segura o
+    lote inteiro."""
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.in_flight = 0
+        # requests liberados por tenant
+        self.granted: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._waiting: Dict[str, Deque[threading.Event]] = {}
+        self._turns: Deque[str] = deque()
+
+    def slot(self, tenant: str) -> "_Slot":
+        """Vaga em nome de um tenant, no formato que o HttpClient espera (`gate`)."""
+        return _Slot(self, tenant)
+
+    def acquire(self, tenant: str) -> None:
+        with self._lock:
+            if self.in_flight < self.limit and not self._turns:
+                self._grant(tenant)
+                return
+            ready = threading.Event()
+            queue = self._waiting.setdefault(tenant, deque())
+            if not queue:
+                self._turns.append(tenant)
+            queue.append(ready)
+        ready.wait()
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            while self.in_flight < self.limit and self._turns:
+                tenant = self._turns.popleft()
+                queue = self._waiting[tenant]
+                ready = queue.popleft()
+                if queue:
+                    self._turns.append(tenant)
+                self._grant(tenant)
+                ready.set()
+
+    def _grant(self, tenant: str) -> None:
+        self.in_flight += 1
+        self.granted[tenant] = self.granted.get(tenant, 0) + 1
+
+
+class _Slot:
+    def __init__(self, gate: FairGate, tenant: str):
+        self.gate = gate
+        self.tenant = tenant
+
+    def __enter__(self) -> "_Slot":
+        self.gate.acquire(self.tenant)
+        return self
+
+    def __exit__(self, *exc: Any) -> bool:
+        self.gate.release()
+        return False
+
+
+@dataclass
+class Tenant:
+    name: str
+    settings: Settings
+
+
+@dataclass
+class TenantResult:
+    name: str
+    output_dir: Path
+    ok: bool = False
+    error: str = ""
+    a_rows: int = 0
+    b_rows: int = 0
+    elapsed: float = 0.0
+
+
+def _coerce(base: Settings, key: str, value: Any) -> Any:
+    if isinstance(value, str):
+        value = os.path.expandvars(value)
+    if key in _PATH_FIELDS:
+        return Path(value).resolve() if value else None
+    current = getattr(base, key)
+    if isinstance(value, str):
+        if isinstance(current, bool):
+            return value.strip().lower() in _TRUE
+        if isinstance(current, int):
+            return int(value)
+        if isinstance(current, float):
+            return float(value)
+    return value
+
+
+def load_manifest(path: Path, base: Settings) -> List[Tenant]:
+    """Lê o manifesto JSON: `{"defaults": {...}, "tenants": [{"name": ..., ...}]}`
+    (ou só a lista de tenants). As chaves são campos do Settings
+    (`user_access`, `bearer`, `page_limit`, `max_in_flight`...); strings
+    aceitam `$VARIAVEL` do ambiente, para os tokens ficarem fora do arquivo.
+    Sem `output_dir`, cada tenant grava em `OUTPUT_DIR/<name>`."""
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    if isinstance(data, list):
+        data = {"tenants": data}
+    defaults = data.get("defaults") or {}
+    known = {f.name for f in fields(Settings)}
+    # credenciais do .env não vazam para tenants que esqueceram as suas
+    base = replace(base, user_access="", bearer="")
+    tenants: List[Tenant] = []
+    for i, entry in enumerate(data.get("tenants") or [], 1):
+        merged = {**defaults, **entry}
+        name = str(merged.pop("name", "") or "").strip()
+        if not name:
+            raise ValueError(f"Tenant #{i} sem \"name\" no manifesto")
+        if any(t.name == name for t in tenants):
+            raise ValueError(f"Tenant repetido no manifesto: {name}")
+        unknown = sorted(set(merged) - known)
+        if unknown:
+            raise ValueError(f"Tenant {name}: campos desconhecidos: {', '.join(unknown)}")
+        shared = sorted(set(merged) & set(_GLOBAL_FIELDS))
+        if shared:
+            raise ValueError(f"Tenant {name}: {', '.join(shared)} vale para o lote todo (defina no .env)")
+        values = {k: _coerce(base, k, v) for k, v in merged.items()}
+        s = replace(base, **values)
+        s.base_url = s.base_url.rstrip("/")
+        if "output_dir" not in values:
+            s.output_dir = base.output_dir / safe_name(name)
+        if not s.user_access or not s.bearer:
+            raise ValueError(f"Tenant {name}: credenciais ausentes (user_access/bearer)")
+        check_settings(s, name)
+        # o corpus é indexado só por URL: dois tenants nele se misturam
+        other = next((t for t in tenants if s.record_dir and t.settings.record_dir == s.record_dir), None)
+        if other is not None:
+            raise ValueError(f"Tenant {name}: record_dir {s.record_dir} já é do tenant {other.name}")
+        tenants.append(Tenant(name, s))
+    if not tenants:
+        raise ValueError("Manifesto sem tenants")
+    return tenants
+
+
+def check_settings(s: Settings, name: str) -> None:
+    """As mesmas validações do `run`, com ValueError em vez de sair."""
+    def bad(what: str, options) -> ValueError:
+        return ValueError(f"Tenant {name}: {what} deve ser um de: {', '.join(options)}")
+
+    if s.engine not in ENGINES:
+        raise bad("engine", ENGINES)
+    if s.engine != "threads":
+        # a vaga global é um lock de threads; o event loop do aiohttp não a usa
+        raise ValueError(f"Tenant {name}: o modo batch usa engine threads (engine: {s.engine})")
+    if s.dedupe not in DEDUPE_MODES or s.dedupe_a not in DEDUPE_MODES:
+        raise bad("dedupe", DEDUPE_MODES)
+    if s.audit_format not in AUDIT_FORMATS:
+        raise bad("audit_format", AUDIT_FORMATS)
+    if s.output_format not in FORMATS:
+        raise bad("output_format", FORMATS)
+    if s.compression not in COMPRESSIONS:
+        raise bad("compression", COMPRESSIONS)
+    if s.shard_rows < 0 or s.shard_mb < 0:
+        raise ValueError(f"Tenant {name}: shard_rows/shard_mb devem ser >= 0")
+    if s.rate_limit < 0 or s.rate_burst < 0:
+        raise ValueError(f"Tenant {name}: rate_limit/rate_burst devem ser >= 0")
+    try:
+        parse_rules(s.rate_limits)
+    except ValueError as e:
+        raise ValueError(f"Tenant {name}: {e}")
+    try:
+        require_format(s.output_format, s.compression)
+    except RuntimeError as e:
+        raise ValueError(f"Tenant {name}: {e}")
+
+
+def _rows(results: Dict[str, ExtractResult]) -> int:
+    return sum(r.count for r in results.values())
+
+
+def run_tenant(
+    tenant: Tenant,
+    gate: FairGate,
+    mode: str = "all",
+    resume: bool = False,
+    on_event: Optional[EventCB] = None,
+) -> TenantResult:
+    """Grupo A e/ou B de um tenant, como o `run` faria, sem a UI: cliente,
+    limites, checkpoint e saída próprios; só a vaga global é compartilhada."""
+    s = tenant.settings
+    name = tenant.name
+    emit = on_event or (lambda *_: None)
+    result = TenantResult(name, s.output_dir)
+    t0 = time.monotonic()
+
+    s.output_dir.mkdir(parents=True, exist_ok=True)
+    audit.configure(s.output_dir, s.audit_format)
+    limiter = None
+    if s.adaptive:
+        limiter = AdaptiveLimiter(
+            initial=s.concurrency, minimum=s.min_concurrency, maximum=s.max_concurrency
+        )
+    response_cache = None
+    if s.http_cache:
+        response_cache = ResponseCache(
+            s.http_cache_dir or s.output_dir / "_http_cache",
+            ttl=s.http_cache_ttl,
+            max_bytes=s.http_cache_max_mb * 2**20,
+            scope=credential_scope(s.user_access, s.bearer),
+        )
+    recorder = CorpusRecorder(s.record_dir, s.base_url) if s.record_dir else None
+    # cota da API é por credencial: cada tenant aprende a sua
+    rate = None
+    rules = parse_rules(s.rate_limits)
+    if s.rate_limit or rules or s.rate_learn:
+        rate = RateLimiter(s.rate_limit, rules, s.rate_burst, learn=s.rate_learn)
+    # trace no diretório do tenant; sem /metrics no batch (uma porta por processo)
+    tracer = Tracer(s.base_url, s.output_dir / TRACE_FILE) if s.trace else None
+    client = HttpClient(
+        base_url=s.base_url,
+        user_access=s.user_access,
+        bearer=s.bearer,
+        timeout=s.timeout_seconds,
+        max_retries=s.max_retries,
+        max_in_flight=s.max_in_flight,
+        limiter=limiter,
+        cache=response_cache,
+        recorder=recorder,
+        gate=gate.slot(name),
+        rate=rate,
+        tracer=tracer,
+    )
+
+    compression = Compression(s.compression, s.compression_level, s.compression_threads)
+    fmt_label = s.output_format if s.compression == "none" else f"{s.output_format}+{s.compression}"
+    if s.post_workers:
+        fmt_label += f"+post{s.post_workers}"
+    sharding = Sharding(s.shard_rows, s.shard_mb)
+    if sharding.enabled:
+        fmt_label += f"+parts{s.shard_rows}r{s.shard_mb}m"
+    checkpoint = CheckpointStore(s.output_dir, fmt_label)
+    if resume:
+        old = checkpoint.stored_fmt()
+        if not checkpoint.load() and old and old != fmt_label:
+            raise ValueError(f"checkpoint gravado com {old}; retome com o mesmo formato")
+    else:
+        if mode in ("A", "all"):
+            checkpoint.reset_a()
+        if mode in ("B", "all"):
+            checkpoint.reset_b()
+
+    ga = GroupAExtractor(
+        client,
+        s.output_dir,
+        s.page_limit,
+        s.page_workers,
+        s.endpoint_workers,
+        fmt=s.output_format,
+        checkpoint=checkpoint,
+        dedupe=s.dedupe_a,
+        compression=compression,
+        sharding=sharding,
+        id_hashes=s.delta,
+    )
+    tracker = DeltaTracker(s.output_dir) if s.delta and mode in ("B", "all") else None
+    gb = GroupBExtractor(
+        client,
+        s.output_dir,
+        s.page_limit,
+        s.max_concurrency if limiter else s.concurrency,
+        fmt=s.output_format,
+        checkpoint=checkpoint,
+        delta=tracker,
+        window=s.b_window,
+        dedupe=s.dedupe,
+        progress_hz=s.progress_hz,
+        compression=compression,
+        post_workers=s.post_workers,
+        sharding=sharding,
+    )
+    selected = ga.order(GROUP_A)
+
+    done_a: List[str] = []
+
+    def on_done(key: str, _res: ExtractResult) -> None:
+        done_a.append(key)
+        emit(name, "A", f"{len(done_a)}/{len(selected)} endpoints")
+
+    def on_job(done: int, total: int, _endpoint: str, _fetched: int, rows: int, _p) -> None:
+        emit(name, "B", f"{done}/{total or '?'} jobs · {rows} registros")
+
+    a_result: Dict[str, ExtractResult] = {}
+    b_result: Dict[str, ExtractResult] = {}
+    try:
+        if mode == "all" and s.pipeline:
+            emit(name, "A+B", "pipeline")
+            a_result, b_result = run_pipelined(
+                ga,
+                gb,
+                selected,
+                s.base_url,
+                queue_size=s.pipeline_queue,
+                a_done_cb=on_done,
+                b_progress_cb=on_job,
+            )
+        else:
+            if mode in ("A", "all"):
+                emit(name, "A", f"0/{len(selected)} endpoints")
+                a_result = ga.run(selected, done_cb=on_done)
+            if mode in ("B", "all"):
+                emit(name, "B", "gerando jobs")
+                b_input, b_ids, parent_counts = parent_inputs(
+                    s.output_dir, a_result, from_disk=mode == "B", hashes=tracker is not None
+                )
+                b_result = gb.run(
+                    b_input,
+                    s.base_url,
+                    progress_cb=on_job,
+                    parent_counts=parent_counts,
+                    parent_ids=b_ids,
+                )
+    finally:
+        if response_cache is not None:
+            response_cache.close()
+        if recorder is not None:
+            recorder.close()
+        if tracer is not None:
+            tracer.write_prometheus(s.output_dir / METRICS_FILE)
+            tracer.close()
+
+    result.ok = True
+    result.a_rows = _rows(a_result)
+    result.b_rows = _rows(b_result)
+    result.elapsed = time.monotonic() - t0
+    return result
+
+
+def _run_one(
+    tenant: Tenant, gate: FairGate, mode: str, resume: bool, on_event: Optional[EventCB]
+) -> TenantResult:
+    t0 = time.monotonic()
+    try:
+        res = run_tenant(tenant, gate, mode, resume, on_event)
+    except Exception as e:
+        # um município com problema não derruba o lote
+        res = TenantResult(tenant.name, tenant.settings.output_dir, error=f"{type(e).__name__}: {e}")
+        res.elapsed = time.monotonic() - t0
+        if on_event:
+            on_event(tenant.name, "erro", res.error)
+        return res
+    if on_event:
+        on_event(tenant.name, "ok", f"A {res.a_rows} · B {res.b_rows} registros")
+    return res
+
+
+def run_batch(
+    tenants: List[Tenant],
+    gate: FairGate,
+    mode: str = "all",
+    resume: bool = False,
+    workers: int = 4,
+    on_event: Optional[EventCB] = None,
+) -> List[TenantResult]:
+    """Extrai os tenants, `workers` ao mesmo tempo, maiores primeiro (pela
+    contagem da execução anterior); todos os requests passam pelo `gate`.
+    Devolve os resultados na ordem do manifesto."""
+    ordered = sorted(
+        tenants, key=lambda t: sum(read_counts(t.settings.output_dir).values()), reverse=True
+    )
+    for t in ordered:
+        if on_event:
+            on_event(t.name, "fila", "")
+    results: Dict[str, TenantResult] = {}
+    ex = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="tenant")
+    try:
+        futures = [ex.submit(_run_one, t, gate, mode, resume, on_event) for t in ordered]
+        for fut in as_completed(futures):
+            res = fut.result()
+            results[res.name] = res
+    finally:
+        ex.shutdown(wait=False, cancel_futures=True)
+    return [results[t.name] for t in tenants]
@@ -0,0 +1,160 @@
+from __future__ import annotations
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+CACHE_FILE = "cache.sqlite"
+# parâmetro anti-cache do HttpClient: fora da chave
+_VOLATILE = ("_ts",)
+# cabeçalhos guardados junto com o corpo
+_KEEP_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+
+@dataclass
+class CacheEntry:
+    key: str
+    url: str
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    stored: float
+
+    @property
+    def etag(self) -> Optional[str]:
+        return self.headers.get("ETag")
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        return self.headers.get("Last-Modified")
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0          # dentro do TTL, sem request
+    revalidated: int = 0   # 304 do servidor
+    misses: int = 0        # buscado de novo (sem entrada, ou entrada mudou)
+    stored: int = 0
+    evicted: int = 0
+
+
+def credential_scope(user_access: str, bearer: str) -> str:
+    """Hash curto das credenciais: entra na chave do cache para que dois
+    tenants no mesmo HTTP_CACHE_DIR não vejam as respostas um do outro."""
+    raw = f"{user_access}\0{bearer}".encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+
+class ResponseCache:
+    """Cache persistente de respostas GET (sqlite): chave = credencial
+    (`scope`) + URL + parâmetros sem `_ts`. Dentro do TTL responde sem rede;
+    depois disso revalida com If-None-Match/If-Modified-Since. Passando de
+    `max_bytes`, sai o que foi usado há mais tempo (LRU)."""
+
+    def __init__(
+        self,
+        directory: Path,
+        ttl: float = 3600.0,
+        max_bytes: int = 512 * 2**20,
+        scope: str = "",
+    ):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.scope = scope
+        self.stats = CacheStats()
+        directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(directory / CACHE_FILE), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, url TEXT, status INTEGER, headers TEXT,"
+            " body BLOB, size INTEGER, stored REAL, used REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_used ON responses(used)")
+        self._db.commit()
+        self._size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def key_for(self, url: str, params: Optional[Dict[str, Any]]) -> str:
+        items = sorted((str(k), str(v)) for k, v in (params or {}).items() if k not in _VOLATILE)
+        raw = json.dumps([self.scope, url, items], ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def lookup(self, url: str, params: Optional[Dict[str, Any]]) -> Tuple[str, Optional[CacheEntry], bool]:
+        """(chave, entrada, ainda no TTL). Uma entrada no TTL conta como hit."""
+        key = self.key_for(url, params)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, status, headers, body, stored FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return key, None, False
+            entry = CacheEntry(key, row[0], row[1], json.loads(row[2]), row[3], row[4])
+            fresh = time.time() - entry.stored < self.ttl
+            if fresh:
+                self.stats.hits += 1
+                self._db.execute("UPDATE responses SET used = ? WHERE key = ?", (time.time(), key))
+                self._db.commit()
+            return key, entry, fresh
+
+    def conditional_headers(self, entry: Optional[CacheEntry]) -> Dict[str, str]:
+        headers: Dict[str, str] = {}
+        if entry is None:
+            return headers
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def revalidated(self, entry: CacheEntry) -> None:
+        """304: a entrada continua valendo por mais um TTL."""
+        now = time.time()
+        with self._lock:
+            self.stats.revalidated += 1
+            self._db.execute(
+                "UPDATE responses SET stored = ?, used = ? WHERE key = ?", (now, now, entry.key)
+            )
+            self._db.commit()
+
+    def store(self, key: str, url: str, status: int, headers: Any, body: bytes) -> None:
+        """Guarda respostas 200; as demais só contam como miss."""
+        with self._lock:
+            self.stats.misses += 1
+            if status != 200:
+                return
+            lower = {str(k).lower(): v for k, v in headers.items()}
+            kept = {h: lower[h.lower()] for h in _KEEP_HEADERS if lower.get(h.lower())}
+            now = time.time()
+            old = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, status, json.dumps(kept), body, len(body), now, now),
+            )
+            self._size += len(body) - (old[0] if old else 0)
+            self.stats.stored += 1
+            if self._size > self.max_bytes:
+                self._evict()
+            self._db.commit()
+
+    def _evict(self) -> None:
+        # libera até 90% do teto, começando pelo menos usado
+        target = self.max_bytes * 0.9
+        rows = self._db.execute("SELECT key, size FROM responses ORDER BY used ASC").fetchall()
+        for key, size in rows:
+            if self._size <= target:
+                break
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._size -= size
+            self.stats.evicted += 1
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.commit()
+            self._db.close()
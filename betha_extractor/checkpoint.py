@@ -0,0 +1,210 @@
+from __future__ import annotations
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Set, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .writers import RowSink
+
+CHECKPOINT_FILE = "_checkpoint.json"
+# jobs B concluídos, `<endpoint>\t<id do pai>` por linha (append-only)
+DONE_FILE = "_checkpoint_b.txt"
+# URLs de jobs B que falharam na execução corrente (o --resume as refaz)
+FAILED_FILE = "_checkpoint_b_failed.txt"
+
+
+class CheckpointStore:
+    """Estado de retomada no diretório de saída.
+
+    Grupo A: por endpoint, o cursor de `next_page_state` (offset/page/seq/
+    assinatura) e o tamanho do `.part` após a última página gravada.
+    Grupo B: a cada `every` jobs, o tamanho de cada `.part`, da lista de jobs
+    concluídos e o cursor (próxima página) dos jobs com páginas já gravadas,
+    tudo junto; ao retomar, tudo volta para esse ponto e esses jobs seguem
+    da próxima página. Os endpoints já publicados numa execução com falhas
+    ficam em `published`."""
+
+    def __init__(self, output_dir: Path, fmt: str, every: int = 500, interval: float = 5.0):
+        self.output_dir = output_dir
+        self.fmt = fmt
+        self.path = output_dir / CHECKPOINT_FILE
+        self.done_path = output_dir / DONE_FILE
+        self.failed_path = output_dir / FAILED_FILE
+        self.every = max(1, every)
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._state: Dict[str, Any] = {"fmt": fmt, "a": {}, "b": None}
+        self._done_f = None
+        self._failed_f = None
+        self._since_save = 0
+        self._last_save = time.monotonic()
+
+    # ---- persistência ----
+    def load(self) -> bool:
+        """Carrega o checkpoint anterior; False se não houver ou for de outro formato."""
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception:
+            return False
+        if not isinstance(data, dict) or data.get("fmt") != self.fmt:
+            return False
+        self._state = {"fmt": self.fmt, "a": data.get("a") or {}, "b": data.get("b")}
+        return True
+
+    def stored_fmt(self) -> Optional[str]:
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8")).get("fmt")
+        except Exception:
+            return None
+
+    def _save(self) -> None:
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(self._state, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def reset_a(self) -> None:
+        with self._lock:
+            self._state["a"] = {}
+            self._save()
+
+    def reset_b(self) -> None:
+        with self._lock:
+            self._state["b"] = None
+            self.done_path.unlink(missing_ok=True)
+            self._save()
+        self.clear_b_failed()
+
+    # ---- Grupo A ----
+    def a_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._state["a"].get(key)
+            return dict(entry) if entry else None
+
+    def a_unfinished(self) -> bool:
+        """Algum endpoint do A começou e não terminou (execução interrompida)."""
+        with self._lock:
+            return any(not e.get("done") for e in self._state["a"].values())
+
+    def save_a(self, key: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._state["a"][key] = entry
+            self._save()
+
+    # ---- Grupo B ----
+    def b_sinks(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            b = self._state.get("b") or {}
+            return dict(b.get("sinks") or {})
+
+    def b_published(self) -> Dict[str, int]:
+        """Endpoints publicados por uma execução com jobs que falharam: nome -> registros."""
+        with self._lock:
+            b = self._state.get("b") or {}
+            return dict(b.get("published") or {})
+
+    def publish_b(self, counts: Dict[str, int]) -> None:
+        """Registra endpoints já publicados; vale a partir do próximo save."""
+        with self._lock:
+            self._published().update(counts)
+
+    def _published(self) -> Dict[str, int]:
+        b = self._state.get("b")
+        if b is None or b.get("finished"):
+            b = self._state["b"] = {}
+        return b.setdefault("published", {})
+
+    def b_done(self) -> Dict[str, Set[str]]:
+        """Ids dos pais com job concluído, por endpoint, até o último
+        checkpoint B (o resto é refeito). Lido linha a linha."""
+        with self._lock:
+            b = self._state.get("b") or {}
+            size = int(b.get("done_bytes") or 0)
+            done: Dict[str, Set[str]] = {}
+            if not self.done_path.exists():
+                return done
+            with self.done_path.open("r+b") as f:
+                f.truncate(size)
+            with self.done_path.open("r", encoding="utf-8", newline="\n") as f:
+                for line in f:
+                    endpoint, sep, parent = line.rstrip("\n").partition("\t")
+                    if sep:
+                        done.setdefault(endpoint, set()).add(parent)
+            return done
+
+    def b_cursors(self) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """(endpoint, pai) -> próxima página dos jobs que estavam pela metade."""
+        with self._lock:
+            b = self._state.get("b") or {}
+            return {(j["endpoint"], str(j["parent"])): j for j in b.get("cursors") or ()}
+
+    def mark_b(self, endpoint: str, parent: Any) -> None:
+        with self._lock:
+            if self._done_f is None:
+                self._done_f = self.done_path.open("ab")
+            self._done_f.write(f"{endpoint}\t{parent}\n".encode("utf-8"))
+            self._since_save += 1
+
+    def mark_b_failed(self, url: str) -> None:
+        """Job que falhou: fica fora da lista de concluídos e vai para
+        `_checkpoint_b_failed.txt`, só para consulta."""
+        with self._lock:
+            if self._failed_f is None:
+                self._failed_f = self.failed_path.open("wb")
+            self._failed_f.write(url.encode("utf-8") + b"\n")
+            self._failed_f.flush()
+
+    def clear_b_failed(self) -> None:
+        with self._lock:
+            if self._failed_f is not None:
+                self._failed_f.close()
+                self._failed_f = None
+            self.failed_path.unlink(missing_ok=True)
+
+    def maybe_save_b(
+        self,
+        sinks: Dict[str, "RowSink"],
+        force: bool = False,
+        cursors: Optional[Dict[Any, Dict[str, Any]]] = None,
+    ) -> None:
+        """`cursors`: próxima página de cada job com páginas nos `sinks`."""
+        with self._lock:
+            due = self._since_save >= self.every or (
+                self._since_save and time.monotonic() - self._last_save >= self.interval
+            )
+            if not (force or due):
+                return
+            # ordem importa: dados primeiro, depois a lista de jobs, depois o estado
+            sizes = {k: {"bytes": s.flush(), "count": s.count} for k, s in sinks.items()}
+            done_bytes = 0
+            if self._done_f is not None:
+                self._done_f.flush()
+                done_bytes = self._done_f.tell()
+            elif self.done_path.exists():
+                done_bytes = self.done_path.stat().st_size
+            self._state["b"] = {
+                "sinks": sizes,
+                "done_bytes": done_bytes,
+                "cursors": list((cursors or {}).values()),
+                "published": self._published(),
+            }
+            self._save()
+            self._since_save = 0
+            self._last_save = time.monotonic()
+
+    def finish_b(self, counts: Dict[str, int]) -> None:
+        with self._lock:
+            if self._done_f is not None:
+                self._done_f.close()
+                self._done_f = None
+            self._state["b"] = {"finished": True, "counts": counts, "done_bytes": 0}
+            self.done_path.unlink(missing_ok=True)
+            self._save()
+        self.clear_b_failed()
+
+    def b_finished(self) -> Optional[Dict[str, int]]:
+        with self._lock:
+            b = self._state.get("b") or {}
+            return dict(b["counts"]) if b.get("finished") else None
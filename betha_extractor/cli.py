@@ -14,4 +14,59 @@ def build_parser() -> argparse.ArgumentParser:
     run.add_argument("--limit", type=int, help="Tamanho da página")
     run.add_argument("--timeout", type=int, help="Timeout da requisição (s)")
     run.add_argument("--concurrency", type=int, help="Concorrência para Grupo B")
+    run.add_argument("--page-workers", type=int, help="Páginas buscadas em paralelo no Grupo A (quando a API informa o total)")
+    run.add_argument("--endpoint-workers", type=int, help="Endpoints do Grupo A extraídos ao mesmo tempo")
+    run.add_argument("--max-in-flight", type=int, help="Limite global de requests simultâneos (0 = sem limite)")
+    run.add_argument("--pipeline", action="store_true", help="A + B sobrepostos: cada página do A já alimenta os jobs do B")
+    run.add_argument("--format", dest="output_format", choices=["json","jsonl","json-compact","parquet"], help="Formato de saída (json indentado, jsonl, json-compact ou parquet)")
+    run.add_argument("--compress", choices=["none","gzip","zstd"], help="Compressão em streaming das saídas de texto (.gz/.zst)")
+    run.add_argument("--compress-level", type=int, help="Nível de compressão (gzip 1–9, zstd 1–22)")
+    run.add_argument("--compress-threads", type=int, help="Threads de compressão do zstd (0 = na thread que grava)")
+    run.add_argument("--json-backend", choices=["auto","orjson","msgspec","stdlib"], help="Parser/encoder JSON (auto: orjson, msgspec ou stdlib)")
+    run.add_argument("--post-workers", type=int, help="Processos que decodificam, deduplicam e gravam as respostas do Grupo B (0 = no processo principal)")
+    run.add_argument("--shard-rows", type=int, help="Saída em partes (<endpoint>/part-*.ext + _manifest.json): registros por parte")
+    run.add_argument("--shard-mb", type=int, help="Saída em partes: MB por parte, aproximado (o que vier primeiro com --shard-rows)")
+    run.add_argument("--rate-limit", type=float, help="Requests por segundo, global (0 = sem limite)")
+    run.add_argument("--rate-limits", help="Requests/s por padrão de endpoint, ex.: 'imoveis/*/proprietarios=20,bairros=5'")
+    run.add_argument("--rate-burst", type=float, help="Rajada de cada balde, em requests (1 = espaçados)")
+    run.add_argument("--rate-learn", action="store_true", help="Ajusta as taxas pelos cabeçalhos Retry-After/X-RateLimit-* da API")
+    run.add_argument("--trace", action="store_true", help="Grava _trace.jsonl (tempos de cada request) e _metrics.prom (Prometheus) no fim")
+    run.add_argument("--metrics-port", type=int, help="Serve /metrics (Prometheus) nesta porta durante a execução")
+    run.add_argument("--metrics-host", help="Interface do /metrics (padrão 127.0.0.1; 0.0.0.0 expõe em todas)")
+    run.add_argument("--engine", choices=["threads","async"], help="Engine HTTP do Grupo B: threads (requests) ou async (aiohttp)")
+    run.add_argument("--adaptive", action="store_true", help="Limite adaptativo (AIMD) de requests em voo, guiado por latência e 429/5xx")
+    run.add_argument("--max-concurrency", type=int, help="Teto do limite adaptativo")
+    run.add_argument("--delta", action="store_true", help="Grupo B só para imóveis/contribuintes novos ou alterados desde a última execução")
+    run.add_argument("--b-window", type=int, help="Jobs do Grupo B em aberto ao mesmo tempo (padrão: 4 × concorrência)")
+    run.add_argument("--dedupe", choices=["record","key","off"], help="Dedupe do Grupo B: registro inteiro (padrão), chave natural (key_of + pai) ou off")
+    run.add_argument("--dedupe-a", choices=["record","key","off"], help="Dedupe do Grupo A, para APIs que repetem registros entre páginas (padrão: off)")
+    run.add_argument("--audit-format", choices=["csv","csv.gz","off"], help="Formato da auditoria: csv (padrão), csv.gz ou off")
+    run.add_argument("--progress-hz", type=float, help="Atualizações por segundo do progresso do Grupo B (0 = a cada job)")
+    run.add_argument("--cache", action="store_true", help="Cache local de respostas HTTP (TTL + revalidação ETag/Last-Modified)")
+    run.add_argument("--cache-ttl", type=float, help="Segundos em que uma resposta do cache vale sem revalidar")
+    run.add_argument("--cache-max-mb", type=int, help="Tamanho máximo do cache (LRU)")
+    run.add_argument("--record", type=Path, help="Grava as respostas num corpus para o mock-server (replay)")
+    run.add_argument("--resume", action="store_true", help="Retoma uma execução interrompida a partir do _checkpoint.json")
+
+    batch = sub.add_parser("batch", help="Extrai vários municípios (tenants) de um manifesto, num processo só")
+    batch.add_argument("manifest", type=Path, help="Manifesto JSON com os tenants")
+    batch.add_argument("--group", choices=["A","B"], help="Extrai apenas um grupo em todos os tenants")
+    batch.add_argument("--output", type=Path, help="Diretório base (cada tenant grava em <base>/<nome>)")
+    batch.add_argument("--tenants", type=int, help="Tenants extraídos ao mesmo tempo")
+    batch.add_argument("--max-in-flight", type=int, help="Teto global de requests simultâneos, dividido entre os tenants em round-robin")
+    batch.add_argument("--resume", action="store_true", help="Retoma cada tenant a partir do seu _checkpoint.json")
+    batch.add_argument("--json-backend", choices=["auto","orjson","msgspec","stdlib"], help="Parser/encoder JSON (auto: orjson, msgspec ou stdlib)")
+
+    mock = sub.add_parser("mock-server", help="Sobe a API Betha local (sintética ou replay de um corpus)")
+    mock.add_argument("--host", default="127.0.0.1")
+    mock.add_argument("--port", type=int, default=8000)
+    mock.add_argument("--corpus", type=Path, help="Diretório gravado com --record (replay); sem ele, dados sintéticos")
+    mock.add_argument("--imoveis", type=int, help="Imóveis sintéticos")
+    mock.add_argument("--contribuintes", type=int, help="Contribuintes sintéticos")
+    mock.add_argument("--latency", type=float, default=0.0, help="Latência por request (s)")
+    mock.add_argument("--error-rate", type=float, default=0.0, help="Fração dos requests com 5xx")
+    mock.add_argument("--throttle-rate", type=float, default=0.0, help="Fração dos requests com 429")
+    mock.add_argument("--retry-after", type=float, default=0.0, help="Retry-After (s) dos 429")
+    mock.add_argument("--quota", type=float, default=0.0, help="Cota em requests/s (janelas de 1 s, X-RateLimit-* e 429 acima dela)")
+    mock.add_argument("--seed", type=int, help="Semente das falhas injetadas (reprodutível)")
     return p
@@ -7,6 +7,9 @@ from dotenv import load_dotenv
 
 load_dotenv(dotenv_path=Path.cwd() / ".env", override=False)
 
+# threads: requests.Session + ThreadPoolExecutor; async: aiohttp num event loop
+ENGINES = ("threads", "async")
+
 @dataclass
 class Settings:
     base_url: str
@@ -16,6 +19,43 @@ class Settings:
     timeout_seconds: int = 10
     max_retries: int = 5
     concurrency: int = 8
+    page_workers: int = 1
+    endpoint_workers: int = 4
+    max_in_flight: int = 0                  # teto global de requests em voo (0 = sem limite)
+    rate_limit: float = 0.0                 # requests/s global (0 = sem limite)
+    rate_limits: str = ""                   # por padrão: "imoveis/*/proprietarios=20,bairros=5"
+    rate_burst: float = 1.0                 # rajada por balde (1 = requests espaçados)
+    rate_learn: bool = False                # ajusta as taxas por Retry-After/X-RateLimit-*
+    pipeline: bool = False
+    pipeline_queue: int = 1000
+    output_format: str = "json"
+    compression: str = "none"               # none | gzip | zstd
+    compression_level: Optional[int] = None
+    compression_threads: int = 0            # zstd
+    shard_rows: int = 0                     # saída em partes: registros por parte (0 = off)
+    shard_mb: int = 0                       # saída em partes: ~MB por parte (0 = off)
+    json_backend: str = "auto"              # auto | orjson | msgspec | stdlib
+    post_workers: int = 0                   # processos de pós-processamento do B (0 = off)
+    engine: str = "threads"
+    adaptive: bool = False
+    min_concurrency: int = 2
+    max_concurrency: int = 64
+    delta: bool = False
+    b_window: int = 0
+    dedupe: str = "record"
+    dedupe_a: str = "off"
+    audit_format: str = "csv"
+    progress_hz: float = 10.0
+    http_cache: bool = False
+    http_cache_dir: Optional[Path] = None   # padrão: OUTPUT_DIR/_http_cache
+    http_cache_ttl: float = 3600.0
+    http_cache_max_mb: int = 512
+    record_dir: Optional[Path] = None       # grava o corpus do mock (--record)
+    trace: bool = False                     # _trace.jsonl (um request por linha) + _metrics.prom
+    metrics_port: int = 0                   # /metrics (Prometheus) durante a execução (0 = off)
+    metrics_host: str = "127.0.0.1"         # interface do /metrics (0.0.0.0 = todas)
+    batch_tenants: int = 4                  # tenants extraídos ao mesmo tempo (batch)
+    batch_in_flight: int = 64               # teto global de requests em voo (batch)
     output_dir: Path = Path("./exports")
 
 def _read_workflow_headers(path: Path) -> tuple[Optional[str], Optional[str]]:
@@ -48,7 +88,9 @@ def _read_workflow_headers(path: Path) -> tuple[Optional[str], Optional[str]]:
                 return ua, auth
     return None, None
 
-def load_settings() -> Settings:
+def load_settings(require_credentials: bool = True) -> Settings:
+    """Settings do ambiente/.env. Sem `require_credentials` (modo batch, em
+    que cada tenant traz as suas) as credenciais podem ficar vazias."""
     base_url = os.getenv("BETHA_BASE_URL", "https://tributos.suite.betha.cloud/dados/v1").rstrip("/")
     user_access = os.getenv("BETHA_USER_ACCESS")
     bearer = os.getenv("BETHA_BEARER")
@@ -60,23 +102,97 @@ def load_settings() -> Settings:
             user_access = user_access or ua
             bearer = bearer or auth
 
-    if not user_access or not bearer:
+    if require_credentials and (not user_access or not bearer):
         raise RuntimeError("Credenciais ausentes. Defina BETHA_USER_ACCESS e BETHA_BEARER no .env ou informe WORKFLOW_JSON.")
 
     page_limit = int(os.getenv("PAGE_LIMIT", "200"))
     timeout_seconds = int(os.getenv("REQUEST_TIMEOUT_SECONDS", "10"))
     max_retries = int(os.getenv("MAX_RETRIES", "5"))
     concurrency = int(os.getenv("CONCURRENCY", "8"))
+    page_workers = int(os.getenv("PAGE_WORKERS", "1"))
+    endpoint_workers = int(os.getenv("ENDPOINT_WORKERS", "4"))
+    max_in_flight = int(os.getenv("MAX_IN_FLIGHT", "0"))
+    rate_limit = float(os.getenv("RATE_LIMIT", "0"))
+    rate_limits = os.getenv("RATE_LIMITS", "").strip()
+    rate_burst = float(os.getenv("RATE_BURST", "1"))
+    rate_learn = os.getenv("RATE_LEARN", "0").strip().lower() in ("1", "true", "yes", "sim")
+    pipeline = os.getenv("PIPELINE", "0").strip().lower() in ("1", "true", "yes", "sim")
+    pipeline_queue = int(os.getenv("PIPELINE_QUEUE", "1000"))
+    output_format = os.getenv("OUTPUT_FORMAT", "json").strip().lower()
+    compression = os.getenv("OUTPUT_COMPRESSION", "none").strip().lower()
+    compression_level = int(os.getenv("COMPRESSION_LEVEL")) if os.getenv("COMPRESSION_LEVEL") else None
+    compression_threads = int(os.getenv("COMPRESSION_THREADS", "0"))
+    shard_rows = int(os.getenv("OUTPUT_SHARD_ROWS", "0"))
+    shard_mb = int(os.getenv("OUTPUT_SHARD_MB", "0"))
+    json_backend = os.getenv("JSON_BACKEND", "auto").strip().lower()
+    post_workers = int(os.getenv("POST_WORKERS", "0"))
+    engine = os.getenv("ENGINE", "threads").strip().lower()
+    adaptive = os.getenv("ADAPTIVE_CONCURRENCY", "0").strip().lower() in ("1", "true", "yes", "sim")
+    min_concurrency = int(os.getenv("MIN_CONCURRENCY", "2"))
+    max_concurrency = int(os.getenv("MAX_CONCURRENCY", "64"))
+    delta = os.getenv("DELTA", "0").strip().lower() in ("1", "true", "yes", "sim")
+    b_window = int(os.getenv("GROUP_B_WINDOW", "0"))
+    dedupe = os.getenv("DEDUPE", "record").strip().lower()
+    dedupe_a = os.getenv("DEDUPE_A", "off").strip().lower()
+    audit_format = os.getenv("AUDIT_FORMAT", "csv").strip().lower()
+    progress_hz = float(os.getenv("PROGRESS_HZ", "10"))
+    http_cache = os.getenv("HTTP_CACHE", "0").strip().lower() in ("1", "true", "yes", "sim")
+    http_cache_dir = Path(os.getenv("HTTP_CACHE_DIR")).resolve() if os.getenv("HTTP_CACHE_DIR") else None
+    http_cache_ttl = float(os.getenv("HTTP_CACHE_TTL", "3600"))
+    http_cache_max_mb = int(os.getenv("HTTP_CACHE_MAX_MB", "512"))
+    record_dir = Path(os.getenv("RECORD_DIR")).resolve() if os.getenv("RECORD_DIR") else None
+    trace = os.getenv("TRACE", "0").strip().lower() in ("1", "true", "yes", "sim")
+    metrics_port = int(os.getenv("METRICS_PORT", "0"))
+    metrics_host = os.getenv("METRICS_HOST", "127.0.0.1").strip() or "127.0.0.1"
+    batch_tenants = int(os.getenv("BATCH_TENANTS", "4"))
+    batch_in_flight = int(os.getenv("BATCH_MAX_IN_FLIGHT", "64"))
     output_dir = Path(os.getenv("OUTPUT_DIR", "./exports")).resolve()
     output_dir.mkdir(parents=True, exist_ok=True)
 
     return Settings(
         base_url=base_url,
-        user_access=user_access,
-        bearer=bearer,
+        user_access=user_access or "",
+        bearer=bearer or "",
         page_limit=page_limit,
         timeout_seconds=timeout_seconds,
         max_retries=max_retries,
         concurrency=concurrency,
+        page_workers=page_workers,
+        endpoint_workers=endpoint_workers,
+        max_in_flight=max_in_flight,
+        rate_limit=rate_limit,
+        rate_limits=rate_limits,
+        rate_burst=rate_burst,
+        rate_learn=rate_learn,
+        pipeline=pipeline,
+        pipeline_queue=pipeline_queue,
+        output_format=output_format,
+        compression=compression,
+        compression_level=compression_level,
+        compression_threads=compression_threads,
+        shard_rows=shard_rows,
+        shard_mb=shard_mb,
+        json_backend=json_backend,
+        post_workers=post_workers,
+        engine=engine,
+        adaptive=adaptive,
+        min_concurrency=min_concurrency,
+        max_concurrency=max_concurrency,
+        delta=delta,
+        b_window=b_window,
+        dedupe=dedupe,
+        dedupe_a=dedupe_a,
+        audit_format=audit_format,
+        progress_hz=progress_hz,
+        http_cache=http_cache,
+        http_cache_dir=http_cache_dir,
+        http_cache_ttl=http_cache_ttl,
+        http_cache_max_mb=http_cache_max_mb,
+        record_dir=record_dir,
+        trace=trace,
+        metrics_port=metrics_port,
+        metrics_host=metrics_host,
+        batch_tenants=batch_tenants,
+        batch_in_flight=batch_in_flight,
         output_dir=output_dir,
     )
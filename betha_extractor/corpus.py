@@ -0,0 +1,82 @@
+from __future__ import annotations
+import gzip
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlencode, urlparse
+
+CORPUS_FILE = "corpus.jsonl.gz"
+# parâmetro anti-cache do HttpClient: muda a cada request, fica fora da chave
+_VOLATILE = ("_ts",)
+
+
+def corpus_key(path: str, params: Iterable[Tuple[str, Any]]) -> str:
+    """Caminho relativo à BASE_URL + query ordenada, sem `_ts`."""
+    items = sorted((str(k), str(v)) for k, v in params if k not in _VOLATILE)
+    path = "/" + path.lstrip("/")
+    return f"{path}?{urlencode(items)}" if items else path
+
+
+class CorpusRecorder:
+    """Grava as respostas do HttpClient/AsyncHttpClient em
+    `<dir>/corpus.jsonl.gz`, uma linha `{"k": chave, "s": status, "b": corpo}`
+    por request distinto. Repetições (retomada, retries do extrator) não
+    entram de novo."""
+
+    def __init__(self, directory: Path, base_url: str):
+        self.directory = directory
+        self.base_url = base_url.rstrip("/")
+        self.path = directory / CORPUS_FILE
+        self.recorded = 0
+        directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # corpus já existente: continua nele (um membro gzip novo)
+        self._seen = set(load_corpus(directory)) if self.path.exists() else set()
+        self._out = gzip.open(self.path, "ab", compresslevel=6)
+
+    def _relative(self, url: str) -> str:
+        if url.startswith(self.base_url):
+            return url[len(self.base_url):] or "/"
+        return urlparse(url).path
+
+    def record(self, url: str, params: Optional[Dict[str, Any]], status: int, body: bytes) -> None:
+        # 429/5xx que sobraram dos retries não são dados: o replay injeta os seus
+        if status == 429 or status >= 500:
+            return
+        key = corpus_key(self._relative(url), (params or {}).items())
+        line = json.dumps(
+            {"k": key, "s": status, "b": body.decode("utf-8", errors="replace")},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        with self._lock:
+            if key in self._seen or self._out is None:
+                return
+            self._seen.add(key)
+            self._out.write(line.encode("utf-8") + b"\n")
+            self.recorded += 1
+
+    def close(self) -> None:
+        with self._lock:
+            if self._out is not None:
+                self._out.close()
+                self._out = None
+
+
+def load_corpus(directory: Path) -> Dict[str, Tuple[int, bytes]]:
+    """chave -> (status, corpo). Tolera o fim truncado de uma gravação
+    interrompida."""
+    out: Dict[str, Tuple[int, bytes]] = {}
+    path = directory / CORPUS_FILE
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    break
+                out[rec["k"]] = (int(rec["s"]), rec["b"].encode("utf-8"))
+    except (EOFError, gzip.BadGzipFile):
+        pass
+    return out
@@ -0,0 +1,67 @@
+from __future__ import annotations
+import hashlib
+import json
+from typing import Any, Iterable, List, Optional, Set
+
+from .pagination import key_of
+
+# record: registro inteiro (forma canônica); key: chave natural (key_of + pai);
+# off: não deduplica
+DEDUPE_MODES = ("record", "key", "off")
+
+# um encoder só: json.dumps com kwargs monta um novo a cada chamada
+_CANONICAL = json.JSONEncoder(ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+def fingerprint(rec: Any) -> bytes:
+    """Hash de 16 bytes da forma canônica do registro (chaves ordenadas,
+    sem espaços): a ordem das chaves na API não muda o resultado e valores
+    aninhados não precisam ser comparáveis."""
+    raw = _CANONICAL.encode(rec)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).digest()
+
+
+def natural_key(rec: Any) -> Optional[bytes]:
+    """key_of do registro + `_parent_id` (Grupo B); None se não houver chave."""
+    k = key_of(rec)
+    if not k:
+        return None
+    parent = rec.get("_parent_id") if isinstance(rec, dict) else None
+    raw = k if parent is None else f"{parent}\x1f{k}"
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).digest()
+
+
+class Deduper:
+    """Dedupe incremental, na ordem de chegada: guarda só o hash de 16 bytes
+    de cada registro visto. Um por arquivo de saída; não é thread-safe."""
+
+    def __init__(self, mode: str = "record"):
+        if mode not in DEDUPE_MODES:
+            raise ValueError(f"Dedupe inválido: {mode} (use {', '.join(DEDUPE_MODES)})")
+        self.mode = mode
+        self.seen: Set[bytes] = set()
+        self.dropped = 0
+
+    def _key(self, rec: Any) -> bytes:
+        if self.mode == "key":
+            k = natural_key(rec)
+            if k is not None:
+                return k
+        # sem chave natural, cai para o registro inteiro
+        return fingerprint(rec)
+
+    def add(self, rec: Any) -> bool:
+        """True se o registro é novo (e passa a ser conhecido)."""
+        if self.mode == "off":
+            return True
+        k = self._key(rec)
+        if k in self.seen:
+            self.dropped += 1
+            return False
+        self.seen.add(k)
+        return True
+
+    def filter(self, rows: Iterable[Any]) -> List[Any]:
+        if self.mode == "off":
+            return list(rows)
+        return [r for r in rows if self.add(r)]
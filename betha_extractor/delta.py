@@ -0,0 +1,197 @@
+from __future__ import annotations
+import os
+import shutil
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, IO, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .dedupe import fingerprint
+from .endpoints import GROUP_B_CHILDREN, PARENT_ID
+from .pagination import key_of
+from .writers import find_output, read_rows
+
+DELTA_DIR = "_delta"
+
+
+def record_hash(rec: Any) -> str:
+    """Hash do conteúdo do registro (o mesmo fingerprint do dedupe)."""
+    return fingerprint(rec).hex()
+
+
+@dataclass
+class DeltaStats:
+    new: int = 0
+    changed: int = 0
+    unchanged: int = 0
+    removed: int = 0
+    carried: int = 0
+
+
+class _ParentState:
+    def __init__(self, previous: Dict[str, str], usable: bool):
+        # previous vai sendo consumido; o que sobrar no fim foi removido na API
+        self.previous = previous
+        self.usable = usable
+        self.seen: Set[str] = set()
+        self.unchanged_ids: Set[str] = set()
+        self.stats = DeltaStats()
+        self.out: Optional[IO[str]] = None
+
+
+class DeltaTracker:
+    """Compara os registros dos pais do Grupo B (imoveis, contribuintes) com o
+    snapshot de hashes da execução anterior (`_delta/<pai>.tsv`, chave de
+    `key_of`). Só novos e alterados geram jobs; os filhos dos inalterados são
+    copiados da saída anterior (coluna `_parent_id`)."""
+
+    def __init__(self, output_dir: Path):
+        self.output_dir = output_dir
+        self.dir = output_dir / DELTA_DIR
+        self._lock = threading.Lock()
+        self._parents: Dict[str, _ParentState] = {}
+
+    def _previous(self, child: str) -> Optional[Path]:
+        """Saída anterior de um filho. Em partes (diretório), a saída nova
+        reaproveita o diretório: a anterior vai para `_delta/<filho>.prev`
+        antes de o Grupo B gravar, e fica lá até o commit()."""
+        prev = self.dir / f"{child}.prev"
+        if prev.exists():
+            return prev
+        path = find_output(self.output_dir, child)
+        if path is not None and path.is_dir():
+            self.dir.mkdir(parents=True, exist_ok=True)
+            os.replace(path, prev)
+            return prev
+        return path
+
+    def _children_usable(self, parent: str) -> bool:
+        # sem a saída anterior (ou sem _parent_id nela) não há o que copiar
+        for child in GROUP_B_CHILDREN.get(parent, ()):
+            path = self._previous(child)
+            if path is None:
+                return False
+            first = next(read_rows(path), None)
+            if first is not None and not (isinstance(first, dict) and "_parent_id" in first):
+                return False
+        return True
+
+    def _load(self, parent: str) -> _ParentState:
+        previous: Dict[str, str] = {}
+        path = self.dir / f"{parent}.tsv"
+        if path.exists():
+            with path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    k, _, h = line.rstrip("\n").partition("\t")
+                    if k:
+                        previous[k] = h
+        usable = bool(previous) and self._children_usable(parent)
+        state = _ParentState(previous, usable)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        state.out = (self.dir / f"{parent}.tsv.part").open("w", encoding="utf-8")
+        return state
+
+    def _state(self, parent: str) -> _ParentState:
+        state = self._parents.get(parent)
+        if state is None:
+            state = self._parents[parent] = self._load(parent)
+        return state
+
+    def changed(self, parent: str, rows: Iterable[dict]) -> Iterator[dict]:
+        """Filtra os registros que precisam de jobs do Grupo B (novos/alterados)."""
+        if parent not in PARENT_ID:
+            yield from rows
+            return
+        id_of: Callable[[Any], Optional[str]] = PARENT_ID[parent]
+        for rec in rows:
+            if self._fresh(parent, id_of(rec), key_of(rec), record_hash(rec)):
+                yield rec
+
+    def changed_ids(self, parent: str, entries: Iterable[Tuple[str, str, str]]) -> Iterator[str]:
+        """Como `changed`, mas a partir do índice `_ids/` com hashes:
+        (id, key_of, hash) de cada registro, sem reler o registro."""
+        for _id, key, h in entries:
+            if self._fresh(parent, _id, key, h):
+                yield _id
+
+    def _fresh(self, parent: str, _id: Optional[str], key: str, h: str) -> bool:
+        with self._lock:
+            state = self._state(parent)
+            if not key:
+                state.stats.new += 1
+                return True
+            if key in state.seen:
+                # repetido entre páginas: já decidido na primeira vez
+                return False
+            state.seen.add(key)
+            state.out.write(f"{key}\t{h}\n")
+            old = state.previous.pop(key, None)
+            if old is None:
+                state.stats.new += 1
+                return True
+            if old != h or not state.usable:
+                state.stats.changed += 1
+                return True
+            state.stats.unchanged += 1
+            if _id:
+                state.unchanged_ids.add(_id)
+            return False
+
+    def changed_map(self, a_data: Dict[str, Iterable[dict]]) -> Dict[str, Iterable[dict]]:
+        return {k: self.changed(k, rows) for k, rows in a_data.items()}
+
+    def changed_ids_map(
+        self, a_ids: Dict[str, Iterable[Tuple[str, str, str]]]
+    ) -> Dict[str, Iterable[str]]:
+        return {k: self.changed_ids(k, entries) for k, entries in a_ids.items()}
+
+    def carry_over(self, endpoint: str) -> Iterator[dict]:
+        """Linhas da saída anterior de um filho cujos pais não mudaram."""
+        parent = next((p for p, cs in GROUP_B_CHILDREN.items() if endpoint in cs), None)
+        with self._lock:
+            state = self._parents.get(parent) if parent else None
+            keep = set(state.unchanged_ids) if state is not None else set()
+        if not keep:
+            return
+        path = self._previous(endpoint)
+        if path is None:
+            return
+        n = 0
+        for row in read_rows(path):
+            if isinstance(row, dict) and str(row.get("_parent_id")) in keep:
+                n += 1
+                yield row
+        with self._lock:
+            state.stats.carried += n
+
+    def children(self) -> List[str]:
+        with self._lock:
+            return [c for p in self._parents for c in GROUP_B_CHILDREN.get(p, ())]
+
+    def stats(self) -> Dict[str, DeltaStats]:
+        with self._lock:
+            out = {}
+            for parent, state in self._parents.items():
+                state.stats.removed = len(state.previous)
+                out[parent] = state.stats
+            return out
+
+    def commit(self) -> None:
+        """Troca o snapshot pelo desta execução (só depois do Grupo B concluir)."""
+        with self._lock:
+            for parent, state in self._parents.items():
+                if state.out is None:
+                    continue
+                state.out.close()
+                state.out = None
+                os.replace(self.dir / f"{parent}.tsv.part", self.dir / f"{parent}.tsv")
+                for child in GROUP_B_CHILDREN.get(parent, ()):
+                    shutil.rmtree(self.dir / f"{child}.prev", ignore_errors=True)
+
+    def discard(self) -> None:
+        with self._lock:
+            for parent, state in self._parents.items():
+                if state.out is not None:
+                    state.out.close()
+                    state.out = None
+                (self.dir / f"{parent}.tsv.part").unlink(missing_ok=True)
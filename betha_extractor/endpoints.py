@@ -1,5 +1,7 @@
 from __future__ import annotations
-from typing import Dict, Iterable, List, Any
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, Any, List, Optional, Tuple
+from .pagination import next_page_state, pick_rows
 
 # Grupo A: endpoints independentes
 GROUP_A: Dict[str, str] = {
@@ -13,7 +15,7 @@ GROUP_A: Dict[str, str] = {
     "contribuintes": "contribuintes",
 }
 
-# Grupo B: fabricas de URLs a partir de registros do Grupo A
+# ids dos registros pais do Grupo B
 def id_of_imovel(obj: Any) -> str | None:
     for k in ("id","idImovel","id_imovel","codigo"):
         v = obj.get(k) if isinstance(obj, dict) else None
@@ -28,30 +30,100 @@ def id_of_contribuinte(obj: Any) -> str | None:
             return str(v)
     return None
 
-def build_group_b_jobs(base_url: str, a_data: Dict[str, List[dict]]) -> List[dict]:
-    jobs: List[dict] = []
+# id do pai usado nas URLs (e na coluna _parent_id das saídas do Grupo B)
+PARENT_ID = {
+    "imoveis": id_of_imovel,
+    "contribuintes": id_of_contribuinte,
+}
 
-    # imoveis → proprietarios, testadas, campos-adicionais
-    for rec in a_data.get("imoveis", []):
-        _id = id_of_imovel(rec)
-        if not _id:
-            continue
-        jobs.append({
-            "endpoint": "imoveis_proprietarios",
-            "url": f"{base_url}/imoveis/{_id}/proprietarios",
-        })
-        jobs.append({
-            "endpoint": "imoveis_campos_adicionais",
-            "url": f"{base_url}/imoveis/{_id}/campos-adicionais",
-        })
-
-    # contribuintes → enderecos
-    for rec in a_data.get("contribuintes", []):
-        _id = id_of_contribuinte(rec)
+@dataclass(frozen=True)
+class ChildEndpoint:
+    """Endpoint do Grupo B: `path` recebe o id do pai em `{id}`."""
+    name: str
+    parent: str
+    path: str
+
+# Grupo B: endpoints dependentes, um job (com paginação própria) por pai
+GROUP_B: Tuple[ChildEndpoint, ...] = (
+    ChildEndpoint("imoveis_proprietarios", "imoveis", "imoveis/{id}/proprietarios"),
+    ChildEndpoint("imoveis_testadas", "imoveis", "imoveis/{id}/testadas"),
+    ChildEndpoint("imoveis_campos_adicionais", "imoveis", "imoveis/{id}/campos-adicionais"),
+    ChildEndpoint("contribuintes_enderecos", "contribuintes", "contribuintes/{id}/enderecos"),
+)
+
+# Endpoints do Grupo A que alimentam o Grupo B
+GROUP_B_PARENTS: Tuple[str, ...] = tuple(dict.fromkeys(c.parent for c in GROUP_B))
+
+# saídas do Grupo B geradas por cada pai
+GROUP_B_CHILDREN: Dict[str, Tuple[str, ...]] = {
+    p: tuple(c.name for c in GROUP_B if c.parent == p) for p in GROUP_B_PARENTS
+}
+
+def child_rows(job: dict, body: Any) -> List[Any]:
+    """Linhas de uma página do Grupo B, com o id do pai em `_parent_id`
+    (necessário para o modo delta)."""
+    rows = pick_rows(body) if body is not None else []
+    parent = job.get("parent")
+    if parent is None:
+        return rows
+    return [{**r, "_parent_id": parent} if isinstance(r, dict) else r for r in rows]
+
+def next_child_job(job: dict, body: Any, limit: int) -> Optional[dict]:
+    """Próxima página do mesmo job (mesma lógica de paginação do Grupo A)."""
+    if body is None:
+        return None
+    has_more, offset, page, seq, last_sig, _count = next_page_state(
+        body,
+        limit,
+        job.get("offset", 0),
+        job.get("page", 0),
+        job.get("seq", 1),
+        job.get("last_sig"),
+    )
+    if not has_more:
+        return None
+    return {**job, "offset": offset, "page": page, "seq": seq, "last_sig": last_sig}
+
+def jobs_for_ids(base_url: str, key: str, ids: Iterable[str]) -> Iterator[dict]:
+    """Jobs do Grupo B para os ids de um pai do Grupo A.
+    Cada job é a 1ª página; as seguintes voltam para a fila como novos jobs."""
+    children = [c for c in GROUP_B if c.parent == key]
+    if not children:
+        return
+    for _id in ids:
         if not _id:
             continue
-        jobs.append({
-            "endpoint": "contribuintes_enderecos",
-            "url": f"{base_url}/contribuintes/{_id}/enderecos",
-        })
-    return jobs
+        for c in children:
+            yield {
+                "endpoint": c.name,
+                "url": f"{base_url}/{c.path.format(id=_id)}",
+                "parent": _id,
+            }
+
+def jobs_for_rows(base_url: str, key: str, rows: Iterable[dict]) -> Iterator[dict]:
+    """Jobs do Grupo B gerados pelos registros de um endpoint do Grupo A."""
+    id_of = PARENT_ID.get(key)
+    if id_of is None:
+        return
+    yield from jobs_for_ids(base_url, key, (id_of(rec) for rec in rows))
+
+def build_group_b_jobs(
+    base_url: str,
+    a_data: Dict[str, Iterable[dict]],
+    a_ids: Optional[Dict[str, Iterable[str]]] = None,
+) -> Iterator[dict]:
+    """Gerador: os jobs saem conforme o executor pede, nunca todos em memória.
+    Pais presentes em `a_ids` usam o índice de ids em vez dos registros."""
+    a_ids = a_ids or {}
+    for key in GROUP_B_PARENTS:
+        if key in a_ids:
+            yield from jobs_for_ids(base_url, key, a_ids[key])
+        else:
+            yield from jobs_for_rows(base_url, key, a_data.get(key, ()))
+
+def count_group_b_jobs(parent_counts: Dict[str, int]) -> int:
+    """Total de jobs esperado a partir da quantidade de registros de cada pai
+    (registros sem id não geram job, então é um teto)."""
+    return sum(
+        parent_counts.get(p, 0) * len(children) for p, children in GROUP_B_CHILDREN.items()
+    )
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List, Dict, Any
 from pathlib import Path
 from ..http_client import HttpClient
@@ -7,8 +7,10 @@ from ..http_client import HttpClient
 @dataclass
 class ExtractResult:
     endpoint: str
-    records: List[dict]
-    path: Path
+    # vazio quando a saída é gravada em streaming (ver writers.RowSink)
+    records: List[dict] = field(default_factory=list)
+    path: Path | None = None
+    count: int = 0
 
 class BaseExtractor:
     def __init__(self, client: HttpClient):
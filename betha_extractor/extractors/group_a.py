@@ -1,94 +1,318 @@
 from __future__ import annotations
-from typing import Dict, List, Any, Tuple, Callable, Optional
+from typing import Dict, List, Any, Tuple, Callable, Optional, Iterator, Iterable
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
+from collections import deque
+from .. import jsonlib
 from ..http_client import HttpClient
-from ..pagination import pick_rows, next_page_state
-from ..writers import write_json
+from ..pagination import pick_rows, next_page_state, total_of
+from ..writers import (
+    NO_COMPRESSION,
+    NO_SHARDING,
+    Compression,
+    Sharding,
+    open_sink,
+    output_path,
+    read_counts,
+    read_rows,
+    write_counts,
+)
+from ..checkpoint import CheckpointStore
+from ..dedupe import DEDUPE_MODES, Deduper
+from ..endpoints import PARENT_ID
+from ..ids import IdIndexWriter
+from .base import ExtractResult
 from ..audit import Auditor, AuditRow, now_iso
 
 # Tipo do callback de progresso:
 # progress_cb(endpoint: str, page_index: int, fetched: int, accumulated: int, total_hint: Optional[int], percent: Optional[float]) -> None
 ProgressCB = Callable[[str, int, int, int, Optional[int], Optional[float]], None]
+# done_cb(key: str, result: ExtractResult) -> None, chamado quando um endpoint termina
+DoneCB = Callable[[str, ExtractResult], None]
+# rows_cb(key: str, rows: List[dict]) -> None, chamado a cada página recebida
+RowsCB = Callable[[str, List[dict]], None]
+
+_END = object()
+
+
+def _chunks(rows: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    buf: List[Any] = []
+    for r in rows:
+        buf.append(r)
+        if len(buf) >= size:
+            yield buf
+            buf = []
+    if buf:
+        yield buf
 
 
 class GroupAExtractor:
-    def __init__(self, client: HttpClient, output_dir, limit: int):
+    def __init__(
+        self,
+        client: HttpClient,
+        output_dir,
+        limit: int,
+        page_workers: int = 1,
+        endpoint_workers: int = 1,
+        fmt: str = "json",
+        checkpoint: Optional[CheckpointStore] = None,
+        dedupe: str = "off",
+        compression: Compression = NO_COMPRESSION,
+        sharding: Sharding = NO_SHARDING,
+        id_hashes: bool = False,
+    ):
         self.client = client
         self.output_dir = output_dir
         self.limit = limit
+        # page_workers > 1 liga o modo paralelo quando a API informa o total
+        self.page_workers = max(1, page_workers)
+        # endpoints extraídos ao mesmo tempo (o teto global fica no HttpClient)
+        self.endpoint_workers = max(1, endpoint_workers)
+        self.fmt = fmt
+        # com checkpoint, cada página gravada atualiza o cursor do endpoint
+        self.checkpoint = checkpoint
+        # APIs que repetem registros entre páginas (offset instável)
+        if dedupe not in DEDUPE_MODES:
+            raise ValueError(f"Dedupe inválido: {dedupe} (use {', '.join(DEDUPE_MODES)})")
+        self.dedupe = dedupe
+        self.compression = compression
+        # saída em partes (<endpoint>/part-*.ext + _manifest.json)
+        self.sharding = sharding
+        # --delta: o índice de ids leva também chave e hash de cada pai
+        self.id_hashes = id_hashes
         self.auditor = Auditor(output_dir)
 
+    def _limit(self) -> Optional[int]:
+        limiter = getattr(self.client, "limiter", None)
+        return limiter.limit if limiter is not None else None
+
+    def _get_page(self, endpoint: str, offset: int, page: int) -> Any:
+        params = {
+            "limit": self.limit,
+            "offset": offset,
+            "page": page,
+            "size": self.limit,
+        }
+        resp = self.client.get(endpoint, params=params)
+        resp.raise_for_status()
+        return jsonlib.response_json(resp)
+
+    def _prefetch(
+        self, ex: ThreadPoolExecutor, endpoint: str, windows: List[Tuple[int, int]]
+    ) -> Iterator[Any]:
+        # Janela limitada de requests em voo; os corpos saem na ordem das páginas
+        ahead = self.page_workers * 2
+        todo = deque(windows)
+        inflight: deque[Future] = deque()
+        while todo or inflight:
+            while todo and len(inflight) < ahead:
+                offset, page = todo.popleft()
+                inflight.append(ex.submit(self._get_page, endpoint, offset, page))
+            yield inflight.popleft().result()
+
+    def iter_pages(
+        self, endpoint: str, progress_cb: Optional[ProgressCB] = None
+    ) -> Iterator[List[dict]]:
+        for rows, _cursor in self._iter_pages(endpoint, progress_cb):
+            yield rows
+
+    def _iter_pages(
+        self,
+        endpoint: str,
+        progress_cb: Optional[ProgressCB] = None,
+        start: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[Tuple[List[dict], Dict[str, Any]]]:
+        """Páginas junto com o cursor para continuar *depois* delas
+        (o que vai para o checkpoint); `start` retoma de um cursor salvo."""
+        start = start or {}
+        accumulated = int(start.get("accumulated", 0))
+        offset = int(start.get("offset", 0))
+        page = int(start.get("page", 0))
+        file_seq = int(start.get("seq", 1))
+        last_sig = start.get("last_sig")
+        total_hint: Optional[int] = start.get("total_hint")
+        ex: Optional[ThreadPoolExecutor] = None
+        pending: Optional[Iterator[Any]] = None
+
+        try:
+            while True:
+                body = next(pending, _END) if pending is not None else _END
+                if body is _END:
+                    # sem janelas paralelas (ou já esgotadas): segue serial
+                    pending = None
+                    body = self._get_page(endpoint, offset, page)
+
+                # detectar total
+                total_hint = total_of(body) or total_hint
+
+                rows = pick_rows(body)
+                accumulated += len(rows)
+
+                percent = (
+                    (accumulated / total_hint * 100.0)
+                    if (total_hint and total_hint > 0)
+                    else None
+                )
+
+                # Audit + Progresso
+                self.auditor.write(
+                    AuditRow(
+                        ts=now_iso(),
+                        group="A",
+                        endpoint=endpoint,
+                        unit="page",
+                        index=file_seq,
+                        fetched=len(rows),
+                        accumulated=accumulated,
+                        total_hint=total_hint,
+                        percent=percent,
+                        file=output_path(self.output_dir, endpoint, self.fmt, self.compression, self.sharding).name,
+                        limit=self._limit(),
+                    )
+                )
+                if progress_cb:
+                    progress_cb(
+                        endpoint, file_seq, len(rows), accumulated, total_hint, percent
+                    )
+
+                # A assinatura anti-loop continua valendo mesmo nas páginas
+                # buscadas em paralelo (APIs que mentem sobre o total).
+                has_more, next_offset, next_page, next_seq, last_sig, _count = (
+                    next_page_state(body, self.limit, offset, page, file_seq, last_sig)
+                )
+                yield rows, {
+                    "offset": next_offset,
+                    "page": next_page,
+                    "seq": next_seq,
+                    "last_sig": last_sig,
+                    "accumulated": accumulated,
+                    "total_hint": total_hint,
+                    "has_more": has_more,
+                }
+
+                if not has_more:
+                    break
+                offset, page, file_seq = next_offset, next_page, next_seq
+
+                if ex is None and self.page_workers > 1 and total_hint:
+                    remaining = -(-(total_hint - offset) // self.limit)
+                    windows = [
+                        (offset + i * self.limit, page + i) for i in range(remaining)
+                    ]
+                    if windows:
+                        ex = ThreadPoolExecutor(max_workers=self.page_workers)
+                        pending = self._prefetch(ex, endpoint, windows)
+        finally:
+            if ex is not None:
+                ex.shutdown(wait=False, cancel_futures=True)
+
     def extract_one(
         self, endpoint: str, progress_cb: Optional[ProgressCB] = None
     ) -> Tuple[str, List[dict]]:
         acc: List[dict] = []
-        offset = 0
-        page = 0
-        file_seq = 1
-        last_sig = None
-        total_hint: Optional[int] = None
-
-        while True:
-            params = {
-                "limit": self.limit,
-                "offset": offset,
-                "page": page,
-                "size": self.limit,
-            }
-            resp = self.client.get(endpoint, params=params)
-            resp.raise_for_status()
-            body = resp.json()
-
-            # detectar total
-            if isinstance(body, dict):
-                for k in ("totalElements", "total", "totalItems", "totalCount"):
-                    if isinstance(body.get(k), int) and body[k] > 0:
-                        total_hint = body[k]
-                        break
-
-            rows = pick_rows(body)
+        for rows in self.iter_pages(endpoint, progress_cb=progress_cb):
             acc.extend(rows)
+        return endpoint, acc
 
-            percent = (
-                (len(acc) / total_hint * 100.0)
-                if (total_hint and total_hint > 0)
-                else None
-            )
-
-            # Audit + Progresso
-            self.auditor.write(
-                AuditRow(
-                    ts=now_iso(),
-                    group="A",
-                    endpoint=endpoint,
-                    unit="page",
-                    index=file_seq,
-                    fetched=len(rows),
-                    accumulated=len(acc),
-                    total_hint=total_hint,
-                    percent=percent,
-                    file=f"{endpoint}.json",
-                )
-            )
-            if progress_cb:
-                progress_cb(
-                    endpoint, file_seq, len(rows), len(acc), total_hint, percent
-                )
+    def order(self, endpoints: Dict[str, str]) -> Dict[str, str]:
+        """Maiores primeiro, pela contagem da execução anterior."""
+        counts = read_counts(self.output_dir)
+        keys = sorted(endpoints, key=lambda k: counts.get(k, 0), reverse=True)
+        return {k: endpoints[k] for k in keys}
 
-            has_more, next_offset, next_page, next_seq, last_sig, _count = (
-                next_page_state(body, self.limit, offset, page, file_seq, last_sig)
-            )
-            if not has_more:
-                break
-            offset, page, file_seq = next_offset, next_page, next_seq
+    def _extract_and_write(
+        self,
+        key: str,
+        path: str,
+        progress_cb: Optional[ProgressCB],
+        rows_cb: Optional[RowsCB] = None,
+    ) -> ExtractResult:
+        ck = self.checkpoint
+        entry = ck.a_entry(key) if ck is not None else None
+        final = output_path(self.output_dir, key, self.fmt, self.compression, self.sharding)
 
-        return endpoint, acc
+        # já concluído numa execução anterior: só reaproveita o arquivo
+        if entry and entry.get("done") and final.exists():
+            if rows_cb:
+                for rows in _chunks(read_rows(final), self.limit):
+                    rows_cb(key, rows)
+            return ExtractResult(endpoint=key, path=final, count=int(entry.get("count", 0)))
+
+        start: Optional[Dict[str, Any]] = None
+        resume_at = None
+        if entry and not entry.get("done"):
+            start = entry
+            resume_at = (int(entry["bytes"]), int(entry["count"]))
+
+        # cada página vai direto para o disco: memória ~ tamanho da página
+        sink = open_sink(
+            self.output_dir,
+            key,
+            self.fmt,
+            resume_at=resume_at,
+            compression=self.compression,
+            sharding=self.sharding,
+        )
+        if start is not None and sink.count != int(start["count"]):
+            # sem .part para retomar: recomeça do zero
+            start = None
+        dd = Deduper(self.dedupe)
+        # pais do Grupo B: índice de ids para o `--group B` não reler os registros
+        ids = IdIndexWriter(self.output_dir, key, self.id_hashes) if key in PARENT_ID else None
+        try:
+            if start is not None and (rows_cb or self.dedupe != "off" or ids is not None):
+                # o Grupo B (pipeline), o dedupe e o índice precisam ver o que já estava gravado
+                for rows in _chunks(sink.existing_rows(), self.limit):
+                    dd.filter(rows)
+                    if ids is not None:
+                        ids.write(rows)
+                    if rows_cb:
+                        rows_cb(key, rows)
+            if start is None or start.get("has_more", True):
+                for page_rows, cursor in self._iter_pages(path, progress_cb, start):
+                    page_rows = dd.filter(page_rows)
+                    sink.write(page_rows)
+                    if ids is not None:
+                        ids.write(page_rows)
+                    if ck is not None:
+                        ck.save_a(key, {**cursor, "bytes": sink.flush(), "count": sink.count, "done": False})
+                    if rows_cb:
+                        rows_cb(key, page_rows)
+            out_path = sink.close()
+            if ids is not None:
+                ids.close(out_path)
+        except BaseException:
+            sink.abort(keep=ck is not None)
+            if ids is not None:
+                ids.abort()
+            raise
+        if ck is not None:
+            ck.save_a(key, {"done": True, "count": sink.count})
+        write_counts(self.output_dir, {key: sink.count})
+        return ExtractResult(endpoint=key, path=out_path, count=sink.count)
 
     def run(
-        self, endpoints: Dict[str, str], progress_cb: Optional[ProgressCB] = None
-    ) -> Dict[str, List[dict]]:
-        out: Dict[str, List[dict]] = {}
-        for key, path in endpoints.items():
-            ep, rows = self.extract_one(path, progress_cb=progress_cb)
-            write_json(self.output_dir, key, rows)
-            out[key] = rows
-        return out
+        self,
+        endpoints: Dict[str, str],
+        progress_cb: Optional[ProgressCB] = None,
+        done_cb: Optional[DoneCB] = None,
+        rows_cb: Optional[RowsCB] = None,
+    ) -> Dict[str, ExtractResult]:
+        out: Dict[str, ExtractResult] = {}
+        ordered = self.order(endpoints)
+        ex = ThreadPoolExecutor(max_workers=self.endpoint_workers)
+        try:
+            fut_to_key = {
+                ex.submit(
+                    self._extract_and_write, key, path, progress_cb, rows_cb
+                ): key
+                for key, path in ordered.items()
+            }
+            for fut in as_completed(fut_to_key):
+                key = fut_to_key[fut]
+                out[key] = fut.result()
+                if done_cb:
+                    done_cb(key, out[key])
+        finally:
+            ex.shutdown(wait=True, cancel_futures=True)
+        # mantém a ordem do catálogo no retorno
+        return {k: out[k] for k in endpoints if k in out}
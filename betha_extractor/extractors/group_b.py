@@ -1,100 +1,762 @@
 from __future__ import annotations
-from typing import Dict, List, Optional, Callable
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Callable, Iterable, Iterator, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from pathlib import Path
+from .. import jsonlib
 from ..http_client import HttpClient
-from ..pagination import pick_rows
-from ..writers import write_json
-from ..endpoints import build_group_b_jobs
+from ..writers import (
+    NO_COMPRESSION,
+    NO_SHARDING,
+    Compression,
+    RowSink,
+    Sharding,
+    open_sink,
+    file_name,
+    output_path,
+    write_counts,
+)
+from ..checkpoint import CheckpointStore
+from ..delta import DeltaTracker
+from ..dedupe import DEDUPE_MODES, Deduper
+from ..metrics import Metrics, Throttle
+from ..endpoints import build_group_b_jobs, child_rows, count_group_b_jobs, next_child_job
 from ..audit import Auditor, AuditRow, now_iso
+from ..postproc import LINGER, MAIN_SHARD, SHARDS_DIR, PostStage, merge_shards, shard_codec, shard_sink
+from .base import ExtractResult
 
 # progress_cb(done_jobs: int, total_jobs: int, endpoint: str, fetched: int, accumulated_global: int, percent: Optional[float]) -> None
+# total_jobs == 0 quando o total ainda não é conhecido (modo pipeline);
+# done_jobs conta jobs com todas as páginas concluídas; o callback vem no máximo
+# `progress_hz` vezes por segundo (e uma última vez no fim)
 ProgressCB = Callable[[int, int, str, int, int, Optional[float]], None]
 
+_END = object()
+# uma fonte de jobs que não pode bloquear (fila do pipeline) produz IDLE
+# quando ainda não tem job pronto: o consumo segue colhendo respostas e
+# agendando continuações, e volta a pedir depois de até IDLE_WAIT s
+IDLE = object()
+IDLE_WAIT = 0.01
+# "endpoint" da lista de concluídos para a cópia do delta (pai = endpoint copiado)
+_CARRIED = "_delta"
+
+
+def _job_key(job: dict) -> Tuple[str, str]:
+    return job["endpoint"], str(job.get("parent"))
+
+
+class GroupBIncomplete(RuntimeError):
+    """Jobs do Grupo B falharam (erro de rede/HTTP depois dos retries): os
+    endpoints sem falhas são publicados (`results`); os demais ficam nos
+    `.part` e o checkpoint fica retomável sem os jobs que falharam."""
+
+    def __init__(self, failed: int, results: Optional[Dict[str, ExtractResult]] = None):
+        super().__init__(f"{failed} jobs do Grupo B falharam; rode de novo com --resume para buscá-los")
+        self.failed = failed
+        self.results = results or {}
+        # pipeline: o Grupo A da mesma execução, para o resumo
+        self.a_result: Dict[str, ExtractResult] = {}
+
+
+@dataclass
+class _RunState:
+    progress_cb: Optional[ProgressCB]
+    total_jobs: int
+    sinks: Dict[str, RowSink] = field(default_factory=dict)
+    dedupers: Dict[str, Deduper] = field(default_factory=dict)
+    done_jobs: int = 0
+    # jobs que falharam: fora do checkpoint, refeitos no --resume; os
+    # endpoints deles não são publicados
+    failed: int = 0
+    failed_endpoints: Set[str] = field(default_factory=set)
+    # publicados por uma execução anterior com falhas (--resume)
+    published: Dict[str, ExtractResult] = field(default_factory=dict)
+    # shards de worker dos endpoints retidos depois do fechamento do PostStage
+    held_refs: Dict[str, Any] = field(default_factory=dict)
+    accumulated: int = 0
+    # concluídos numa execução anterior (--resume): endpoint -> ids dos pais
+    skip: Dict[str, Set[str]] = field(default_factory=dict)
+    # jobs com páginas já gravadas: (endpoint, pai) -> próxima página
+    open: Dict[Tuple[str, str], dict] = field(default_factory=dict)
+    throttle: Throttle = field(default_factory=Throttle)
+    last: Optional[Tuple[str, int]] = None
+    # --post-workers: decode/dedupe/escrita em processos (postproc.PostStage)
+    stage: Optional[PostStage] = None
+
 
 class GroupBExtractor:
     def __init__(
-        self, client: HttpClient, output_dir, limit: int, concurrency: int = 8
+        self,
+        client: HttpClient,
+        output_dir,
+        limit: int,
+        concurrency: int = 8,
+        fmt: str = "json",
+        checkpoint: Optional[CheckpointStore] = None,
+        delta: Optional[DeltaTracker] = None,
+        window: int = 0,
+        dedupe: str = "record",
+        progress_hz: float = 10.0,
+        compression: Compression = NO_COMPRESSION,
+        post_workers: int = 0,
+        sharding: Sharding = NO_SHARDING,
     ):
         self.client = client
         self.output_dir = output_dir
         self.limit = limit
         self.concurrency = max(1, concurrency)
+        # jobs submetidos e ainda não consumidos; evita materializar a fila toda
+        self.window = window if window > 0 else self.concurrency * 4
+        self.fmt = fmt
+        self.checkpoint = checkpoint
+        # modo delta: só pais novos/alterados viram jobs, o resto é copiado
+        self.delta = delta
+        # dedupe por arquivo de saída: registro inteiro, chave natural ou off
+        if dedupe not in DEDUPE_MODES:
+            raise ValueError(f"Dedupe inválido: {dedupe} (use {', '.join(DEDUPE_MODES)})")
+        self.dedupe = dedupe
+        self.compression = compression
+        self.progress_hz = progress_hz
+        # > 0: respostas processadas em processos, saída em shards unidos no fim
+        self.post_workers = max(0, post_workers)
+        # saída em partes (<endpoint>/part-*.ext + _manifest.json)
+        self.sharding = sharding
+        # contadores por endpoint (jobs/pages/rows/bytes) da execução corrente
+        self.metrics = Metrics()
         self.auditor = Auditor(output_dir)
 
-    def _fetch(self, url: str) -> List[dict]:
-        resp = self.client.get(url, params={"limit": self.limit, "size": self.limit})
+    def _limit(self) -> Optional[int]:
+        limiter = getattr(self.client, "limiter", None)
+        return limiter.limit if limiter is not None else None
+
+    def _params(self, job: dict) -> Dict[str, int]:
+        return {
+            "limit": self.limit,
+            "offset": job.get("offset", 0),
+            "page": job.get("page", 0),
+            "size": self.limit,
+        }
+
+    def _body_of(self, resp) -> Tuple[Any, int]:
+        """(corpo, bytes do payload)."""
         # 404/204 podem ocorrer quando cadastro não existe
         if resp.status_code in (404, 204):
-            return []
+            return None, 0
+        resp.raise_for_status()
+        return jsonlib.response_json(resp), len(resp.content)
+
+    def _fetch(self, job: dict) -> Tuple[Any, int]:
+        return self._body_of(self.client.get(job["url"], params=self._params(job)))
+
+    def _fetch_raw(self, job: dict) -> Tuple[Optional[bytes], int]:
+        """(bytes do corpo, tamanho) sem decodificar: vai para o PostStage."""
+        resp = self.client.get(job["url"], params=self._params(job))
+        if resp.status_code in (404, 204):
+            return None, 0
         resp.raise_for_status()
-        return pick_rows(resp.json())
+        return resp.content, len(resp.content)
+
+    async def _fetch_async(self, aclient, job: dict) -> Tuple[Any, int]:
+        return self._body_of(await aclient.get(job["url"], params=self._params(job)))
+
+    def _next_job(self, job: dict, body: Any) -> Optional[dict]:
+        """Próxima página do mesmo job (mesma lógica de paginação do Grupo A)."""
+        return next_child_job(job, body, self.limit)
+
+    def _total(
+        self, group_a_data: Dict[str, Iterable[dict]], parent_counts: Optional[Dict[str, int]]
+    ) -> int:
+        # no delta só os alterados viram jobs: total desconhecido até o fim
+        if self.delta is not None:
+            return 0
+        if parent_counts is None:
+            if not all(isinstance(v, (list, tuple)) for v in group_a_data.values()):
+                return 0
+            parent_counts = {k: len(v) for k, v in group_a_data.items()}
+        return count_group_b_jobs(parent_counts)
+
+    def _jobs(
+        self,
+        group_a_data: Dict[str, Iterable[dict]],
+        base_url: str,
+        parent_ids: Optional[Dict[str, Iterable[Any]]],
+    ) -> Iterator[dict]:
+        # no delta, `parent_ids` traz (id, key_of, hash) do índice gravado pelo A
+        if self.delta is not None:
+            return build_group_b_jobs(
+                base_url,
+                self.delta.changed_map(group_a_data),
+                self.delta.changed_ids_map(parent_ids or {}),
+            )
+        return build_group_b_jobs(base_url, group_a_data, parent_ids)
 
     def run(
         self,
-        group_a_data: Dict[str, List[dict]],
+        group_a_data: Dict[str, Iterable[dict]],
         base_url: str,
         progress_cb: Optional[ProgressCB] = None,
-    ) -> Dict[str, List[dict]]:
-        jobs = build_group_b_jobs(base_url, group_a_data)
-        buckets: Dict[str, List[dict]] = {}
+        parent_counts: Optional[Dict[str, int]] = None,
+        parent_ids: Optional[Dict[str, Iterable[Any]]] = None,
+    ) -> Dict[str, ExtractResult]:
+        """`group_a_data` pode vir em streaming (registros lidos do disco);
+        `parent_counts` dá o total de jobs para o progresso sem materializá-los;
+        `parent_ids` (índice `_ids/` do Grupo A) substitui os registros do pai."""
+        total = self._total(group_a_data, parent_counts)
+        jobs = self._jobs(group_a_data, base_url, parent_ids)
+        return self.run_jobs(jobs, progress_cb=progress_cb, total_jobs=total)
 
-        total_jobs = len(jobs) if jobs else 0
-        done_jobs = 0
+    def run_jobs(
+        self,
+        jobs: Iterable[dict],
+        progress_cb: Optional[ProgressCB] = None,
+        total_jobs: int = 0,
+    ) -> Dict[str, ExtractResult]:
+        """Consome jobs de qualquer iterável (lista ou fila do pipeline A → B)."""
+        st = self._start(progress_cb, total_jobs)
+        if st is None:
+            return self._finished()
+        try:
+            if st.stage is not None:
+                self._drain_post(self._pending(jobs, st), st)
+            else:
+                self._drain(self._pending(jobs, st), st)
+            self._carry_over(st)
+        except BaseException:
+            self._abort(st)
+            raise
+        return self._finish(st)
 
-        with ThreadPoolExecutor(max_workers=self.concurrency) as ex:
-            fut_to_job = {ex.submit(self._fetch, j["url"]): j for j in jobs}
-            for fut in as_completed(fut_to_job):
-                job = fut_to_job[fut]
-                endpoint = job["endpoint"]
+    def run_async(
+        self,
+        aclient,
+        group_a_data: Dict[str, Iterable[dict]],
+        base_url: str,
+        progress_cb: Optional[ProgressCB] = None,
+        parent_counts: Optional[Dict[str, int]] = None,
+        parent_ids: Optional[Dict[str, Iterable[Any]]] = None,
+    ) -> Dict[str, ExtractResult]:
+        total = self._total(group_a_data, parent_counts)
+        jobs = self._jobs(group_a_data, base_url, parent_ids)
+        return asyncio.run(
+            self.run_jobs_async(
+                aclient, jobs, progress_cb=progress_cb, total_jobs=total
+            )
+        )
+
+    async def run_jobs_async(
+        self,
+        aclient,
+        jobs: Iterable[dict],
+        progress_cb: Optional[ProgressCB] = None,
+        total_jobs: int = 0,
+    ) -> Dict[str, ExtractResult]:
+        """Mesmo contrato do run_jobs, num único event loop: `concurrency`
+        corrotinas em vez de threads."""
+        st = self._start(progress_cb, total_jobs)
+        if st is None:
+            return self._finished()
+        # fila única (FIFO) para 1as páginas e continuações; `room` limita os
+        # jobs abertos, já que a fila em si não pode bloquear as continuações
+        queue: asyncio.Queue = asyncio.Queue()
+        room = asyncio.Semaphore(self.window)
+        pending: Iterator[dict] = self._pending(jobs, st)
+        open_jobs = 0
+        fed_all = False
+
+        def stop() -> None:
+            for _ in range(self.concurrency):
+                queue.put_nowait(_END)
+
+        async def feed() -> None:
+            nonlocal open_jobs, fed_all
+            while True:
+                await room.acquire()
+                job = next(pending, _END)
+                if job is IDLE:
+                    room.release()
+                    await asyncio.sleep(IDLE_WAIT)
+                    continue
+                if job is _END:
+                    room.release()
+                    break
+                open_jobs += 1
+                queue.put_nowait(job)
+            fed_all = True
+            if open_jobs == 0:
+                stop()
+
+        async def worker() -> None:
+            nonlocal open_jobs
+            while True:
+                job = await queue.get()
+                if job is _END:
+                    return
                 try:
-                    rows = fut.result()
-                except Exception:
-                    rows = []
-
-                if endpoint not in buckets:
-                    buckets[endpoint] = []
-                buckets[endpoint].extend(rows)
-
-                # Audit + progresso (percent global por jobs)
-                done_jobs += 1
-                percent = (done_jobs / total_jobs * 100.0) if total_jobs else None
-                accumulated_global = sum(len(v) for v in buckets.values())
-
-                self.auditor.write(
-                    AuditRow(
-                        ts=now_iso(),
-                        group="B",
-                        endpoint=endpoint,
-                        unit="job",
-                        index=done_jobs,
-                        fetched=len(rows),
-                        accumulated=accumulated_global,
-                        total_hint=total_jobs,
-                        percent=percent,
-                        file=f"{endpoint}.json",
-                    )
+                    body, nbytes = await self._fetch_async(aclient, job)
+                except Exception as e:
+                    self._fail(st, job, e)
+                    nxt = None
+                else:
+                    nxt = self._collect(st, job, body, nbytes)
+                if nxt is not None:
+                    # volta para o fim da fila: filhos de uma página não
+                    # esperam atrás de um filho com muitas páginas
+                    queue.put_nowait(nxt)
+                    continue
+                open_jobs -= 1
+                room.release()
+                if fed_all and open_jobs == 0:
+                    stop()
+
+        try:
+            async with aclient:
+                await asyncio.gather(
+                    feed(), *(worker() for _ in range(self.concurrency))
                 )
-                if progress_cb:
-                    progress_cb(
-                        done_jobs,
-                        total_jobs,
-                        endpoint,
-                        len(rows),
-                        accumulated_global,
-                        percent,
-                    )
-
-        # dedupe simples e gravação
-        for k, rows in buckets.items():
-            seen = set()
-            deduped = []
-            for r in rows:
-                sig = str(sorted(r.items())) if isinstance(r, dict) else str(r)
-                if sig in seen:
+            self._carry_over(st)
+        except BaseException:
+            self._abort(st)
+            raise
+        return self._finish(st)
+
+    def _start(self, progress_cb: Optional[ProgressCB], total_jobs: int) -> Optional[_RunState]:
+        """Estado inicial; com checkpoint, reabre os `.part` e a lista de jobs
+        já feitos. None quando o Grupo B já terminou na execução anterior."""
+        st = _RunState(
+            progress_cb=progress_cb,
+            total_jobs=total_jobs,
+            throttle=Throttle(self.progress_hz),
+        )
+        self.metrics = Metrics()
+        ck = self.checkpoint
+        if ck is not None:
+            # os que falharam na execução anterior são refeitos nesta
+            ck.clear_b_failed()
+        if ck is not None and ck.b_finished() is not None:
+            if not ck.a_unfinished():
+                return None
+            # B "concluído" com o A pela metade: os pais do A ainda vão mudar
+            ck.reset_b()
+        positions = ck.b_sinks() if ck is not None else {}
+        shards = {k: v for k, v in positions.items() if "@" in k}
+        if not self._shards_intact(shards):
+            # shard de worker sumiu ou encolheu: refaz o Grupo B do zero
+            positions, shards = {}, {}
+            ck.reset_b()
+        st.published = {
+            k: ExtractResult(endpoint=k, path=self._output(k), count=n)
+            for k, n in (ck.b_published() if ck is not None else {}).items()
+        }
+        if self.post_workers:
+            st.stage = PostStage(
+                self.post_workers,
+                self.output_dir,
+                self.limit,
+                self.dedupe,
+                self.fmt,
+                self.compression,
+                resume=shards,
+            )
+        if ck is None or not (positions or st.published):
+            return st
+        st.skip = ck.b_done()
+        st.open = ck.b_cursors()
+        for endpoint, pos in positions.items():
+            if endpoint in shards:
+                continue
+            sink = self._open_sink(endpoint, (pos["bytes"], pos["count"]))
+            if sink.count != pos["count"]:
+                # .part sumiu: os jobs desse endpoint precisam ser refeitos
+                sink.abort()
+                st.skip, st.open = {}, {}
+                for s in st.sinks.values():
+                    s.abort()
+                st.sinks.clear()
+                st.dedupers.clear()
+                st.published = {}
+                ck.reset_b()
+                if st.stage is not None:
+                    st.stage.abort()
+                    st.stage = self._new_stage()
+                return st
+            st.sinks[endpoint] = sink
+            dd = st.dedupers[endpoint] = Deduper(self.dedupe)
+            for r in sink.existing_rows():
+                dd.add(r)
+            st.accumulated += sink.count
+        return st
+
+    def _pending(self, jobs: Iterable[dict], st: _RunState) -> Iterator[dict]:
+        for job in jobs:
+            if job is IDLE:
+                yield job
+                continue
+            endpoint, parent = key = _job_key(job)
+            # endpoint já publicado: todos os seus jobs foram feitos
+            if parent in st.skip.get(endpoint, ()) or endpoint in st.published:
+                st.done_jobs += 1
+                continue
+            # páginas já gravadas antes do checkpoint: segue da próxima
+            yield st.open.get(key, job)
+
+    def _finished(self) -> Dict[str, ExtractResult]:
+        counts = self.checkpoint.b_finished() or {}
+        if self.delta is not None:
+            self.delta.commit()
+        return {
+            k: ExtractResult(endpoint=k, path=self._output(k), count=n)
+            for k, n in counts.items()
+        }
+
+    def _drain(self, pending: Iterator[dict], st: _RunState) -> None:
+        with ThreadPoolExecutor(max_workers=self.concurrency) as ex:
+            fut_to_job: Dict[Future, dict] = {}
+            # próximas páginas entram na janela antes de jobs novos, mas vão
+            # para o fim da fila do executor (não furam a fila dos já enviados)
+            cont: Deque[dict] = deque()
+            exhausted = False
+
+            def fill() -> bool:
+                """Enche a janela; False se a fonte não tinha job pronto."""
+                nonlocal exhausted
+                while len(fut_to_job) < self.window:
+                    if cont:
+                        job = cont.popleft()
+                    elif exhausted:
+                        return True
+                    else:
+                        job = next(pending, None)
+                        if job is IDLE:
+                            return False
+                        if job is None:
+                            exhausted = True
+                            return True
+                    fut_to_job[ex.submit(self._fetch, job)] = job
+                return True
+
+            ready = fill()
+            while fut_to_job or not exhausted:
+                if not fut_to_job:
+                    # nada em voo e a fonte sem job pronto: espera por ela
+                    time.sleep(IDLE_WAIT)
+                    ready = fill()
                     continue
-                seen.add(sig)
-                deduped.append(r)
-            buckets[k] = deduped
-            write_json(self.output_dir, k, deduped)
+                # fonte sem job pronto: olha de novo logo, sem deixar de colher
+                done, _ = wait(
+                    fut_to_job, timeout=None if ready else IDLE_WAIT, return_when=FIRST_COMPLETED
+                )
+                for fut in done:
+                    job = fut_to_job.pop(fut)
+                    try:
+                        body, nbytes = fut.result()
+                    except Exception as e:
+                        self._fail(st, job, e)
+                        continue
+                    nxt = self._collect(st, job, body, nbytes)
+                    if nxt is not None:
+                        cont.append(nxt)
+                ready = fill()
+
+    def _shards_intact(self, shards: Dict[str, Dict[str, int]]) -> bool:
+        if not shards:
+            return True
+        for key, pos in shards.items():
+            part = self._shard_part(key)
+            if not part.exists() or part.stat().st_size < int(pos["bytes"]):
+                return False
+        return True
+
+    def _shard_part(self, key: str) -> Path:
+        """`.part` do shard de worker "<endpoint>@<n>"."""
+        endpoint, _, n = key.rpartition("@")
+        codec = shard_codec(self.fmt, self.compression).codec
+        return self.output_dir / SHARDS_DIR / (file_name(f"{endpoint}.{n}", "jsonl", codec) + ".part")
+
+    def _drop_held(self, st: _RunState) -> None:
+        for key in st.held_refs:
+            self._shard_part(key).unlink(missing_ok=True)
+        st.held_refs = {}
+
+    def _new_stage(self) -> PostStage:
+        return PostStage(
+            self.post_workers, self.output_dir, self.limit, self.dedupe, self.fmt, self.compression
+        )
+
+    def _open_sink(self, endpoint: str, resume_at: Optional[Tuple[int, int]] = None):
+        # com --post-workers o processo principal também grava um shard (delta)
+        if self.post_workers:
+            codec = shard_codec(self.fmt, self.compression)
+            return shard_sink(self.output_dir, endpoint, MAIN_SHARD, codec, resume_at)
+        return open_sink(
+            self.output_dir,
+            endpoint,
+            self.fmt,
+            resume_at=resume_at,
+            compression=self.compression,
+            sharding=self.sharding,
+        )
+
+    def _output(self, endpoint: str) -> Path:
+        return output_path(self.output_dir, endpoint, self.fmt, self.compression, self.sharding)
+
+    def _ck_sinks(self, st: _RunState) -> Dict[str, Any]:
+        if st.stage is None:
+            return {**st.sinks, **st.held_refs}
+        return {**st.sinks, **st.stage.refs}
+
+    def _drain_post(self, pending: Iterator[dict], st: _RunState) -> None:
+        """Como o _drain, mas os threads só buscam os bytes: decode, paginação,
+        dedupe e escrita ficam nos processos do PostStage, e as próximas
+        páginas voltam com o resultado de cada lote."""
+        stage = st.stage
+        with ThreadPoolExecutor(max_workers=self.concurrency) as ex:
+            fut_to_job: Dict[Future, dict] = {}
+            cont: Deque[dict] = deque()
+            exhausted = False
+
+            def fill() -> None:
+                nonlocal exhausted
+                # páginas no estágio ainda ocupam a janela (memória limitada)
+                while len(fut_to_job) + stage.pending_pages < self.window:
+                    if cont:
+                        job = cont.popleft()
+                    elif exhausted:
+                        return
+                    else:
+                        job = next(pending, None)
+                        if job is IDLE:
+                            return
+                        if job is None:
+                            exhausted = True
+                            return
+                    fut_to_job[ex.submit(self._fetch_raw, job)] = job
+
+            fill()
+            while fut_to_job or stage.busy or not exhausted:
+                if not fut_to_job:
+                    # nada buscando: os lotes parciais não têm por que esperar
+                    stage.flush()
+                    if not stage.busy:
+                        # nem lotes no estágio: só falta a fonte ter job pronto
+                        time.sleep(IDLE_WAIT)
+                        fill()
+                        continue
+                # a espera já é curta (LINGER): a fonte é consultada a cada volta
+                done, _ = wait(
+                    [*fut_to_job, *stage.futures], timeout=LINGER, return_when=FIRST_COMPLETED
+                )
+                for fut in done:
+                    job = fut_to_job.pop(fut, None)
+                    if job is not None:
+                        try:
+                            raw, nbytes = fut.result()
+                        except Exception as e:
+                            self._fail(st, job, e)
+                            continue
+                        stage.add(job, raw, nbytes)
+                        continue
+                    # o lote inteiro já está nos shards (stage.refs): os cursores
+                    # andam antes de qualquer checkpoint deste lote
+                    pages = list(stage.collect(fut))
+                    for job, nxt, _fetched, _written, _nbytes in pages:
+                        self._track(st, job, nxt)
+                    for job, nxt, fetched, written, nbytes in pages:
+                        st.accumulated += written
+                        self._book(st, job, nxt, fetched, nbytes)
+                        if nxt is not None:
+                            cont.append(nxt)
+                stage.flush(stale_only=True)
+                fill()
+
+    def _write_rows(self, st: _RunState, endpoint: str, rows: Iterable[dict]) -> None:
+        if endpoint not in st.sinks:
+            st.sinks[endpoint] = self._open_sink(endpoint)
+            st.dedupers[endpoint] = Deduper(self.dedupe)
+
+        # dedupe incremental, conforme as linhas chegam
+        fresh = st.dedupers[endpoint].filter(rows)
+        st.accumulated += st.sinks[endpoint].write(fresh)
+
+    def _carry_over(self, st: _RunState) -> None:
+        """Modo delta: copia da saída anterior os filhos dos pais inalterados."""
+        if self.delta is None:
+            return
+        for endpoint in self.delta.children():
+            if endpoint in st.skip.get(_CARRIED, ()) or endpoint in st.published:
+                continue
+            batch: List[dict] = []
+            for row in self.delta.carry_over(endpoint):
+                batch.append(row)
+                if len(batch) >= 1000:
+                    self._write_rows(st, endpoint, batch)
+                    batch = []
+            self._write_rows(st, endpoint, batch)
+            if self.checkpoint is not None:
+                self.checkpoint.mark_b(_CARRIED, endpoint)
+
+    def _collect(self, st: _RunState, job: dict, body: Any, nbytes: int = 0) -> Optional[dict]:
+        """Grava uma página; devolve o job da próxima página, se houver."""
+        rows = child_rows(job, body)
+        nxt = self._next_job(job, body)
+        self._write_rows(st, job["endpoint"], rows)
+        self._track(st, job, nxt)
+        self._book(st, job, nxt, len(rows), nbytes)
+        return nxt
+
+    def _track(self, st: _RunState, job: dict, nxt: Optional[dict]) -> None:
+        """Página gravada: o job segue em `nxt` ou, na última, está concluído.
+        Um checkpoint grava os cursores junto com o tamanho das saídas, então o
+        --resume não repete páginas que já estavam no `.part`."""
+        key = _job_key(job)
+        if nxt is not None:
+            st.open[key] = nxt
+            return
+        st.open.pop(key, None)
+        if self.checkpoint is not None:
+            self.checkpoint.mark_b(*key)
+
+    def _fail(self, st: _RunState, job: dict, error: BaseException) -> None:
+        """Job sem resposta válida: não entra no checkpoint (o --resume o
+        refaz inteiro) e fica na auditoria com o erro."""
+        st.failed += 1
+        st.failed_endpoints.add(job["endpoint"])
+        if self.checkpoint is not None:
+            self.checkpoint.mark_b_failed(job["url"])
+        self.auditor.write(
+            AuditRow(
+                ts=now_iso(),
+                group="B",
+                endpoint=job["endpoint"],
+                unit="failed",
+                index=st.failed,
+                fetched=0,
+                accumulated=st.accumulated,
+                total_hint=st.total_jobs or None,
+                percent=None,
+                file=self._output(job["endpoint"]).name,
+                limit=self._limit(),
+                reason=f"{type(error).__name__}: {error}"[:200],
+            )
+        )
+
+    def _book(self, st: _RunState, job: dict, nxt: Optional[dict], fetched: int, nbytes: int) -> None:
+        """Checkpoint, métricas, auditoria e progresso de uma página já gravada."""
+        endpoint = job["endpoint"]
+        if nxt is None:
+            if self.checkpoint is not None:
+                self.checkpoint.maybe_save_b(self._ck_sinks(st), cursors=st.open)
+            st.done_jobs += 1
+        self.metrics.record(
+            endpoint, jobs=int(nxt is None), pages=1, rows=fetched, nbytes=nbytes
+        )
+
+        # Audit + progresso (percent global por jobs)
+        percent = (st.done_jobs / st.total_jobs * 100.0) if st.total_jobs else None
+
+        self.auditor.write(
+            AuditRow(
+                ts=now_iso(),
+                group="B",
+                endpoint=endpoint,
+                unit="job" if nxt is None else "page",
+                index=st.done_jobs,
+                fetched=fetched,
+                accumulated=st.accumulated,
+                total_hint=st.total_jobs or None,
+                percent=percent,
+                file=self._output(endpoint).name,
+                limit=self._limit(),
+            )
+        )
+        st.last = (endpoint, fetched)
+        # a UI é atualizada no máximo progress_hz vezes/s: o loop de consumo
+        # não paga formatação do Rich a cada job
+        if st.progress_cb and st.throttle.ready():
+            self._report(st)
+
+    def _report(self, st: _RunState) -> None:
+        if st.last is None:
+            return
+        endpoint, fetched = st.last
+        percent = (st.done_jobs / st.total_jobs * 100.0) if st.total_jobs else None
+        st.progress_cb(
+            st.done_jobs,
+            st.total_jobs,
+            endpoint,
+            fetched,
+            st.accumulated,
+            percent,
+        )
+
+    def _finish(self, st: _RunState) -> Dict[str, ExtractResult]:
+        """Publica as saídas. Com jobs que falharam, só os endpoints sem
+        falhas: os outros ficam nos `.part` e sobe GroupBIncomplete."""
+        if st.progress_cb:
+            self._report(st)
+        hold = st.failed_endpoints
+        out: Dict[str, ExtractResult] = dict(st.published)
+        try:
+            if st.stage is not None:
+                out.update(self._merge(st, hold))
+            else:
+                for k in [k for k in st.sinks if k not in hold]:
+                    sink = st.sinks.pop(k)
+                    out[k] = ExtractResult(endpoint=k, path=sink.close(), count=sink.count)
+        except BaseException:
+            self._abort(st)
+            raise
+        counts = {k: r.count for k, r in out.items()}
+        write_counts(self.output_dir, counts)
+        if st.failed:
+            if self.checkpoint is not None:
+                # gravado junto com os `.part` retidos, no save do _abort
+                self.checkpoint.publish_b(counts)
+            self._abort(st)
+            raise GroupBIncomplete(st.failed, out)
+        if self.checkpoint is not None:
+            self.checkpoint.finish_b(counts)
+        if self.delta is not None:
+            self.delta.commit()
+        return out
+
+    def _merge(self, st: _RunState, hold: Set[str] = frozenset()) -> Dict[str, ExtractResult]:
+        """Fecha os shards (workers e principal) e junta cada endpoint na saída
+        final; os de `hold` ficam nos `.part` (com a posição em `held_refs`)."""
+        st.held_refs = {
+            k: ref for k, ref in st.stage.refs.items() if k.rpartition("@")[0] in hold
+        }
+        shards = st.stage.close(hold)
+        st.stage = None
+        for k in [k for k in st.sinks if k not in hold]:
+            sink = st.sinks.pop(k)
+            shards.setdefault(k, []).append((sink.close(), sink.count))
+        out: Dict[str, ExtractResult] = {}
+        for k, parts in shards.items():
+            path, count = merge_shards(self.output_dir, k, self.fmt, self.compression, parts, self.sharding)
+            out[k] = ExtractResult(endpoint=k, path=path, count=count)
+        try:
+            (self.output_dir / SHARDS_DIR).rmdir()
+        except OSError:
+            pass  # sobrou algo (outro endpoint/execução): fica para a próxima
+        return out
 
-        return buckets
+    def _abort(self, st: _RunState) -> None:
+        if self.checkpoint is not None:
+            # último ponto consistente antes de sair, para o --resume
+            try:
+                self.checkpoint.maybe_save_b(self._ck_sinks(st), force=True, cursors=st.open)
+            except Exception:
+                pass  # fica valendo o checkpoint anterior
+        if st.stage is not None:
+            st.stage.abort(keep=self.checkpoint is not None)
+            st.stage = None
+        if self.checkpoint is None:
+            # retidos pelo PostStage.close: sem checkpoint não há o que retomar
+            self._drop_held(st)
+        for sink in st.sinks.values():
+            sink.abort(keep=self.checkpoint is not None)
+        if self.delta is not None:
+            self.delta.discard()
@@ -1,27 +1,94 @@
 from __future__ import annotations
+import random
 import time
-from typing import Any, Dict
+import threading
+from typing import Any, ContextManager, Dict, Optional
 import requests
 from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+from requests.structures import CaseInsensitiveDict
+from .limiter import AdaptiveLimiter
+from .ratelimit import RateLimiter, retry_after
+from .cache import CacheEntry, ResponseCache
+from .corpus import CorpusRecorder
+from .tracing import TracedAdapter, Tracer
+
+# política de retry dos dois clientes (threads e async)
+STATUS_FORCELIST = (429, 500, 502, 503, 504)
+BACKOFF_FACTOR = 0.6
+BACKOFF_MAX = 120.0
+# erros de rede repetidos (conexão recusada/caída, timeout)
+_RETRY_ERRORS = (requests.ConnectionError, requests.Timeout)
+
+
+def backoff(errors: int) -> float:
+    """Espera antes da tentativa `errors + 1`: como o urllib3 2.x, sem espera
+    no 1º retry, depois factor * 2^(n-1), com teto."""
+    if errors <= 1:
+        return 0.0
+    return min(BACKOFF_MAX, BACKOFF_FACTOR * (2 ** (errors - 1)))
+
+
+def retry_delay(errors: int, resp: Any = None) -> float:
+    """Retry-After do 429/503, senão o backoff; com jitter leve para não
+    sincronizar milhares de retries."""
+    wait = None
+    if resp is not None and resp.status_code in (429, 503):
+        wait = retry_after(resp.headers.get("Retry-After"))
+    delay = wait if wait is not None else backoff(errors)
+    return delay * (1 + random.random() * 0.1)
+
+def cached_response(entry: CacheEntry) -> requests.Response:
+    """requests.Response montada a partir de uma entrada do cache."""
+    resp = requests.Response()
+    resp.status_code = entry.status
+    resp._content = entry.body
+    resp.headers = CaseInsensitiveDict(entry.headers)
+    resp.url = entry.url
+    resp.reason = "OK (cache)"
+    return resp
 
 class HttpClient:
-    def __init__(self, base_url: str, user_access: str, bearer: str, timeout: int = 10, max_retries: int = 5):
+    def __init__(
+        self,
+        base_url: str,
+        user_access: str,
+        bearer: str,
+        timeout: int = 10,
+        max_retries: int = 5,
+        max_in_flight: int = 0,
+        limiter: Optional[AdaptiveLimiter] = None,
+        cache: Optional[ResponseCache] = None,
+        recorder: Optional[CorpusRecorder] = None,
+        gate: Optional[ContextManager[Any]] = None,
+        rate: Optional[RateLimiter] = None,
+        tracer: Optional[Tracer] = None,
+    ):
         self.base_url = base_url.rstrip('/')
         self.timeout = timeout
         self.session = requests.Session()
-
-        # Retry policy
-        retry = Retry(
-            total=max_retries,
-            connect=max_retries,
-            read=max_retries,
-            backoff_factor=0.6,
-            status_forcelist=(429, 500, 502, 503, 504),
-            allowed_methods=frozenset(["GET"]),
-            respect_retry_after_header=True,
+        # limite global de requests simultâneos (0 = sem limite), vale para A e B
+        self._in_flight: Optional[threading.BoundedSemaphore] = (
+            threading.BoundedSemaphore(max_in_flight) if max_in_flight > 0 else None
         )
-        adapter = HTTPAdapter(max_retries=retry, pool_connections=100, pool_maxsize=100)
+        # limite adaptativo (AIMD), opcional; fica abaixo do teto acima
+        self.limiter = limiter
+        # vaga num teto compartilhado entre clientes (modo batch: um por tenant);
+        # pega por último, só durante o request
+        self.gate = gate
+        # requests/s por padrão de endpoint (token bucket), antes do request
+        self.rate = rate
+        # cache de respostas em disco (opcional); hits não passam pelos limites
+        self.cache = cache
+        # modo gravação (--record): cada resposta vai para o corpus do mock
+        self.recorder = recorder
+        # tempos por request (fila, conexão, TTFB, corpo); hits do cache não contam
+        self.tracer = tracer
+
+        # Retries (429/5xx e erros de rede) no _throttled, não no urllib3: a
+        # espera do backoff/Retry-After acontece sem nenhuma vaga ocupada
+        self.max_retries = max_retries
+        adapter_cls = HTTPAdapter if tracer is None else TracedAdapter
+        adapter = adapter_cls(max_retries=0, pool_connections=100, pool_maxsize=100)
         self.session.mount("http://", adapter)
         self.session.mount("https://", adapter)
 
@@ -31,6 +98,25 @@ class HttpClient:
             "Content-Type": "application/json",
         })
 
+    def _request(self, url: str, params: Dict[str, Any], headers: Optional[Dict[str, str]]) -> requests.Response:
+        if self.gate is None:
+            return self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+        with self.gate:
+            return self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+
+    def _send(self, url: str, params: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        if self.limiter is None:
+            return self._request(url, params, headers)
+        self.limiter.acquire()
+        t0 = time.monotonic()
+        try:
+            resp = self._request(url, params, headers)
+        except Exception:
+            self.limiter.release(time.monotonic() - t0, error=True)
+            raise
+        self.limiter.release(time.monotonic() - t0, status=resp.status_code)
+        return resp
+
     def get(self, path_or_url: str, params: Dict[str, Any] | None = None) -> requests.Response:
         if path_or_url.startswith("http"):
             url = path_or_url
@@ -39,4 +125,70 @@ class HttpClient:
         # _ts anti-cache
         params = dict(params or {})
         params.setdefault("_ts", int(time.time() * 1000))
-        return self.session.get(url, params=params, timeout=self.timeout)
+        resp = self._cached(url, params)
+        if self.recorder is not None:
+            self.recorder.record(url, params, resp.status_code, resp.content)
+        return resp
+
+    def _cached(self, url: str, params: Dict[str, Any]) -> requests.Response:
+        if self.cache is None:
+            return self._limited(url, params)
+
+        key, entry, fresh = self.cache.lookup(url, params)
+        if fresh:
+            return cached_response(entry)
+        resp = self._limited(url, params, self.cache.conditional_headers(entry))
+        if resp.status_code == 304 and entry is not None:
+            self.cache.revalidated(entry)
+            return cached_response(entry)
+        self.cache.store(key, url, resp.status_code, resp.headers, resp.content)
+        return resp
+
+    def _limited(self, url: str, params: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        if self.tracer is None:
+            return self._throttled(url, params, headers)
+        span = self.tracer.begin(url)
+        try:
+            resp = self._throttled(url, params, headers)
+        except Exception as e:
+            self.tracer.end(span, error=e)
+            raise
+        self.tracer.end(span, resp.status_code, len(resp.content))
+        return resp
+
+    def _throttled(
+        self,
+        url: str,
+        params: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None,
+    ) -> requests.Response:
+        """Tentativas de um request: cada uma espera o token e ocupa as vagas
+        (em voo, limitador, vaga global) só enquanto está na rede. Esgotados
+        os retries, devolve a última resposta ou repassa o erro."""
+        errors = 0
+        while True:
+            if self.rate is not None:
+                # espera o token antes de ocupar uma vaga em voo
+                self.rate.acquire(url)
+            resp = None
+            try:
+                if self._in_flight is None:
+                    resp = self._send(url, params, headers)
+                else:
+                    with self._in_flight:
+                        resp = self._send(url, params, headers)
+            except _RETRY_ERRORS:
+                errors += 1
+                if errors > self.max_retries:
+                    raise
+            else:
+                if self.rate is not None:
+                    self.rate.observe(url, resp.status_code, resp.headers)
+                if resp.status_code not in STATUS_FORCELIST or errors >= self.max_retries:
+                    return resp
+                errors += 1
+                # libera a conexão antes de dormir
+                resp.close()
+            delay = retry_delay(errors, resp)
+            if delay > 0:
+                time.sleep(delay)
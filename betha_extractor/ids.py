@@ -0,0 +1,195 @@
+from __future__ import annotations
+import json
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from .delta import record_hash
+from .endpoints import GROUP_B_PARENTS, PARENT_ID
+from .pagination import key_of
+from .writers import find_output, output_stamp, read_counts, read_rows
+
+if TYPE_CHECKING:
+    from .extractors.base import ExtractResult
+
+IDS_DIR = "_ids"
+# última linha do índice: {"ids": quantidade, "size"/"mtime": da saída do Grupo A,
+# "hashes": linhas com chave e hash do delta}
+_TRAILER = b"#"
+
+
+def ids_path(output_dir: Path, key: str) -> Path:
+    return output_dir / IDS_DIR / f"{key}.ids"
+
+
+class IdIndexWriter:
+    """Índice compacto dos ids de um pai do Grupo B (`_ids/<pai>.ids`), um id
+    por linha na ordem da saída, gravado junto com as páginas do Grupo A.
+    O rodapé guarda tamanho e mtime da saída (do manifesto, se for em partes):
+    um índice de outra execução é reconhecido e ignorado. Com `hashes`, cada
+    linha é `id<TAB>key_of<TAB>hash`: o delta decide pelo índice, sem reler
+    os registros."""
+
+    def __init__(self, output_dir: Path, key: str, hashes: bool = False):
+        self.path = ids_path(output_dir, key)
+        self.tmp_path = self.path.with_name(self.path.name + ".part")
+        self.count = 0
+        self.hashes = hashes
+        self._id_of = PARENT_ID[key]
+        # id (ou chave) com quebra de linha/TAB não cabe no formato: o Grupo B relê os registros
+        self.broken = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = self.tmp_path.open("wb")
+
+    def write(self, rows: Iterable[Any]) -> None:
+        if self.broken:
+            return
+        out = []
+        for rec in rows:
+            _id = self._id_of(rec)
+            if not _id:
+                continue
+            if self.hashes:
+                key = key_of(rec)
+                if _unsafe(_id) or _unsafe(key):
+                    self.broken = True
+                    return
+                out.append(f"{_id}\t{key}\t{record_hash(rec)}")
+                continue
+            if "\n" in _id or "\r" in _id:
+                self.broken = True
+                return
+            out.append(_id)
+        if out:
+            self._f.write(("\n".join(out) + "\n").encode("utf-8"))
+            self.count += len(out)
+
+    def close(self, output: Path) -> Optional[Path]:
+        """Publica o índice da saída `output` (já fechada)."""
+        if self.broken:
+            self.abort()
+            return None
+        size, mtime = output_stamp(output)
+        meta = {"ids": self.count, "size": size, "mtime": mtime}
+        if self.hashes:
+            meta["hashes"] = True
+        trailer = json.dumps(meta)
+        self._f.write(_TRAILER + trailer.encode("utf-8") + b"\n")
+        self._f.close()
+        os.replace(self.tmp_path, self.path)
+        return self.path
+
+    def abort(self) -> None:
+        if not self._f.closed:
+            self._f.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+
+def _unsafe(s: str) -> bool:
+    return "\n" in s or "\r" in s or "\t" in s
+
+
+def _trailer(path: Path) -> Optional[Tuple[int, int, int, bool]]:
+    with path.open("rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        f.seek(max(0, end - 256))
+        tail = f.read().rstrip(b"\n")
+    line = tail.rsplit(b"\n", 1)[-1]
+    if not line.startswith(_TRAILER):
+        return None
+    try:
+        meta = json.loads(line[len(_TRAILER):])
+        return int(meta["ids"]), int(meta["size"]), int(meta["mtime"]), bool(meta.get("hashes"))
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def _stream(path: Path, n: int) -> Iterator[str]:
+    with path.open("r", encoding="utf-8", newline="\n") as f:
+        for _ in range(n):
+            yield f.readline().rstrip("\n")
+
+
+def _only_ids(lines: Iterator[str]) -> Iterator[str]:
+    for line in lines:
+        yield line.partition("\t")[0]
+
+
+def _entries(lines: Iterator[str]) -> Iterator[Tuple[str, str, str]]:
+    for line in lines:
+        _id, key, h = line.split("\t")
+        yield _id, key, h
+
+
+def open_ids(
+    output_dir: Path, key: str, output: Path, hashes: bool = False
+) -> Optional[Tuple[int, Iterator[Any]]]:
+    """(quantidade, ids em streaming) se o índice corresponder à saída
+    `output`; None se faltar, estiver incompleto ou for de outra execução.
+    Com `hashes` saem tuplas (id, key_of, hash), e um índice sem elas não serve."""
+    path = ids_path(output_dir, key)
+    try:
+        meta = _trailer(path)
+        stamp = output_stamp(output)
+    except OSError:
+        return None
+    if meta is None or meta[1:3] != stamp or (hashes and not meta[3]):
+        return None
+    lines = _stream(path, meta[0])
+    if hashes:
+        return meta[0], _entries(lines)
+    return meta[0], _only_ids(lines) if meta[3] else lines
+
+
+def _rows_or_empty(path: Path) -> Iterable[dict]:
+    # arquivo corrompido/incompleto não derruba o Grupo B
+    try:
+        yield from read_rows(path)
+    except Exception:
+        return
+
+
+def parent_outputs(
+    output_dir: Path, a_result: Dict[str, "ExtractResult"], from_disk: bool = True
+) -> Dict[str, Path]:
+    """Saída de cada pai do Grupo B: a desta execução ou, com `from_disk`, a
+    mais recente em disco (`find_output`); sem ela, o pai fica de fora."""
+    out: Dict[str, Path] = {}
+    for key in GROUP_B_PARENTS:
+        if key in a_result:
+            p = a_result[key].path
+        else:
+            p = find_output(output_dir, key) if from_disk else None
+        if p and p.exists():
+            out[key] = p
+    return out
+
+
+def parent_inputs(
+    output_dir: Path,
+    a_result: Dict[str, "ExtractResult"],
+    from_disk: bool = True,
+    hashes: bool = False,
+) -> Tuple[Dict[str, Iterable[dict]], Dict[str, Iterable[Any]], Optional[Dict[str, int]]]:
+    """Entrada do Grupo B a partir das saídas do A em disco: (registros,
+    ids, contagens por pai). Pais com índice válido vão só em `ids`; os
+    demais são relidos em streaming. Com `hashes` (delta), só vale o índice
+    com chave e hash, e `ids` traz tuplas (id, key_of, hash).
+    Contagens None quando algum pai não tem contagem conhecida."""
+    rows: Dict[str, Iterable[dict]] = {}
+    ids: Dict[str, Iterable[Any]] = {}
+    counts: Optional[Dict[str, int]] = {}
+    known = read_counts(output_dir)
+    for key, p in parent_outputs(output_dir, a_result, from_disk).items():
+        index = open_ids(output_dir, key, p, hashes)
+        if index is not None:
+            n, ids[key] = index
+        else:
+            rows[key] = _rows_or_empty(p)
+            n = a_result[key].count if key in a_result else known.get(key)
+        if n is None:
+            counts = None
+        elif counts is not None:
+            counts[key] = n
+    return rows, ids, counts
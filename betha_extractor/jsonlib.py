@@ -0,0 +1,102 @@
+from __future__ import annotations
+import json
+from typing import Any, Callable, Dict, Tuple
+
+try:  # dependências opcionais: pip install "betha_extractor[fast]"
+    import orjson
+except ImportError:  # pragma: no cover - depende do ambiente
+    orjson = None
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - depende do ambiente
+    msgspec = None
+
+# auto: orjson, depois msgspec, depois a stdlib
+JSON_BACKENDS = ("auto", "orjson", "msgspec", "stdlib")
+
+_COMPACT = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+_INDENT = json.JSONEncoder(ensure_ascii=False, indent=2)
+
+
+def _std_loads(data: Any) -> Any:
+    return json.loads(data)
+
+
+def _std_dumps(obj: Any) -> bytes:
+    return _COMPACT.encode(obj).encode("utf-8")
+
+
+def _std_dumps_indent(obj: Any) -> bytes:
+    return _INDENT.encode(obj).encode("utf-8")
+
+
+def _with_fallback(fast: Callable[[Any], bytes], slow: Callable[[Any], bytes]) -> Callable[[Any], bytes]:
+    # inteiros além de 64 bits, chaves não-str etc.: a stdlib resolve
+    def dumps(obj: Any) -> bytes:
+        try:
+            return fast(obj)
+        except (TypeError, ValueError, OverflowError):
+            return slow(obj)
+    return dumps
+
+
+def _make(name: str) -> Tuple[Callable[[Any], Any], Callable[[Any], bytes], Callable[[Any], bytes]]:
+    if name == "orjson":
+        indent = orjson.OPT_INDENT_2
+        return (
+            orjson.loads,
+            _with_fallback(orjson.dumps, _std_dumps),
+            _with_fallback(lambda o: orjson.dumps(o, option=indent), _std_dumps_indent),
+        )
+    if name == "msgspec":
+        decoder = msgspec.json.Decoder()
+        encoder = msgspec.json.Encoder()
+        return (
+            decoder.decode,
+            _with_fallback(encoder.encode, _std_dumps),
+            _with_fallback(lambda o: msgspec.json.format(encoder.encode(o), indent=2), _std_dumps_indent),
+        )
+    return _std_loads, _std_dumps, _std_dumps_indent
+
+
+def available() -> Dict[str, bool]:
+    return {"orjson": orjson is not None, "msgspec": msgspec is not None, "stdlib": True}
+
+
+# implementação ativa; troque com use(). Chame sempre jsonlib.loads(...)
+# (não importe as funções soltas: use() as substitui no módulo)
+name = "stdlib"
+loads: Callable[[Any], Any] = _std_loads
+dumps: Callable[[Any], bytes] = _std_dumps
+dumps_indent: Callable[[Any], bytes] = _std_dumps_indent
+
+
+def use(backend: str = "auto") -> str:
+    """Escolhe o backend (auto/orjson/msgspec/stdlib) e devolve o nome em uso.
+    Todos leem bytes ou str e gravam UTF-8 com a mesma formatação da stdlib
+    (`ensure_ascii=False`, compacto ou indent=2)."""
+    global name, loads, dumps, dumps_indent
+    if backend not in JSON_BACKENDS:
+        raise ValueError(f"Backend JSON inválido: {backend} (use {', '.join(JSON_BACKENDS)})")
+    have = available()
+    if backend == "auto":
+        backend = next(b for b in ("orjson", "msgspec", "stdlib") if have[b])
+    elif not have[backend]:
+        raise RuntimeError(
+            f"Backend JSON {backend} não instalado. Instale com: pip install {backend}"
+        )
+    name = backend
+    loads, dumps, dumps_indent = _make(backend)
+    return name
+
+
+def response_json(resp: Any) -> Any:
+    """Decodifica direto dos bytes da resposta; se não for UTF-8 válido,
+    cai para o resp.json() (que detecta o charset)."""
+    try:
+        return loads(resp.content)
+    except ValueError:
+        return resp.json()
+
+
+use("auto")
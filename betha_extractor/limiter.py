@@ -0,0 +1,162 @@
+from __future__ import annotations
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, List, Optional, Tuple
+
+# on_change(limit: int, reason: str) -> None
+ChangeCB = Callable[[int, str], None]
+
+THROTTLE_STATUS = (429, 500, 502, 503, 504)
+
+
+class AdaptiveLimiter:
+    """Limite de requests em voo no estilo AIMD (TCP): sobe +1 a cada janela
+    de respostas com latência estável e corta pela metade em 429/5xx ou erro
+    de conexão. Compartilhado por Grupo A e B via HttpClient."""
+
+    def __init__(
+        self,
+        initial: int = 8,
+        minimum: int = 1,
+        maximum: int = 64,
+        decrease_factor: float = 0.5,
+        latency_tolerance: float = 2.0,
+        cooldown: float = 1.0,
+    ):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = min(self.maximum, max(self.minimum, initial))
+        self.reason = "inicial"
+        self.in_flight = 0
+        self.changes = 0
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.cooldown = cooldown
+        self.listeners: List[ChangeCB] = []
+
+        self._cond = threading.Condition()
+        # esperas do engine async: (loop, future), acordadas em release()
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+        self._ewma: Optional[float] = None
+        self._baseline: Optional[float] = None
+        self._ok_in_window = 0
+        self._saturated = False
+        self._last_decrease = 0.0
+
+    # ---- controle de vaga ----
+    def try_acquire(self) -> bool:
+        with self._cond:
+            if self.in_flight >= self.limit:
+                self._saturated = True
+                return False
+            self.in_flight += 1
+            if self.in_flight >= self.limit:
+                self._saturated = True
+            return True
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self.in_flight >= self.limit:
+                self._saturated = True
+                self._cond.wait()
+            self.in_flight += 1
+            if self.in_flight >= self.limit:
+                self._saturated = True
+
+    async def acquire_async(self) -> None:
+        """acquire() para o event loop: espera num future acordado por
+        release(), sem bloquear o loop nem consultar a vaga em intervalos."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self.in_flight < self.limit:
+                    self.in_flight += 1
+                    if self.in_flight >= self.limit:
+                        self._saturated = True
+                    return
+                self._saturated = True
+                waiter = (loop, loop.create_future())
+                self._waiters.append(waiter)
+            try:
+                await waiter[1]
+            except asyncio.CancelledError:
+                with self._cond:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+                    else:
+                        # já tinha sido acordado: passa a vez para o próximo
+                        self._wake()
+                raise
+            # acordado: tenta de novo (uma thread pode ter pego a vaga antes)
+
+    def release(self, latency: float, status: Optional[int] = None, error: bool = False) -> None:
+        with self._cond:
+            self.in_flight = max(0, self.in_flight - 1)
+            if error:
+                self._decrease("erro de conexão/timeout")
+            elif status in THROTTLE_STATUS:
+                self._decrease(f"HTTP {status}")
+            else:
+                self._observe(latency)
+            self._cond.notify_all()
+            self._wake()
+
+    def _wake(self) -> None:
+        """Acorda uma espera async por vaga livre (chamado com o lock)."""
+        free = self.limit - self.in_flight
+        while free > 0 and self._waiters:
+            loop, fut = self._waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(_resolve, fut)
+            except RuntimeError:
+                continue  # loop já fechado
+            free -= 1
+
+    # ---- AIMD ----
+    def _observe(self, latency: float) -> None:
+        self._ewma = latency if self._ewma is None else 0.8 * self._ewma + 0.2 * latency
+        if self._baseline is None or self._ewma < self._baseline:
+            self._baseline = self._ewma
+        else:
+            # deixa a base acompanhar mudanças lentas do servidor
+            self._baseline += (self._ewma - self._baseline) * 0.01
+
+        self._ok_in_window += 1
+        if self._ok_in_window < self.limit:
+            return
+        self._ok_in_window = 0
+        saturated, self._saturated = self._saturated, False
+        ms = self._ewma * 1000
+        if self._ewma > self._baseline * self.latency_tolerance:
+            self._set(self.limit - 1, f"latência subindo ({ms:.0f} ms)")
+        elif saturated:
+            self._set(self.limit + 1, f"latência estável ({ms:.0f} ms)")
+
+    def _decrease(self, reason: str) -> None:
+        now = time.monotonic()
+        # vários 429 da mesma rajada contam como um só corte
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self._ok_in_window = 0
+        self._set(int(self.limit * self.decrease_factor), reason)
+
+    def _set(self, new_limit: int, reason: str) -> None:
+        new_limit = min(self.maximum, max(self.minimum, new_limit))
+        if new_limit == self.limit:
+            return
+        self.limit = new_limit
+        self.reason = reason
+        self.changes += 1
+        for cb in list(self.listeners):
+            try:
+                cb(new_limit, reason)
+            except Exception:
+                pass
+
+
+def _resolve(fut: asyncio.Future) -> None:
+    if not fut.done():
+        fut.set_result(None)
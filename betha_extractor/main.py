@@ -2,9 +2,11 @@
 from __future__ import annotations
 
 import sys
-import json
+from dataclasses import dataclass
+from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
 
 import typer
 from rich.console import Console
@@ -21,9 +23,28 @@ from rich.progress import (
 # módulos internos
 from betha_extractor.config import load_settings
 from betha_extractor.http_client import HttpClient
-from betha_extractor.endpoints import GROUP_A
+from betha_extractor.async_client import AsyncHttpClient
+from betha_extractor.config import ENGINES
+from betha_extractor.limiter import AdaptiveLimiter
+from betha_extractor.ratelimit import RateLimiter, parse_rules
+from betha_extractor.tracing import METRICS_FILE, PHASES, TRACE_FILE, Histogram, Tracer, ms
+from betha_extractor.audit import AUDIT_FORMATS, Auditor, AuditRow, audit_path, configure as configure_audit, now_iso
+from betha_extractor.endpoints import GROUP_A, GROUP_B_PARENTS
 from betha_extractor.extractors.group_a import GroupAExtractor
-from betha_extractor.extractors.group_b import GroupBExtractor
+from betha_extractor.extractors.group_b import GroupBExtractor, GroupBIncomplete
+from betha_extractor.extractors.base import ExtractResult
+from betha_extractor.pipeline import run_pipelined
+from betha_extractor.checkpoint import CheckpointStore
+from betha_extractor.delta import DeltaTracker
+from betha_extractor.ids import parent_inputs, parent_outputs
+from betha_extractor.batch import FairGate, load_manifest, run_batch
+from betha_extractor.dedupe import DEDUPE_MODES
+from betha_extractor.metrics import Metrics, human_bytes, rates_line
+from betha_extractor.cache import ResponseCache, credential_scope
+from betha_extractor import jsonlib
+from betha_extractor.corpus import CORPUS_FILE, CorpusRecorder, load_corpus
+from betha_extractor.mock_server import DEFAULT_SIZES, MockConfig, make_server
+from betha_extractor.writers import COMPRESSIONS, FORMATS, Compression, Sharding, output_stamp, require_format
 
 app = typer.Typer(add_completion=False, no_args_is_help=True)
 console = Console()
@@ -39,6 +60,36 @@ def _banner():
     )
 
 
+def _print_parents(output_dir: Path, a_result, from_disk: bool) -> None:
+    """De onde vêm os pais do Grupo B que não foram extraídos agora."""
+    found = parent_outputs(output_dir, a_result, from_disk)
+    for key in GROUP_B_PARENTS:
+        if key in a_result:
+            continue
+        if key not in found:
+            why = "sem saída do Grupo A" if from_disk else "fora do --only"
+            console.print(f"[yellow]Grupo B sem os filhos de {key}: {why}[/]")
+            continue
+        stamp = output_stamp(found[key])[1]
+        when = datetime.fromtimestamp(stamp / 1e9).strftime("%d/%m/%Y %H:%M")
+        console.print(f"[cyan]Pais de {key} lidos de {found[key].name} ({when})[/]")
+
+
+def _warn_in_flight(s) -> None:
+    """Um MAX_IN_FLIGHT abaixo do que os workers pedem vira o limite de fato."""
+    if not s.max_in_flight:
+        return
+    b = s.max_concurrency if s.adaptive else s.concurrency
+    a = s.endpoint_workers * s.page_workers
+    # no pipeline A e B buscam ao mesmo tempo
+    wanted = a + b if s.pipeline else max(a, b)
+    if s.max_in_flight < wanted:
+        console.print(
+            f"[yellow]--max-in-flight {s.max_in_flight} abaixo dos {wanted} requests simultâneos "
+            f"da concorrência configurada: é ele que limita a execução[/]"
+        )
+
+
 def _print_config(s):
     t = Table(
         title="Configuração", show_lines=False, expand=True, title_style="bold blue"
@@ -52,49 +103,575 @@ def _print_config(s):
     t.add_row("Timeout (s)", str(s.timeout_seconds))
     t.add_row("Retries", str(s.max_retries))
     t.add_row("Concorrência (B)", str(s.concurrency))
+    t.add_row("Janela de jobs (B)", str(s.b_window or s.concurrency * 4))
+    t.add_row("Páginas paralelas (A)", str(s.page_workers))
+    t.add_row("Endpoints paralelos (A)", str(s.endpoint_workers))
+    t.add_row("Requests em voo (global)", str(s.max_in_flight or "sem limite"))
+    rates = [f"{s.rate_limit:g}/s global" if s.rate_limit else ""] + [
+        f"{p} {r:g}/s" for p, r in parse_rules(s.rate_limits)
+    ]
+    learn = " + aprende com a API" if s.rate_learn else ""
+    t.add_row("Limite de taxa", (", ".join(x for x in rates if x) or "sem limite") + learn)
+    t.add_row("Pipeline A → B", "sim" if s.pipeline else "não")
+    t.add_row(
+        "Limite adaptativo",
+        f"sim ({s.min_concurrency}–{s.max_concurrency})" if s.adaptive else "não",
+    )
+    t.add_row("Engine (B)", s.engine)
+    t.add_row("JSON", jsonlib.name)
+    t.add_row(
+        "Pós-processamento (B)",
+        f"{s.post_workers} processos" if s.post_workers else "no processo principal",
+    )
+    t.add_row("Delta (B)", "sim" if s.delta else "não")
+    t.add_row("Dedupe (A / B)", f"{s.dedupe_a} / {s.dedupe}")
+    t.add_row("Formato de saída", s.output_format)
+    if s.compression != "none":
+        level = f", nível {s.compression_level}" if s.compression_level is not None else ""
+        threads = f", {s.compression_threads} threads" if s.compression_threads else ""
+        t.add_row("Compressão", f"{s.compression}{level}{threads}")
+    if s.shard_rows or s.shard_mb:
+        limits = [f"{s.shard_rows} registros" if s.shard_rows else "", f"{s.shard_mb} MB" if s.shard_mb else ""]
+        t.add_row("Saída em partes", " ou ".join(x for x in limits if x))
+    t.add_row(
+        "Cache HTTP",
+        f"sim (TTL {s.http_cache_ttl:g}s, até {s.http_cache_max_mb} MB)" if s.http_cache else "não",
+    )
+    t.add_row("Gravação (corpus)", str(s.record_dir) if s.record_dir else "não")
+    traces = [TRACE_FILE if s.trace else "", f"/metrics em {s.metrics_host}:{s.metrics_port}" if s.metrics_port else ""]
+    t.add_row("Tracing", " + ".join(x for x in traces if x) or "não")
+    t.add_row("Auditoria", s.audit_format)
     t.add_row("Output Dir", str(s.output_dir))
     console.print(t)
 
 
-def _print_summary(title: str, data: Dict[str, list], output_dir: Path):
+def _print_summary(title: str, data: Dict[str, ExtractResult], output_dir: Path):
     tb = Table(title=f"Resumo — {title}", title_style="bold purple", expand=True)
     tb.add_column("Arquivo", style="cyan")
     tb.add_column("Registros", style="green", justify="right")
     tb.add_column("Path", style="white")
-    for k, rows in sorted(data.items()):
-        path = output_dir / f"{k}.json"
-        tb.add_row(f"{k}.json", str(len(rows)), str(path))
+    for k, res in sorted(data.items()):
+        path = res.path or output_dir / f"{k}.json"
+        tb.add_row(path.name, str(res.count), str(path))
     console.print(tb)
 
-    audit = output_dir / "_audit.csv"
-    if audit.exists():
+    audit = audit_path(output_dir)
+    if audit is not None and audit.exists():
         console.print(
             Panel.fit(f"Logs gravados em: [bold]{audit}[/]", border_style="blue")
         )
 
 
-def _run_impl(
-    all: bool,
-    group: str | None,
-    only: str | None,
-    output: Path | None,
-    limit: int | None,
-    timeout: int | None,
-    concurrency: int | None,
-):
+def _print_throughput(metrics: Metrics):
+    snap = metrics.snapshot()
+    if not snap:
+        return
+    tb = Table(title="Vazão — Grupo B", title_style="bold purple", expand=True)
+    tb.add_column("Endpoint", style="cyan", no_wrap=True)
+    tb.add_column("Jobs", style="green", justify="right")
+    tb.add_column("Requests", style="white", justify="right")
+    tb.add_column("Registros", style="green", justify="right")
+    tb.add_column("Payload", style="white", justify="right")
+    tb.add_column("Jobs/s", style="yellow", justify="right")
+    tb.add_column("Rows/s", style="yellow", justify="right")
+    tb.add_column("Bytes/s", style="yellow", justify="right")
+    for ep, st in sorted(snap.items()):
+        tb.add_row(
+            ep,
+            str(st.jobs),
+            str(st.pages),
+            str(st.rows),
+            human_bytes(st.bytes),
+            f"{st.rate(st.jobs):.1f}",
+            f"{st.rate(st.rows):.1f}",
+            f"{human_bytes(st.rate(st.bytes))}/s",
+        )
+    console.print(tb)
+
+
+def _finish_cache(cache: Optional[ResponseCache]):
+    if cache is None:
+        return
+    st = cache.stats
+    cache.close()
+    console.print(
+        Panel.fit(
+            f"Cache HTTP — hits: [green]{st.hits}[/]  revalidados (304): [green]{st.revalidated}[/]  "
+            f"misses: [yellow]{st.misses}[/]  removidos (LRU): {st.evicted}\n"
+            f"[dim]{cache.directory}[/]",
+            border_style="blue",
+        )
+    )
+
+
+def _finish_rate(rate: Optional[RateLimiter]):
+    if rate is None or not (rate.delayed or rate.throttled):
+        return
+    final = ", ".join(
+        f"{b.name} {b.rate:g}/s ({b.reason})" if b.rate else f"{b.name} sem limite"
+        for b in rate.buckets
+    )
+    console.print(
+        f"[blue]Limite de taxa:[/] {rate.delayed} requests esperaram {rate.waited:.1f}s no total · "
+        f"429/503 recebidos: {rate.throttled} · taxas no fim: {final}"
+    )
+
+
+def _finish_trace(tracer: Optional[Tracer], output_dir: Path, write: bool):
+    """Latência por endpoint, fases (p50/p95) de todos juntos e os arquivos do trace."""
+    if tracer is None:
+        return
+    snap = tracer.snapshot()
+    tracer.close()
+    if not snap:
+        return
+    # tabela à parte, estreita: cabe em 80 colunas mesmo com os nomes longos do B
+    tb = Table(title="Latência por endpoint (com retries)", title_style="bold purple")
+    tb.add_column("Endpoint", style="cyan", no_wrap=True)
+    tb.add_column("Req", style="white", justify="right")
+    tb.add_column("Req/s", style="yellow", justify="right")
+    tb.add_column("p50", style="yellow", justify="right")
+    tb.add_column("p95", style="yellow", justify="right")
+    tb.add_column("p99", style="yellow", justify="right")
+    tb.add_column("Retry", style="white", justify="right")
+    for ep, st in sorted(snap.items()):
+        h = st.total
+        tb.add_row(
+            ep,
+            str(st.requests),
+            f"{st.rate:.1f}",
+            ms(h.quantile(0.5)),
+            ms(h.quantile(0.95)),
+            ms(h.quantile(0.99)),
+            str(st.retries),
+        )
+    console.print(tb)
+    phases = []
+    for phase in PHASES:
+        h = Histogram()
+        for st in snap.values():
+            if phase in st.phases:
+                h.merge(st.phases[phase])
+        if h.count:
+            phases.append(f"{phase} {ms(h.quantile(0.5))}/{ms(h.quantile(0.95))}")
+    console.print(f"[blue]Tempos por fase (p50/p95):[/] {' · '.join(phases)}")
+    if write:
+        prom = tracer.write_prometheus(output_dir / METRICS_FILE)
+        console.print(f"[blue]Trace:[/] [bold]{tracer.path}[/] · métricas: [bold]{prom}[/]")
+
+
+def _finish_record(recorder: Optional[CorpusRecorder]):
+    if recorder is None:
+        return
+    recorder.close()
+    console.print(
+        f"[blue]Corpus:[/] {recorder.recorded} respostas novas em [bold]{recorder.path}[/] "
+        f"(replay: [cyan]mock-server --corpus {recorder.directory}[/])"
+    )
+
+
+def _print_delta(delta: Optional[DeltaTracker]):
+    if delta is None:
+        return
+    tb = Table(title="Delta — pais do Grupo B", title_style="bold purple", expand=True)
+    tb.add_column("Endpoint", style="cyan")
+    tb.add_column("Novos", style="green", justify="right")
+    tb.add_column("Alterados", style="yellow", justify="right")
+    tb.add_column("Inalterados", style="white", justify="right")
+    tb.add_column("Removidos", style="red", justify="right")
+    tb.add_column("Filhos copiados", style="white", justify="right")
+    for parent, st in sorted(delta.stats().items()):
+        tb.add_row(
+            parent,
+            str(st.new),
+            str(st.changed),
+            str(st.unchanged),
+            str(st.removed),
+            str(st.carried),
+        )
+    console.print(tb)
+
+
+def _progress() -> Progress:
+    return Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        TextColumn("{task.percentage:>6.2f}%"),
+        TimeElapsedColumn(),
+        transient=False,
+        console=console,
+    )
+
+
+def _limit_desc(limiter: AdaptiveLimiter) -> str:
+    return (
+        f"Limite HTTP: {limiter.limit} em voo "
+        f"[{limiter.minimum}–{limiter.maximum}] — {limiter.reason}"
+    )
+
+
+@contextmanager
+def _live(limiter: Optional[AdaptiveLimiter]) -> Iterator[Progress]:
+    # Progress + uma linha com o limite adaptativo atual e o motivo da mudança
+    with _progress() as progress:
+        if limiter is None:
+            yield progress
+            return
+        task = progress.add_task(_limit_desc(limiter), total=None)
+
+        def on_change(_limit: int, _reason: str):
+            progress.update(task, description=_limit_desc(limiter))
+
+        limiter.listeners.append(on_change)
+        try:
+            yield progress
+        finally:
+            limiter.listeners.remove(on_change)
+
+
+def _group_a_callbacks(progress: Progress, selected: Dict[str, str]):
+    # A task "Endpoints A" (global) permanece como estava
+    task_endpoints = progress.add_task("Endpoints A", total=len(selected))
+
+    # Subtask por endpoint (na ordem de início, maiores primeiro):
+    # controlamos % manualmente (0 → 100)
+    sub_ids = {
+        path: progress.add_task(f"{key}: 0/? (—%)", total=100, completed=0)
+        for key, path in selected.items()
+    }
+    keys = {path: key for key, path in selected.items()}
+
+    def on_page(
+        endpoint: str,
+        page_index: int,
+        fetched: int,
+        accumulated: int,
+        total_hint: Optional[int],
+        percent: Optional[float],  # ignorado
+    ):
+        sub_id, key = sub_ids[endpoint], keys[endpoint]
+        if total_hint and total_hint > 0:
+            raw = (accumulated / total_hint) * 100.0
+            p = max(0.0, min(100.0, round(raw, 2)))
+            desc = f"{key}: {accumulated}/{total_hint} ({p:.2f}%)"
+            progress.update(sub_id, completed=p, description=desc)
+        else:
+            # sem total conhecido, não chutamos %
+            desc = f"{key}: {accumulated}/? (—%)"
+            progress.update(sub_id, description=desc)
+
+    def on_done(key: str, result: ExtractResult):
+        # Fecha a subtask em 100% com números finais
+        total_rows = result.count
+        progress.update(
+            sub_ids[selected[key]],
+            completed=100,
+            description=f"{key}: {total_rows}/{total_rows} (100.00%)",
+        )
+        progress.advance(task_endpoints)
+
+    return on_page, on_done
+
+
+def _group_b_callback(progress: Progress, gb: GroupBExtractor):
+    # total=None (barra indeterminada) enquanto o total de jobs não é conhecido
+    task_jobs = progress.add_task("Jobs B", total=None)
+    # uma linha por endpoint filho com as taxas (jobs/s, rows/s, bytes/s)
+    ep_tasks: Dict[str, int] = {}
+
+    def update_endpoints():
+        for ep, st in sorted(gb.metrics.snapshot().items()):
+            if ep not in ep_tasks:
+                ep_tasks[ep] = progress.add_task("", total=None)
+            progress.update(
+                ep_tasks[ep],
+                description=f"  {ep}: {st.jobs} jobs, {st.rows} rows — {rates_line(st)}",
+            )
+
+    def on_job(
+        done_jobs: int,
+        total_jobs: int,
+        endpoint: str,
+        fetched: int,
+        accumulated_global: int,
+        percent: Optional[float],
+    ):
+        if total_jobs and total_jobs > 0:
+            raw = (done_jobs / total_jobs) * 100.0
+            p = max(0.0, min(100.0, round(raw, 2)))
+            progress.update(
+                task_jobs,
+                total=total_jobs,
+                completed=done_jobs,
+                description=f"Jobs B — {done_jobs}/{total_jobs} ({p:.2f}%)  last={endpoint}[+{fetched}] total={accumulated_global}",
+            )
+        else:
+            progress.update(
+                task_jobs,
+                completed=done_jobs,
+                description=f"Jobs B — {done_jobs}/? (—%)  last={endpoint}[+{fetched}] total={accumulated_global}",
+            )
+        update_endpoints()
+
+    return on_job
+
+
+def _b_incomplete(e: Optional[GroupBIncomplete], checkpoint: CheckpointStore) -> None:
+    # só os endpoints sem falhas foram publicados; o checkpoint guarda o resto
+    if e is None:
+        return
+    console.print(f"[red]{e}[/]")
+    console.print(f"[yellow]URLs com falha em {checkpoint.failed_path}[/]")
+    raise SystemExit(1)
+
+
+@dataclass
+class RunOptions:
+    """Opções do `run` vindas da linha de comando (ou do menu). None/False
+    mantém o valor do .env (`load_settings`)."""
+
+    all: bool = False
+    group: str | None = None
+    only: str | None = None
+    output: Path | None = None
+    limit: int | None = None
+    timeout: int | None = None
+    concurrency: int | None = None
+    page_workers: int | None = None
+    endpoint_workers: int | None = None
+    max_in_flight: int | None = None
+    pipeline: bool = False
+    output_format: str | None = None
+    engine: str | None = None
+    adaptive: bool = False
+    max_concurrency: int | None = None
+    resume: bool = False
+    delta: bool = False
+    b_window: int | None = None
+    dedupe: str | None = None
+    dedupe_a: str | None = None
+    audit_format: str | None = None
+    progress_hz: float | None = None
+    cache: bool = False
+    cache_ttl: float | None = None
+    cache_max_mb: int | None = None
+    record: Path | None = None
+    compress: str | None = None
+    compress_level: int | None = None
+    compress_threads: int | None = None
+    json_backend: str | None = None
+    post_workers: int | None = None
+    shard_rows: int | None = None
+    shard_mb: int | None = None
+    rate_limit: float | None = None
+    rate_limits: str | None = None
+    rate_burst: float | None = None
+    rate_learn: bool = False
+    trace: bool = False
+    metrics_port: int | None = None
+    metrics_host: str | None = None
+
+
+def _run_impl(opts: RunOptions):
     _banner()
     s = load_settings()
-    if output:
-        s.output_dir = output.resolve()
+    if opts.output:
+        s.output_dir = opts.output.resolve()
         s.output_dir.mkdir(parents=True, exist_ok=True)
-    if limit:
-        s.page_limit = limit
-    if timeout:
-        s.timeout_seconds = timeout
-    if concurrency:
-        s.concurrency = concurrency
+    if opts.limit:
+        s.page_limit = opts.limit
+    if opts.timeout:
+        s.timeout_seconds = opts.timeout
+    if opts.concurrency:
+        s.concurrency = opts.concurrency
+    if opts.page_workers:
+        s.page_workers = opts.page_workers
+    if opts.endpoint_workers:
+        s.endpoint_workers = opts.endpoint_workers
+    if opts.max_in_flight is not None:
+        s.max_in_flight = opts.max_in_flight
+    if opts.pipeline:
+        s.pipeline = True
+    if opts.output_format:
+        s.output_format = opts.output_format.lower()
+    if opts.engine:
+        s.engine = opts.engine.lower()
+    if opts.adaptive:
+        s.adaptive = True
+    if opts.max_concurrency:
+        s.max_concurrency = opts.max_concurrency
+    if opts.delta:
+        s.delta = True
+    if opts.b_window:
+        s.b_window = opts.b_window
+    if opts.dedupe:
+        s.dedupe = opts.dedupe.lower()
+    if opts.dedupe_a:
+        s.dedupe_a = opts.dedupe_a.lower()
+    if opts.audit_format:
+        s.audit_format = opts.audit_format.lower()
+    if opts.progress_hz is not None:
+        s.progress_hz = opts.progress_hz
+    if opts.cache:
+        s.http_cache = True
+    if opts.cache_ttl is not None:
+        s.http_cache_ttl = opts.cache_ttl
+    if opts.cache_max_mb:
+        s.http_cache_max_mb = opts.cache_max_mb
+    if opts.record:
+        s.record_dir = opts.record.resolve()
+    if opts.compress:
+        s.compression = opts.compress.lower()
+    if opts.compress_level is not None:
+        s.compression_level = opts.compress_level
+    if opts.compress_threads is not None:
+        s.compression_threads = opts.compress_threads
+    if opts.json_backend:
+        s.json_backend = opts.json_backend.lower()
+    if opts.post_workers is not None:
+        s.post_workers = opts.post_workers
+    if opts.shard_rows is not None:
+        s.shard_rows = opts.shard_rows
+    if opts.shard_mb is not None:
+        s.shard_mb = opts.shard_mb
+    if opts.rate_limit is not None:
+        s.rate_limit = opts.rate_limit
+    if opts.rate_limits is not None:
+        s.rate_limits = opts.rate_limits
+    if opts.rate_burst is not None:
+        s.rate_burst = opts.rate_burst
+    if opts.rate_learn:
+        s.rate_learn = True
+    if opts.trace:
+        s.trace = True
+    if opts.metrics_port is not None:
+        s.metrics_port = opts.metrics_port
+    if opts.metrics_host:
+        s.metrics_host = opts.metrics_host
+    if s.engine not in ENGINES:
+        console.print(f"[red]Engine deve ser um de: {', '.join(ENGINES)}[/]")
+        raise SystemExit(2)
+    if s.dedupe not in DEDUPE_MODES or s.dedupe_a not in DEDUPE_MODES:
+        console.print(f"[red]Dedupe deve ser um de: {', '.join(DEDUPE_MODES)}[/]")
+        raise SystemExit(2)
+    if s.audit_format not in AUDIT_FORMATS:
+        console.print(f"[red]Formato de auditoria deve ser um de: {', '.join(AUDIT_FORMATS)}[/]")
+        raise SystemExit(2)
+    if s.output_format not in FORMATS:
+        console.print(f"[red]Formato de saída deve ser um de: {', '.join(FORMATS)}[/]")
+        raise SystemExit(2)
+    try:
+        jsonlib.use(s.json_backend)
+    except (ValueError, RuntimeError) as e:
+        console.print(f"[red]{e}[/]")
+        raise SystemExit(2)
+    if s.compression not in COMPRESSIONS:
+        console.print(f"[red]Compressão deve ser uma de: {', '.join(COMPRESSIONS)}[/]")
+        raise SystemExit(2)
+    if s.post_workers and s.engine != "threads":
+        console.print("[red]--post-workers usa a engine threads[/]")
+        raise SystemExit(2)
+    if s.shard_rows < 0 or s.shard_mb < 0:
+        console.print("[red]--shard-rows/--shard-mb devem ser >= 0[/]")
+        raise SystemExit(2)
+    if not 0 <= s.metrics_port <= 65535:
+        console.print("[red]--metrics-port deve estar entre 0 e 65535[/]")
+        raise SystemExit(2)
+    try:
+        rate_rules = parse_rules(s.rate_limits)
+    except ValueError as e:
+        console.print(f"[red]{e}[/]")
+        raise SystemExit(2)
+    if s.rate_limit < 0 or s.rate_burst < 0:
+        console.print("[red]--rate-limit/--rate-burst devem ser >= 0[/]")
+        raise SystemExit(2)
+    try:
+        require_format(s.output_format, s.compression)
+    except RuntimeError as e:
+        console.print(f"[red]{e}[/]")
+        raise SystemExit(2)
 
     _print_config(s)
+    _warn_in_flight(s)
+    # auditoria em lotes numa thread própria; o buffer é gravado na saída (atexit)
+    configure_audit(s.output_dir, s.audit_format)
+
+    # Limite adaptativo compartilhado por A e B; parte de --concurrency
+    limiter = None
+    if s.adaptive:
+        limiter = AdaptiveLimiter(
+            initial=s.concurrency,
+            minimum=s.min_concurrency,
+            maximum=s.max_concurrency,
+        )
+        limit_auditor = Auditor(s.output_dir)
+        limiter.listeners.append(
+            lambda new_limit, reason: limit_auditor.write(
+                AuditRow(
+                    ts=now_iso(),
+                    group="HTTP",
+                    endpoint="*",
+                    unit="limit",
+                    index=limiter.changes,
+                    fetched=0,
+                    accumulated=limiter.in_flight,
+                    total_hint=None,
+                    percent=None,
+                    file="",
+                    limit=new_limit,
+                    reason=reason,
+                )
+            )
+        )
+
+    # requests/s (token bucket) global e por padrão; com rate_learn, mesmo sem
+    # taxa configurada, Retry-After e X-RateLimit-* viram limite
+    rate = None
+    if s.rate_limit or rate_rules or s.rate_learn:
+        rate = RateLimiter(s.rate_limit, rate_rules, s.rate_burst, learn=s.rate_learn)
+        rate_auditor = Auditor(s.output_dir)
+        rate.listeners.append(
+            lambda bucket, new_rate, reason: rate_auditor.write(
+                AuditRow(
+                    ts=now_iso(),
+                    group="HTTP",
+                    endpoint=bucket,
+                    unit="rate",
+                    index=rate.throttled,
+                    fetched=0,
+                    accumulated=rate.delayed,
+                    total_hint=None,
+                    percent=None,
+                    file="",
+                    limit=round(new_rate) if new_rate else None,
+                    reason=f"{new_rate:g} req/s: {reason}" if new_rate else f"sem limite: {reason}",
+                )
+            )
+        )
+
+    # cache opcional: a chave ignora o _ts anti-cache do HttpClient
+    response_cache = None
+    if s.http_cache:
+        response_cache = ResponseCache(
+            s.http_cache_dir or s.output_dir / "_http_cache",
+            ttl=s.http_cache_ttl,
+            max_bytes=s.http_cache_max_mb * 2**20,
+            scope=credential_scope(s.user_access, s.bearer),
+        )
+
+    recorder = CorpusRecorder(s.record_dir, s.base_url) if s.record_dir else None
+
+    # tempos por request só quando pedidos: --trace (em disco) e/ou /metrics
+    tracer = None
+    if s.trace or s.metrics_port:
+        tracer = Tracer(s.base_url, s.output_dir / TRACE_FILE if s.trace else None)
+    if tracer is not None and s.metrics_port:
+        try:
+            tracer.serve(s.metrics_port, s.metrics_host)
+        except OSError as e:
+            console.print(f"[red]--metrics-port {s.metrics_host}:{s.metrics_port}: {e}[/]")
+            raise SystemExit(2)
 
     client = HttpClient(
         base_url=s.base_url,
@@ -102,80 +679,164 @@ def _run_impl(
         bearer=s.bearer,
         timeout=s.timeout_seconds,
         max_retries=s.max_retries,
+        max_in_flight=s.max_in_flight,
+        limiter=limiter,
+        cache=response_cache,
+        recorder=recorder,
+        rate=rate,
+        tracer=tracer,
     )
 
-    mode = "all" if (all or (group is None)) else group.upper()
+    mode = "all" if (opts.all or (opts.group is None)) else opts.group.upper()
     if mode not in ("A", "B", "all"):
         console.print("[red]Parâmetro --group deve ser A ou B[/]")
         raise SystemExit(2)
 
-    a_result: Dict[str, List[dict]] = {}
-
-    # ===== Grupo A (com % correta por endpoint) =====
-    if mode in ("A", "all"):
-        selected = GROUP_A
-        if only:
-            only_set = {k.strip() for k in only.split(",") if k.strip()}
-            selected = {k: v for k, v in GROUP_A.items() if k in only_set}
-            if not selected:
+    # checkpoint sempre gravado; só é lido com --resume
+    compression = Compression(s.compression, s.compression_level, s.compression_threads)
+    sharding = Sharding(s.shard_rows, s.shard_mb)
+    # formato + compressão: um .part gzip não pode ser retomado como texto puro;
+    # com --post-workers o B grava shards, um por processo; em partes, o
+    # checkpoint aponta para a parte aberta
+    fmt_label = s.output_format if s.compression == "none" else f"{s.output_format}+{s.compression}"
+    if s.post_workers:
+        fmt_label += f"+post{s.post_workers}"
+    if sharding.enabled:
+        fmt_label += f"+parts{s.shard_rows}r{s.shard_mb}m"
+    checkpoint = CheckpointStore(s.output_dir, fmt_label)
+    if opts.resume:
+        if not checkpoint.load():
+            old = checkpoint.stored_fmt()
+            if old and old != fmt_label:
                 console.print(
-                    "[yellow]Nada a fazer: nenhum endpoint válido em --only[/]"
+                    f"[red]Checkpoint gravado com {old} (--format/--compress/--post-workers/--shard-*); retome com o mesmo formato[/]"
                 )
-                return
+                raise SystemExit(2)
+            console.print("[yellow]Nenhum checkpoint encontrado: começando do zero[/]")
+        if s.output_format == "parquet":
+            # um Parquet só é legível com o rodapé: não há ponto de retomada
+            # (com --post-workers o B grava shards jsonl, que retomam)
+            also_b = "" if s.post_workers else " (e o Grupo B, se não terminou)"
+            console.print(
+                "[yellow]--resume com parquet: endpoints concluídos ficam, mas os "
+                f"interrompidos{also_b} recomeçam do zero[/]"
+            )
+    if not opts.resume:
+        if mode in ("A", "all"):
+            checkpoint.reset_a()
+        if mode in ("B", "all"):
+            checkpoint.reset_b()
+
+    a_result: Dict[str, ExtractResult] = {}
+    # jobs do B que falharam: resumos primeiro, saída com código 1 no fim
+    incomplete: Optional[GroupBIncomplete] = None
 
+    selected = GROUP_A
+    if opts.only:
+        only_set = {k.strip() for k in opts.only.split(",") if k.strip()}
+        selected = {k: v for k, v in GROUP_A.items() if k in only_set}
+        if not selected and mode in ("A", "all"):
+            console.print("[yellow]Nada a fazer: nenhum endpoint válido em --only[/]")
+            return
+
+    ga = GroupAExtractor(
+        client,
+        s.output_dir,
+        s.page_limit,
+        s.page_workers,
+        s.endpoint_workers,
+        fmt=s.output_format,
+        checkpoint=checkpoint,
+        dedupe=s.dedupe_a,
+        compression=compression,
+        sharding=sharding,
+        id_hashes=s.delta,
+    )
+    # com limite adaptativo, o pool precisa comportar o teto; o limitador segura o resto
+    b_workers = s.max_concurrency if limiter else s.concurrency
+    tracker = DeltaTracker(s.output_dir) if s.delta and mode in ("B", "all") else None
+    gb = GroupBExtractor(
+        client,
+        s.output_dir,
+        s.page_limit,
+        b_workers,
+        fmt=s.output_format,
+        checkpoint=checkpoint,
+        delta=tracker,
+        window=s.b_window,
+        dedupe=s.dedupe,
+        progress_hz=s.progress_hz,
+        compression=compression,
+        post_workers=s.post_workers,
+        sharding=sharding,
+    )
+    selected = ga.order(selected)
+
+    # engine async: o Grupo B roda num único event loop (aiohttp)
+    aclient = None
+    if s.engine == "async" and mode in ("B", "all"):
+        try:
+            aclient = AsyncHttpClient(
+                base_url=s.base_url,
+                user_access=s.user_access,
+                bearer=s.bearer,
+                timeout=s.timeout_seconds,
+                max_retries=s.max_retries,
+                max_in_flight=s.max_in_flight,
+                limiter=limiter,
+                cache=response_cache,
+                recorder=recorder,
+                rate=rate,
+                tracer=tracer,
+            )
+        except RuntimeError as e:
+            console.print(f"[red]{e}[/]")
+            raise SystemExit(2)
+
+    # ===== Pipeline A → B (B começa enquanto A ainda pagina) =====
+    if mode == "all" and s.pipeline:
         console.print(
-            Panel("Grupo [bold]A[/] — endpoints independentes", border_style="cyan")
+            Panel(
+                "Grupos [bold]A[/] + [bold]B[/] — pipeline (B consome as páginas do A)",
+                border_style="magenta",
+            )
         )
-        ga = GroupAExtractor(client, s.output_dir, s.page_limit)
-
-        # A task "Endpoints A" (global) permanece como estava
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            BarColumn(),
-            TextColumn("{task.percentage:>6.2f}%"),
-            TimeElapsedColumn(),
-            transient=False,
-            console=console,
-        ) as progress:
-            task_endpoints = progress.add_task("Endpoints A", total=len(selected))
-
-            for key, path in selected.items():
-                # Subtask do endpoint: controlamos % manualmente (0 → 100)
-                sub_id = progress.add_task(f"{key}: 0/? (—%)", total=100, completed=0)
-
-                def on_page(
-                    _endpoint: str,
-                    page_index: int,
-                    fetched: int,
-                    accumulated: int,
-                    total_hint: Optional[int],
-                    percent: Optional[float],  # ignorado
-                ):
-                    if total_hint and total_hint > 0:
-                        raw = (accumulated / total_hint) * 100.0
-                        p = max(0.0, min(100.0, round(raw, 2)))
-                        desc = f"{key}: {accumulated}/{total_hint} ({p:.2f}%)"
-                        progress.update(sub_id, completed=p, description=desc)
-                    else:
-                        # sem total conhecido, não chutamos %
-                        desc = f"{key}: {accumulated}/? (—%)"
-                        progress.update(sub_id, description=desc)
-
-                _, rows = ga.extract_one(path, progress_cb=on_page)
-
-                from betha_extractor.writers import write_json
-
-                write_json(s.output_dir, key, rows)
-
-                # Fecha a subtask em 100% com números finais
-                total_rows = len(rows)
-                progress.update(
-                    sub_id,
-                    completed=100,
-                    description=f"{key}: {total_rows}/{total_rows} (100.00%)",
+        try:
+            with _live(limiter) as progress:
+                on_page, on_done = _group_a_callbacks(progress, selected)
+                on_job = _group_b_callback(progress, gb)
+                a_result, buckets = run_pipelined(
+                    ga,
+                    gb,
+                    selected,
+                    s.base_url,
+                    queue_size=s.pipeline_queue,
+                    a_progress_cb=on_page,
+                    a_done_cb=on_done,
+                    b_progress_cb=on_job,
+                    aclient=aclient,
                 )
-                progress.advance(task_endpoints)
+        except GroupBIncomplete as e:
+            a_result, buckets, incomplete = e.a_result, e.results, e
+        _print_summary("Grupo A", a_result, s.output_dir)
+        _print_summary("Grupo B", buckets, s.output_dir)
+        _print_throughput(gb.metrics)
+        _print_delta(tracker)
+        _finish_cache(response_cache)
+        _finish_rate(rate)
+        _finish_trace(tracer, s.output_dir, s.trace)
+        _finish_record(recorder)
+        _b_incomplete(incomplete, checkpoint)
+        return
+
+    # ===== Grupo A (com % correta por endpoint) =====
+    if mode in ("A", "all"):
+        console.print(
+            Panel("Grupo [bold]A[/] — endpoints independentes", border_style="cyan")
+        )
+        with _live(limiter) as progress:
+            on_page, on_done = _group_a_callbacks(progress, selected)
+            a_result = ga.run(selected, progress_cb=on_page, done_cb=on_done)
 
         _print_summary("Grupo A", a_result, s.output_dir)
 
@@ -185,61 +846,50 @@ def _run_impl(
             Panel("Grupo [bold]B[/] — endpoints dependentes", border_style="green")
         )
 
-        if mode == "B":
-            a_result = {}
-            for key in ("imoveis", "contribuintes"):
-                p = s.output_dir / f"{key}.json"
-                if p.exists():
-                    try:
-                        a_result[key] = json.loads(p.read_text(encoding="utf-8"))
-                    except Exception:
-                        a_result[key] = []
-
-        gb = GroupBExtractor(client, s.output_dir, s.page_limit, s.concurrency)
-
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            BarColumn(),
-            TextColumn("{task.percentage:>6.2f}%"),
-            TimeElapsedColumn(),
-            transient=False,
-            console=console,
-        ) as progress:
-            task_jobs = progress.add_task("Jobs B", total=1)
-            first_call = {"done": False}
-
-            def on_job(
-                done_jobs: int,
-                total_jobs: int,
-                endpoint: str,
-                fetched: int,
-                accumulated_global: int,
-                percent: Optional[float],
-            ):
-                # Ajusta total no primeiro callback para refletir a fila real
-                if not first_call["done"]:
-                    progress.update(task_jobs, total=max(1, total_jobs))
-                    first_call["done"] = True
-
-                if total_jobs and total_jobs > 0:
-                    raw = (done_jobs / total_jobs) * 100.0
-                    p = max(0.0, min(100.0, round(raw, 2)))
-                    progress.update(
-                        task_jobs,
-                        completed=done_jobs,
-                        description=f"Jobs B — {done_jobs}/{total_jobs} ({p:.2f}%)  last={endpoint}[+{fetched}] total={accumulated_global}",
+        # Os registros do A não ficam em memória: os ids vêm do índice
+        # `_ids/<pai>.ids` gravado pelo A (ou, sem ele, relemos as
+        # saídas em disco) e os jobs são gerados sob demanda; o total para o
+        # progresso vem do índice ou das contagens do A
+        # com o A nesta execução, só os pais que ele extraiu (como no
+        # pipeline); só com --group B as saídas de uma execução anterior
+        from_disk = mode == "B"
+        _print_parents(s.output_dir, a_result, from_disk)
+        b_input, b_ids, parent_counts = parent_inputs(
+            s.output_dir, a_result, from_disk=from_disk, hashes=tracker is not None
+        )
+
+        try:
+            with _live(limiter) as progress:
+                on_job = _group_b_callback(progress, gb)
+                if aclient is None:
+                    buckets = gb.run(
+                        b_input,
+                        s.base_url,
+                        progress_cb=on_job,
+                        parent_counts=parent_counts,
+                        parent_ids=b_ids,
                     )
                 else:
-                    progress.update(
-                        task_jobs,
-                        completed=done_jobs,
-                        description=f"Jobs B — {done_jobs}/? (—%)  last={endpoint}[+{fetched}] total={accumulated_global}",
+                    buckets = gb.run_async(
+                        aclient,
+                        b_input,
+                        s.base_url,
+                        progress_cb=on_job,
+                        parent_counts=parent_counts,
+                        parent_ids=b_ids,
                     )
-
-            buckets = gb.run(a_result, s.base_url, progress_cb=on_job)
+        except GroupBIncomplete as e:
+            buckets, incomplete = e.results, e
 
         _print_summary("Grupo B", buckets, s.output_dir)
+        _print_throughput(gb.metrics)
+        _print_delta(tracker)
+
+    _finish_cache(response_cache)
+    _finish_rate(rate)
+    _finish_trace(tracer, s.output_dir, s.trace)
+    _finish_record(recorder)
+    _b_incomplete(incomplete, checkpoint)
 
 
 @app.command(help="Extrai Grupo A, Grupo B ou ambos (padrão).")
@@ -257,8 +907,377 @@ def run(
     concurrency: int = typer.Option(
         None, "--concurrency", help="Concorrência para Grupo B"
     ),
+    page_workers: int = typer.Option(
+        None,
+        "--page-workers",
+        help="Páginas buscadas em paralelo no Grupo A (quando a API informa o total)",
+    ),
+    endpoint_workers: int = typer.Option(
+        None, "--endpoint-workers", help="Endpoints do Grupo A extraídos ao mesmo tempo"
+    ),
+    max_in_flight: int = typer.Option(
+        None,
+        "--max-in-flight",
+        help="Limite global de requests simultâneos (0 = sem limite)",
+    ),
+    pipeline: bool = typer.Option(
+        False,
+        "--pipeline",
+        help="A + B sobrepostos: cada página do A já alimenta os jobs do B",
+    ),
+    output_format: str = typer.Option(
+        None,
+        "--format",
+        help="Formato de saída: json (indentado), jsonl, json-compact ou parquet",
+        case_sensitive=False,
+    ),
+    engine: str = typer.Option(
+        None,
+        "--engine",
+        help="Engine HTTP do Grupo B: threads (requests) ou async (aiohttp)",
+        case_sensitive=False,
+    ),
+    adaptive: bool = typer.Option(
+        False,
+        "--adaptive",
+        help="Limite adaptativo (AIMD) de requests em voo, guiado por latência e 429/5xx",
+    ),
+    max_concurrency: int = typer.Option(
+        None, "--max-concurrency", help="Teto do limite adaptativo"
+    ),
+    resume: bool = typer.Option(
+        False,
+        "--resume",
+        help="Retoma uma execução interrompida a partir do _checkpoint.json",
+    ),
+    delta: bool = typer.Option(
+        False,
+        "--delta",
+        help="Grupo B só para imóveis/contribuintes novos ou alterados desde a última execução",
+    ),
+    b_window: int = typer.Option(
+        None,
+        "--b-window",
+        help="Jobs do Grupo B em aberto ao mesmo tempo (padrão: 4 × concorrência)",
+    ),
+    dedupe: str = typer.Option(
+        None,
+        "--dedupe",
+        help="Dedupe do Grupo B: record (registro inteiro), key (key_of + pai) ou off",
+        case_sensitive=False,
+    ),
+    dedupe_a: str = typer.Option(
+        None,
+        "--dedupe-a",
+        help="Dedupe do Grupo A, para APIs que repetem registros entre páginas (padrão: off)",
+        case_sensitive=False,
+    ),
+    audit_format: str = typer.Option(
+        None,
+        "--audit-format",
+        help="Formato da auditoria: csv (padrão), csv.gz ou off",
+        case_sensitive=False,
+    ),
+    progress_hz: float = typer.Option(
+        None,
+        "--progress-hz",
+        help="Atualizações por segundo do progresso do Grupo B (0 = a cada job)",
+    ),
+    cache: bool = typer.Option(
+        False,
+        "--cache",
+        help="Cache local de respostas HTTP (TTL + revalidação ETag/Last-Modified)",
+    ),
+    cache_ttl: float = typer.Option(
+        None, "--cache-ttl", help="Segundos em que uma resposta do cache vale sem revalidar"
+    ),
+    cache_max_mb: int = typer.Option(
+        None, "--cache-max-mb", help="Tamanho máximo do cache (LRU)"
+    ),
+    record: Path = typer.Option(
+        None,
+        "--record",
+        help="Grava as respostas num corpus para o mock-server (replay)",
+    ),
+    compress: str = typer.Option(
+        None,
+        "--compress",
+        help="Compressão em streaming das saídas de texto: none, gzip ou zstd (.gz/.zst)",
+        case_sensitive=False,
+    ),
+    compress_level: int = typer.Option(
+        None, "--compress-level", help="Nível de compressão (gzip 1–9, zstd 1–22)"
+    ),
+    compress_threads: int = typer.Option(
+        None,
+        "--compress-threads",
+        help="Threads de compressão do zstd (0 = na thread que grava)",
+    ),
+    json_backend: str = typer.Option(
+        None,
+        "--json-backend",
+        help="Parser/encoder JSON: auto (orjson, msgspec ou stdlib), orjson, msgspec ou stdlib",
+        case_sensitive=False,
+    ),
+    post_workers: int = typer.Option(
+        None,
+        "--post-workers",
+        help="Processos que decodificam, deduplicam e gravam as respostas do Grupo B (0 = no processo principal)",
+    ),
+    shard_rows: int = typer.Option(
+        None,
+        "--shard-rows",
+        help="Saída em partes (<endpoint>/part-*.ext + _manifest.json): registros por parte",
+    ),
+    shard_mb: int = typer.Option(
+        None,
+        "--shard-mb",
+        help="Saída em partes: MB por parte, aproximado (o que vier primeiro com --shard-rows)",
+    ),
+    rate_limit: float = typer.Option(
+        None, "--rate-limit", help="Requests por segundo, global (0 = sem limite)"
+    ),
+    rate_limits: str = typer.Option(
+        None,
+        "--rate-limits",
+        help="Requests/s por padrão de endpoint, ex.: 'imoveis/*/proprietarios=20,bairros=5'",
+    ),
+    rate_burst: float = typer.Option(
+        None, "--rate-burst", help="Rajada de cada balde, em requests (1 = espaçados)"
+    ),
+    rate_learn: bool = typer.Option(
+        False,
+        "--rate-learn",
+        help="Ajusta as taxas pelos cabeçalhos Retry-After/X-RateLimit-* da API",
+    ),
+    trace: bool = typer.Option(
+        False,
+        "--trace",
+        help="Grava _trace.jsonl (tempos de cada request) e _metrics.prom (Prometheus) no fim",
+    ),
+    metrics_port: int = typer.Option(
+        None, "--metrics-port", help="Serve /metrics (Prometheus) nesta porta durante a execução"
+    ),
+    metrics_host: str = typer.Option(
+        None,
+        "--metrics-host",
+        help="Interface do /metrics (padrão 127.0.0.1; 0.0.0.0 expõe em todas)",
+    ),
 ):
-    _run_impl(all, group, only, output, limit, timeout, concurrency)
+    _run_impl(
+        RunOptions(
+            all=all,
+            group=group,
+            only=only,
+            output=output,
+            limit=limit,
+            timeout=timeout,
+            concurrency=concurrency,
+            page_workers=page_workers,
+            endpoint_workers=endpoint_workers,
+            max_in_flight=max_in_flight,
+            pipeline=pipeline,
+            output_format=output_format,
+            engine=engine,
+            adaptive=adaptive,
+            max_concurrency=max_concurrency,
+            resume=resume,
+            delta=delta,
+            b_window=b_window,
+            dedupe=dedupe,
+            dedupe_a=dedupe_a,
+            audit_format=audit_format,
+            progress_hz=progress_hz,
+            cache=cache,
+            cache_ttl=cache_ttl,
+            cache_max_mb=cache_max_mb,
+            record=record,
+            compress=compress,
+            compress_level=compress_level,
+            compress_threads=compress_threads,
+            json_backend=json_backend,
+            post_workers=post_workers,
+            shard_rows=shard_rows,
+            shard_mb=shard_mb,
+            rate_limit=rate_limit,
+            rate_limits=rate_limits,
+            rate_burst=rate_burst,
+            rate_learn=rate_learn,
+            trace=trace,
+            metrics_port=metrics_port,
+            metrics_host=metrics_host,
+        )
+    )
+
+
+@app.command(help="Extrai vários municípios (tenants) de um manifesto, num processo só.")
+def batch(
+    manifest: Path = typer.Argument(..., help="Manifesto JSON com os tenants"),
+    group: str = typer.Option(
+        None, "--group", help="Extrai apenas um grupo em todos os tenants", case_sensitive=False
+    ),
+    output: Path = typer.Option(
+        None, "--output", help="Diretório base (cada tenant grava em <base>/<nome>)"
+    ),
+    tenants: int = typer.Option(
+        None, "--tenants", help="Tenants extraídos ao mesmo tempo"
+    ),
+    max_in_flight: int = typer.Option(
+        None,
+        "--max-in-flight",
+        help="Teto global de requests simultâneos, dividido entre os tenants em round-robin",
+    ),
+    resume: bool = typer.Option(
+        False, "--resume", help="Retoma cada tenant a partir do seu _checkpoint.json"
+    ),
+    json_backend: str = typer.Option(
+        None,
+        "--json-backend",
+        help="Parser/encoder JSON: auto (orjson, msgspec ou stdlib), orjson, msgspec ou stdlib",
+        case_sensitive=False,
+    ),
+):
+    _banner()
+    s = load_settings(require_credentials=False)
+    if output:
+        s.output_dir = output.resolve()
+    if tenants:
+        s.batch_tenants = tenants
+    if max_in_flight:
+        s.batch_in_flight = max_in_flight
+    if json_backend:
+        s.json_backend = json_backend.lower()
+    mode = group.upper() if group else "all"
+    if mode not in ("A", "B", "all"):
+        console.print("[red]Parâmetro --group deve ser A ou B[/]")
+        raise SystemExit(2)
+    try:
+        jsonlib.use(s.json_backend)
+        fleet = load_manifest(manifest, s)
+    except (OSError, ValueError, RuntimeError) as e:
+        console.print(f"[red]{e}[/]")
+        raise SystemExit(2)
+
+    t = Table(title="Lote", show_lines=False, expand=True, title_style="bold blue")
+    t.add_column("Chave", style="cyan", no_wrap=True)
+    t.add_column("Valor", style="white")
+    t.add_row("Manifesto", str(manifest))
+    t.add_row("Tenants", f"{len(fleet)} ({s.batch_tenants} ao mesmo tempo)")
+    t.add_row("Requests em voo (lote)", str(s.batch_in_flight))
+    t.add_row("Grupos", "A + B" if mode == "all" else mode)
+    t.add_row("JSON", jsonlib.name)
+    console.print(t)
+
+    gate = FairGate(s.batch_in_flight)
+    with _progress() as progress:
+        tasks = {
+            ten.name: progress.add_task(f"{ten.name}: na fila", total=None) for ten in fleet
+        }
+
+        def on_event(name: str, phase: str, detail: str):
+            label = {"fila": "na fila", "ok": "concluído", "erro": "[red]erro[/]"}.get(phase, phase)
+            text = f"{name}: {label}" + (f" — {detail}" if detail else "")
+            if phase in ("ok", "erro"):
+                progress.update(tasks[name], description=text, total=1, completed=1)
+            else:
+                progress.update(tasks[name], description=text)
+
+        results = run_batch(
+            fleet, gate, mode=mode, resume=resume, workers=s.batch_tenants, on_event=on_event
+        )
+
+    tb = Table(title="Resumo — Lote", title_style="bold purple", expand=True)
+    tb.add_column("Tenant", style="cyan", no_wrap=True)
+    tb.add_column("Status")
+    tb.add_column("Registros A", style="green", justify="right")
+    tb.add_column("Registros B", style="green", justify="right")
+    tb.add_column("Requests", style="white", justify="right")
+    tb.add_column("Tempo", style="yellow", justify="right")
+    tb.add_column("Saída", style="white")
+    for r in results:
+        tb.add_row(
+            r.name,
+            "[green]ok[/]" if r.ok else "[red]erro[/]",
+            str(r.a_rows),
+            str(r.b_rows),
+            str(gate.granted.get(r.name, 0)),
+            f"{r.elapsed:.1f}s",
+            str(r.output_dir),
+        )
+    console.print(tb)
+    failed = [r for r in results if not r.ok]
+    for r in failed:
+        console.print(f"[red]{r.name}:[/] {r.error}")
+    if failed:
+        console.print(f"[red]{len(failed)} tenant(s) com erro[/]")
+        raise SystemExit(1)
+
+
+@app.command("mock-server", help="Sobe a API Betha local: dados sintéticos ou replay de um corpus.")
+def mock_server(
+    host: str = typer.Option("127.0.0.1", "--host"),
+    port: int = typer.Option(8000, "--port"),
+    corpus: Path = typer.Option(
+        None, "--corpus", help="Diretório gravado com --record (replay); sem ele, dados sintéticos"
+    ),
+    imoveis: int = typer.Option(None, "--imoveis", help="Imóveis sintéticos"),
+    contribuintes: int = typer.Option(None, "--contribuintes", help="Contribuintes sintéticos"),
+    latency: float = typer.Option(0.0, "--latency", help="Latência por request (s)"),
+    error_rate: float = typer.Option(0.0, "--error-rate", help="Fração dos requests com 5xx"),
+    throttle_rate: float = typer.Option(0.0, "--throttle-rate", help="Fração dos requests com 429"),
+    retry_after: float = typer.Option(0.0, "--retry-after", help="Retry-After (s) dos 429"),
+    quota: float = typer.Option(
+        0.0, "--quota", help="Cota em requests/s (janelas de 1 s, X-RateLimit-* e 429 acima dela)"
+    ),
+    seed: int = typer.Option(None, "--seed", help="Semente das falhas injetadas (reprodutível)"),
+):
+    data = None
+    if corpus is not None:
+        if not (corpus / CORPUS_FILE).exists():
+            console.print(f"[red]Corpus não encontrado:[/] {corpus / CORPUS_FILE}")
+            raise SystemExit(2)
+        data = load_corpus(corpus)
+    sizes = dict(DEFAULT_SIZES)
+    if imoveis is not None:
+        sizes["imoveis"] = imoveis
+    if contribuintes is not None:
+        sizes["contribuintes"] = contribuintes
+    cfg = MockConfig(
+        sizes=sizes,
+        latency=latency,
+        error_rate=error_rate,
+        throttle_rate=throttle_rate,
+        retry_after=retry_after,
+        corpus=data,
+        seed=seed,
+        quota=quota,
+    )
+    server = make_server(host, port, cfg)
+    h, p = server.server_address[:2]
+    source = f"replay de {len(data)} respostas ({corpus})" if data is not None else (
+        f"sintético ({sizes['imoveis']} imóveis, {sizes['contribuintes']} contribuintes)"
+    )
+    console.print(
+        Panel.fit(
+            f"[bold]Mock Betha[/] em [cyan]http://{h}:{p}[/] — {source}\n"
+            f"latência {latency:g}s · 5xx {error_rate:.1%} · 429 {throttle_rate:.1%}"
+            + (f" · cota {quota:g} req/s" if quota else "")
+            + "\n"
+            f"[dim]BETHA_BASE_URL=http://{h}:{p} (tokens quaisquer); Ctrl-C encerra[/]",
+            border_style="magenta",
+        )
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        st = cfg.stats
+        console.print(
+            f"requests: {st['requests']} · 429: {st['throttled']} · 5xx: {st['errors']} · "
+            f"fora do corpus: {st['missing']}"
+        )
 
 
 def _interactive_menu():
@@ -273,16 +1292,16 @@ def _interactive_menu():
     )
     choice = console.input("\nDigite [1-5]: ").strip()
     if choice == "1":
-        _run_impl(False, "A", None, None, None, None, None)
+        _run_impl(RunOptions(group="A"))
     elif choice == "2":
-        _run_impl(False, "B", None, None, None, None, None)
+        _run_impl(RunOptions(group="B"))
     elif choice == "3":
-        _run_impl(True, None, None, None, None, None, None)
+        _run_impl(RunOptions(all=True))
     elif choice == "4":
         only = console.input(
             "Informe endpoints de A separados por vírgula (ex.: imoveis,logradouros): "
         ).strip()
-        _run_impl(False, "A", only, None, None, None, None)
+        _run_impl(RunOptions(group="A", only=only))
     else:
         console.print("[red]Saindo...[/]")
         raise SystemExit(0)
@@ -0,0 +1,79 @@
+from __future__ import annotations
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Dict
+
+
+@dataclass
+class EndpointStats:
+    jobs: int = 0        # jobs concluídos (todas as páginas)
+    pages: int = 0       # requests respondidos
+    rows: int = 0        # registros recebidos
+    bytes: int = 0       # bytes de payload recebidos
+    started: float = 0.0
+    last: float = 0.0
+
+    @property
+    def elapsed(self) -> float:
+        return max(self.last - self.started, 1e-9)
+
+    def rate(self, value: int) -> float:
+        return value / self.elapsed if self.pages else 0.0
+
+
+class Metrics:
+    """Contadores correntes por endpoint: cada registro é O(1) e as taxas
+    (jobs/s, rows/s, bytes/s) saem de um snapshot, só quando a UI pede."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stats: Dict[str, EndpointStats] = {}
+
+    def record(self, endpoint: str, jobs: int = 0, pages: int = 0, rows: int = 0, nbytes: int = 0) -> None:
+        now = time.monotonic()
+        with self._lock:
+            st = self._stats.get(endpoint)
+            if st is None:
+                st = self._stats[endpoint] = EndpointStats(started=now)
+            st.jobs += jobs
+            st.pages += pages
+            st.rows += rows
+            st.bytes += nbytes
+            st.last = now
+
+    def snapshot(self) -> Dict[str, EndpointStats]:
+        with self._lock:
+            return {k: replace(v) for k, v in self._stats.items()}
+
+
+class Throttle:
+    """No máximo `hz` liberações por segundo (0 = sempre)."""
+
+    def __init__(self, hz: float = 10.0):
+        self.interval = 1.0 / hz if hz > 0 else 0.0
+        self._next = 0.0
+
+    def ready(self) -> bool:
+        now = time.monotonic()
+        if now < self._next:
+            return False
+        self._next = now + self.interval
+        return True
+
+
+def human_bytes(n: float) -> str:
+    if n < 1024:
+        return f"{n:.0f} B"
+    for unit in ("KB", "MB"):
+        n /= 1024
+        if n < 1024:
+            return f"{n:.1f} {unit}"
+    return f"{n / 1024:.1f} GB"
+
+
+def rates_line(st: EndpointStats) -> str:
+    return (
+        f"{st.rate(st.jobs):.0f} jobs/s · {st.rate(st.rows):.0f} rows/s · "
+        f"{human_bytes(st.rate(st.bytes))}/s"
+    )
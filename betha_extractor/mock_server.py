@@ -0,0 +1,229 @@
+from __future__ import annotations
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, parse_qsl, urlparse
+
+from .corpus import corpus_key
+from .endpoints import GROUP_A
+
+# Servidor local que imita a API Betha (sem tokens): dados sintéticos ou o
+# replay de um corpus gravado com --record, com latência, 429 e 5xx
+# injetáveis, e uma cota de requests/s com cabeçalhos X-RateLimit-*. Usado pelos benchmarks; os extratores rodam contra ele sem
+# alteração.
+
+DEFAULT_SIZES: Dict[str, int] = {
+    "imoveis": 2000,
+    "contribuintes": 1500,
+    "logradouros": 400,
+    "bairros": 40,
+    "distritos": 3,
+    "loteamentos": 25,
+    "secoes": 60,
+    "condominios": 10,
+}
+
+# filhos por registro pai: id % n (determinístico, alguns pais sem filhos)
+CHILD_MODULO = {"proprietarios": 4, "testadas": 3, "campos-adicionais": 6, "enderecos": 3}
+
+
+class MockConfig:
+    def __init__(
+        self,
+        sizes: Optional[Dict[str, int]] = None,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: float = 0.0,
+        corpus: Optional[Dict[str, Tuple[int, bytes]]] = None,
+        seed: Optional[int] = None,
+        quota: float = 0.0,
+    ):
+        self.sizes = dict(DEFAULT_SIZES if sizes is None else sizes)
+        self.latency = latency
+        # fração dos requests respondida com 5xx / 429 (Retry-After: retry_after)
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        # replay: chave (corpus_key) -> (status, corpo); None = sintético
+        self.corpus = corpus
+        # cota em requests/s, em janelas de 1 s (0 = sem cota); acima dela, 429
+        self.quota = quota
+        self._window = 0.0
+        self._used = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"requests": 0, "throttled": 0, "errors": 0, "missing": 0}
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def take_quota(self) -> Tuple[bool, Dict[str, str]]:
+        """(dentro da cota, cabeçalhos X-RateLimit-*) deste request."""
+        if not self.quota:
+            return True, {}
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window >= 1.0:
+                self._window, self._used = now, 0
+            ok = self._used < self.quota
+            if ok:
+                self._used += 1
+            remaining = max(0, int(self.quota) - self._used)
+            reset = max(0.0, 1.0 - (now - self._window))
+        headers = {
+            "X-RateLimit-Limit": f"{self.quota:g}",
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset": f"{reset:.3f}",
+        }
+        if not ok:
+            headers["Retry-After"] = "1"
+        return ok, headers
+
+    def fault(self) -> Optional[int]:
+        """Status injetado neste request (429/5xx) ou None."""
+        if not (self.error_rate or self.throttle_rate):
+            return None
+        with self._lock:
+            r = self._rng.random()
+            if r < self.throttle_rate:
+                return 429
+            if r < self.throttle_rate + self.error_rate:
+                return self._rng.choice((500, 502, 503))
+        return None
+
+
+def _record(endpoint: str, i: int) -> Dict[str, Any]:
+    return {
+        "id": i,
+        "codigo": f"{endpoint[:3].upper()}-{i:06d}",
+        "descricao": f"{endpoint} {i}",
+        "situacao": "ATIVO" if i % 7 else "INATIVO",
+        "endereco": {"logradouro": f"Rua {i % 97}", "numero": str(i % 1000)},
+    }
+
+
+def _child(parent: str, pid: int, child: str, k: int) -> Dict[str, Any]:
+    return {"id": pid * 100 + k, "tipo": child, "ordem": k, "valor": f"{parent}-{pid}-{k}"}
+
+
+def _page(rows_total: int, offset: int, limit: int, make) -> Dict[str, Any]:
+    end = min(rows_total, offset + limit)
+    return {
+        "content": [make(i) for i in range(offset, end)],
+        "hasNext": end < rows_total,
+        "totalElements": rows_total,
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # cabeçalho e corpo saem em writes separados: sem isso, Nagle + ACK
+    # atrasado somam ~40 ms a cada request keep-alive
+    disable_nagle_algorithm = True
+    config: MockConfig
+    # cabeçalhos da cota, em todas as respostas do request corrente
+    _extra: Dict[str, str] = {}
+
+    def log_message(self, *args) -> None:  # silencioso
+        pass
+
+    def _send(self, status: int, body: Any = None, headers: Optional[Dict[str, str]] = None) -> None:
+        if isinstance(body, bytes):
+            data = body
+        else:
+            data = b"" if body is None else json.dumps(body, ensure_ascii=False).encode("utf-8")
+        if status == 200:
+            # ETag do conteúdo: permite testar a revalidação (304) do cache
+            etag = '"' + hashlib.blake2b(data, digest_size=8).hexdigest() + '"'
+            headers = {**(headers or {}), "ETag": etag}
+            if self.headers.get("If-None-Match") == etag:
+                status, data = 304, b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in {**self._extra, **(headers or {})}.items():
+            self.send_header(k, v)
+        self.end_headers()
+        if data:
+            self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        cfg = self.config
+        cfg.count("requests")
+        if cfg.latency:
+            time.sleep(cfg.latency)
+        ok, self._extra = cfg.take_quota()
+        if not ok:
+            cfg.count("throttled")
+            self._send(429, {"message": "Too Many Requests"})
+            return
+        status = cfg.fault()
+        if status == 429:
+            cfg.count("throttled")
+            self._send(429, {"message": "Too Many Requests"}, {"Retry-After": f"{cfg.retry_after:g}"})
+            return
+        if status is not None:
+            cfg.count("errors")
+            self._send(status, {"message": "erro injetado"})
+            return
+        u = urlparse(self.path)
+        if cfg.corpus is not None:
+            hit = cfg.corpus.get(corpus_key(u.path, parse_qsl(u.query, keep_blank_values=True)))
+            if hit is None:
+                cfg.count("missing")
+                self._send(404)
+            else:
+                self._send(hit[0], hit[1] or None)
+            return
+        q = parse_qs(u.query)
+        limit = max(1, int((q.get("limit") or q.get("size") or ["50"])[0]))
+        offset = int((q.get("offset") or ["0"])[0])
+        parts = [p for p in u.path.split("/") if p]
+
+        if len(parts) >= 1 and parts[-1] in GROUP_A and parts[-1] in cfg.sizes:
+            ep = parts[-1]
+            self._send(200, _page(cfg.sizes[ep], offset, limit, lambda i: _record(ep, i + 1)))
+            return
+        if len(parts) >= 3 and parts[-3] in ("imoveis", "contribuintes") and parts[-1] in CHILD_MODULO:
+            parent, raw_id, child = parts[-3], parts[-2], parts[-1]
+            try:
+                pid = int(raw_id)
+            except ValueError:
+                self._send(404)
+                return
+            if pid < 1 or pid > cfg.sizes.get(parent, 0):
+                self._send(404)
+                return
+            n = pid % CHILD_MODULO[child]
+            self._send(200, _page(n, offset, limit, lambda k: _child(parent, pid, child, k)))
+            return
+        self._send(404)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # backlog maior: o engine async abre centenas de conexões de uma vez
+    request_queue_size = 1024
+
+
+def make_server(host: str = "127.0.0.1", port: int = 0, config: Optional[MockConfig] = None) -> ThreadingHTTPServer:
+    handler = type("MockHandler", (_Handler,), {"config": config or MockConfig()})
+    return _Server((host, port), handler)
+
+
+def start_in_thread(
+    config: Optional[MockConfig] = None,
+    host: str = "127.0.0.1",
+    port: int = 0,
+) -> Tuple[ThreadingHTTPServer, str]:
+    """Sobe o servidor em background; devolve (server, base_url)."""
+    server = make_server(host, port, config)
+    threading.Thread(target=server.serve_forever, name="mock-betha", daemon=True).start()
+    h, p = server.server_address[:2]
+    return server, f"http://{h}:{p}"
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 def pick_rows(body: Any) -> List[Dict]:
     if isinstance(body, list):
@@ -12,6 +12,14 @@ def pick_rows(body: Any) -> List[Dict]:
             return v
     return []
 
+def total_of(body: Any) -> Optional[int]:
+    if not isinstance(body, dict):
+        return None
+    for k in ("totalElements", "total", "totalItems", "totalCount"):
+        if isinstance(body.get(k), int) and body[k] > 0:
+            return body[k]
+    return None
+
 def key_of(o: Any) -> str:
     if not isinstance(o, dict):
         return ""
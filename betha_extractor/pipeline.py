@@ -0,0 +1,126 @@
+from __future__ import annotations
+import asyncio
+import queue
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .endpoints import GROUP_B_PARENTS, jobs_for_rows
+from .extractors.group_a import GroupAExtractor, ProgressCB as ProgressA, DoneCB
+from .extractors.group_b import (
+    IDLE,
+    GroupBExtractor,
+    GroupBIncomplete,
+    ProgressCB as ProgressB,
+)
+from .extractors.base import ExtractResult
+
+_STOP = object()
+# o Grupo A falhou: o B para sem concluir (checkpoint retomável, nada publicado)
+_FAILED = object()
+
+
+class _Cancelled(Exception):
+    pass
+
+
+class _GroupAFailed(Exception):
+    pass
+
+
+def run_pipelined(
+    ga: GroupAExtractor,
+    gb: GroupBExtractor,
+    endpoints: Dict[str, str],
+    base_url: str,
+    queue_size: int = 1000,
+    a_progress_cb: Optional[ProgressA] = None,
+    a_done_cb: Optional[DoneCB] = None,
+    b_progress_cb: Optional[ProgressB] = None,
+    aclient=None,
+) -> Tuple[Dict[str, ExtractResult], Dict[str, ExtractResult]]:
+    """Roda A e B sobrepostos: cada página de imoveis/contribuintes vira jobs
+    do Grupo B na hora. A fila limitada segura o Grupo A quando o B atrasa.
+    Com `aclient` (AsyncHttpClient) o Grupo B roda no engine async. Se o A
+    falhar, o B para como numa interrupção (checkpoint retomável, saídas não
+    publicadas) e o erro do A sobe."""
+    jobs: "queue.Queue" = queue.Queue(maxsize=max(1, queue_size))
+    cancelled = threading.Event()
+    a_result: Dict[str, ExtractResult] = {}
+    a_error: List[BaseException] = []
+
+    def put(item) -> None:
+        while True:
+            if cancelled.is_set():
+                raise _Cancelled()
+            try:
+                jobs.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def feed(key: str, rows: List[dict]) -> None:
+        if key not in GROUP_B_PARENTS:
+            return
+        if gb.delta is not None:
+            rows = gb.delta.changed(key, rows)
+        for job in jobs_for_rows(base_url, key, rows):
+            put(job)
+
+    def produce() -> None:
+        try:
+            a_result.update(
+                ga.run(
+                    endpoints,
+                    progress_cb=a_progress_cb,
+                    done_cb=a_done_cb,
+                    rows_cb=feed,
+                )
+            )
+        except _Cancelled:
+            pass
+        except BaseException as e:
+            a_error.append(e)
+        finally:
+            try:
+                put(_FAILED if a_error else _STOP)
+            except _Cancelled:
+                pass
+
+    def source() -> Iterator[dict]:
+        # nunca bloqueia: com a fila vazia o B segue colhendo e agendando
+        while True:
+            try:
+                item = jobs.get_nowait()
+            except queue.Empty:
+                yield IDLE
+                continue
+            if item is _STOP:
+                return
+            if item is _FAILED:
+                raise _GroupAFailed()
+            yield item
+
+    producer = threading.Thread(target=produce, name="group-a-producer", daemon=True)
+    producer.start()
+    try:
+        if aclient is None:
+            b_result = gb.run_jobs(source(), progress_cb=b_progress_cb)
+        else:
+            b_result = asyncio.run(
+                gb.run_jobs_async(aclient, source(), progress_cb=b_progress_cb)
+            )
+    except _GroupAFailed:
+        # o B já gravou o checkpoint e manteve os .part: o --resume continua
+        raise a_error[0] from None
+    except GroupBIncomplete as e:
+        # o B só termina depois do A: o resultado dele vai junto para o resumo
+        e.a_result = a_result
+        raise
+    finally:
+        # se o B falhar, libera o produtor preso na fila cheia
+        cancelled.set()
+        producer.join()
+
+    if a_error:
+        raise a_error[0]
+    return a_result, b_result
@@ -0,0 +1,309 @@
+from __future__ import annotations
+import multiprocessing
+import os
+import shutil
+import time
+import zlib
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from . import jsonlib
+from .dedupe import Deduper
+from .endpoints import child_rows, next_child_job
+from .writers import NO_COMPRESSION, NO_SHARDING, Compression, RowSink, Sharding, file_name, open_sink, read_rows
+
+SHARDS_DIR = "_shards"
+# lote enviado a um worker: até BATCH_PAGES páginas ou BATCH_BYTES de corpo,
+# ou o que houver depois de LINGER segundos (as próximas páginas esperam por ele)
+BATCH_PAGES = 64
+BATCH_BYTES = 4 * 2**20
+LINGER = 0.02
+# shard gravado pelo processo principal (cópia do delta)
+MAIN_SHARD = "main"
+
+# (job, corpo bruto ou None, bytes do payload)
+_Page = Tuple[dict, Optional[bytes], int]
+
+
+def shard_of(parent: Any, workers: int) -> int:
+    """Worker de um pai: todas as páginas de um pai vão para o mesmo processo,
+    então o dedupe por shard é o mesmo do dedupe por arquivo (a linha leva
+    `_parent_id`)."""
+    return zlib.crc32(str(parent).encode("utf-8")) % workers
+
+
+def shard_codec(fmt: str, compression: Compression) -> Compression:
+    # jsonl: o merge só concatena os shards, já comprimidos como a saída final;
+    # outros formatos são regravados no merge a partir de shards jsonl puros
+    return compression if fmt == "jsonl" else NO_COMPRESSION
+
+
+def shard_sink(
+    output_dir: Path,
+    endpoint: str,
+    shard: str,
+    compression: Compression,
+    resume_at: Optional[Tuple[int, int]] = None,
+) -> RowSink:
+    return open_sink(
+        output_dir / SHARDS_DIR,
+        f"{endpoint}.{shard}",
+        "jsonl",
+        resume_at=resume_at,
+        compression=compression,
+    )
+
+
+# ---- lado do worker (estado por processo) ----
+
+@dataclass
+class _WorkerConfig:
+    output_dir: Path
+    shard: str
+    limit: int
+    dedupe: str
+    compression: Compression
+    json_backend: str
+    # endpoint -> (bytes, registros) dos shards a retomar
+    resume: Dict[str, Tuple[int, int]] = field(default_factory=dict)
+
+
+class _Worker:
+    def __init__(self, cfg: _WorkerConfig):
+        jsonlib.use(cfg.json_backend)
+        self.cfg = cfg
+        self.sinks: Dict[str, RowSink] = {}
+        self.dedupers: Dict[str, Deduper] = {}
+        for endpoint, pos in cfg.resume.items():
+            sink = self._open(endpoint, pos)
+            for r in sink.existing_rows():
+                self.dedupers[endpoint].add(r)
+
+    def _open(self, endpoint: str, resume_at: Optional[Tuple[int, int]] = None) -> RowSink:
+        sink = self.sinks[endpoint] = shard_sink(
+            self.cfg.output_dir, endpoint, self.cfg.shard, self.cfg.compression, resume_at
+        )
+        self.dedupers[endpoint] = Deduper(self.cfg.dedupe)
+        return sink
+
+    def process(self, batch: List[Tuple[dict, Optional[bytes]]]):
+        pages = []
+        for job, raw in batch:
+            body = None
+            if raw is not None:
+                try:
+                    body = jsonlib.loads(raw)
+                except ValueError:
+                    body = None
+            rows = child_rows(job, body)
+            nxt = next_child_job(job, body, self.cfg.limit)
+            endpoint = job["endpoint"]
+            sink = self.sinks.get(endpoint) or self._open(endpoint)
+            written = sink.write(self.dedupers[endpoint].filter(rows))
+            pages.append((nxt, len(rows), written))
+        # fim do lote = ponto de checkpoint dos shards deste worker
+        sizes = {ep: (s.flush(), s.count) for ep, s in self.sinks.items()}
+        return pages, sizes
+
+    def close(self, hold: Set[str]) -> Dict[str, Tuple[Path, int]]:
+        out = {}
+        for ep, s in self.sinks.items():
+            if ep in hold:
+                s.abort(keep=True)
+            else:
+                out[ep] = (s.close(), s.count)
+        return out
+
+    def abort(self, keep: bool) -> None:
+        for s in self.sinks.values():
+            s.abort(keep=keep)
+
+
+_worker: Optional[_Worker] = None
+
+
+def _init(cfg: _WorkerConfig) -> None:
+    global _worker
+    _worker = _Worker(cfg)
+
+
+def _process(batch):
+    return _worker.process(batch)
+
+
+def _close(hold: Set[str]):
+    return _worker.close(hold)
+
+
+def _abort(keep: bool) -> None:
+    _worker.abort(keep)
+
+
+# ---- lado do processo principal ----
+
+class _ShardRef:
+    """Posição de um shard de worker, como o CheckpointStore espera de um sink."""
+
+    def __init__(self, size: int = 0, count: int = 0):
+        self.size = size
+        self.count = count
+
+    def flush(self) -> int:
+        return self.size
+
+
+class PostStage:
+    """Pós-processamento em `workers` processos: os threads de I/O só entregam
+    os bytes das respostas; cada processo decodifica, pagina, deduplica e
+    grava os seus shards (`_shards/<endpoint>.<n>.jsonl`). Um executor de um
+    processo por shard mantém o estado (sinks, dedupe) entre os lotes."""
+
+    def __init__(
+        self,
+        workers: int,
+        output_dir: Path,
+        limit: int,
+        dedupe: str,
+        fmt: str,
+        compression: Compression = NO_COMPRESSION,
+        resume: Optional[Dict[str, Dict[str, int]]] = None,
+    ):
+        self.workers = max(1, workers)
+        self.compression = shard_codec(fmt, compression)
+        # checkpoint: "<endpoint>@<n>" -> _ShardRef
+        self.refs: Dict[str, _ShardRef] = {}
+        per_shard: List[Dict[str, Tuple[int, int]]] = [{} for _ in range(self.workers)]
+        for key, pos in (resume or {}).items():
+            endpoint, _, n = key.rpartition("@")
+            per_shard[int(n)][endpoint] = (int(pos["bytes"]), int(pos["count"]))
+            self.refs[key] = _ShardRef(int(pos["bytes"]), int(pos["count"]))
+        ctx = multiprocessing.get_context("spawn")
+        self._pools = [
+            ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=ctx,
+                initializer=_init,
+                initargs=(
+                    _WorkerConfig(
+                        output_dir, str(n), limit, dedupe, self.compression, jsonlib.name, per_shard[n]
+                    ),
+                ),
+            )
+            for n in range(self.workers)
+        ]
+        self._queued: List[List[_Page]] = [[] for _ in range(self.workers)]
+        self._queued_bytes = [0] * self.workers
+        self._since = [0.0] * self.workers
+        # lotes enviados: só job e bytes de cada página (o corpo já foi para o worker)
+        self._inflight: Dict[Future, Tuple[int, List[Tuple[dict, int]]]] = {}
+        self.pending_pages = 0
+
+    @property
+    def futures(self) -> Set[Future]:
+        return set(self._inflight)
+
+    @property
+    def busy(self) -> bool:
+        return bool(self._inflight) or any(self._queued)
+
+    def add(self, job: dict, raw: Optional[bytes], nbytes: int) -> None:
+        n = shard_of(job.get("parent"), self.workers)
+        if not self._queued[n]:
+            self._since[n] = time.monotonic()
+        self._queued[n].append((job, raw, nbytes))
+        self._queued_bytes[n] += nbytes
+        self.pending_pages += 1
+        if len(self._queued[n]) >= BATCH_PAGES or self._queued_bytes[n] >= BATCH_BYTES:
+            self._submit(n)
+
+    def _submit(self, n: int) -> None:
+        pages, self._queued[n], self._queued_bytes[n] = self._queued[n], [], 0
+        if pages:
+            fut = self._pools[n].submit(_process, [(job, raw) for job, raw, _ in pages])
+            self._inflight[fut] = (n, [(job, nbytes) for job, _, nbytes in pages])
+
+    def flush(self, stale_only: bool = False) -> None:
+        """Envia os lotes parciais (com `stale_only`, só os que passaram do LINGER)."""
+        now = time.monotonic()
+        for n in range(self.workers):
+            if self._queued[n] and (not stale_only or now - self._since[n] >= LINGER):
+                self._submit(n)
+
+    def collect(self, fut: Future) -> Iterator[Tuple[dict, Optional[dict], int, int, int]]:
+        """(job, próximo job, linhas recebidas, linhas gravadas, bytes) de cada
+        página de um lote concluído; exceções do worker sobem daqui."""
+        n, pages = self._inflight.pop(fut)
+        self.pending_pages -= len(pages)
+        results, sizes = fut.result()
+        for ep, (size, count) in sizes.items():
+            self.refs[f"{ep}@{n}"] = _ShardRef(size, count)
+        for (job, nbytes), (nxt, fetched, written) in zip(pages, results):
+            yield job, nxt, fetched, written, nbytes
+
+    def close(self, hold: Set[str] = frozenset()) -> Dict[str, List[Tuple[Path, int]]]:
+        """Fecha os shards de todos os workers: endpoint -> [(shard, registros)].
+        Os endpoints de `hold` não são fechados: o `.part` fica para o --resume."""
+        out: Dict[str, List[Tuple[Path, int]]] = {}
+        for pool in self._pools:
+            for ep, shard in pool.submit(_close, set(hold)).result().items():
+                out.setdefault(ep, []).append(shard)
+        self._shutdown()
+        return out
+
+    def abort(self, keep: bool = False) -> None:
+        for pool in self._pools:
+            try:
+                pool.submit(_abort, keep).result(timeout=30)
+            except Exception:
+                pass  # worker já caiu: o .part fica como estava
+        self._shutdown()
+
+    def _shutdown(self) -> None:
+        for pool in self._pools:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def merge_shards(
+    output_dir: Path,
+    endpoint: str,
+    fmt: str,
+    compression: Compression,
+    shards: List[Tuple[Path, int]],
+    sharding: Sharding = NO_SHARDING,
+) -> Tuple[Path, int]:
+    """Junta os shards de um endpoint na saída final (rename atômico) e os
+    apaga. jsonl: concatenação dos bytes (membros gzip/frames zstd seguidos
+    são um arquivo válido); demais formatos e saída em partes: regravados
+    pelo sink do formato."""
+    count = sum(n for _, n in shards)
+    if fmt == "jsonl" and not sharding.enabled:
+        path = output_dir / file_name(endpoint, fmt, compression.codec)
+        tmp = path.with_name(path.name + ".part")
+        with tmp.open("wb") as out:
+            for shard, _ in shards:
+                with shard.open("rb") as f:
+                    shutil.copyfileobj(f, out, 1 << 20)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp, path)
+    else:
+        sink = open_sink(output_dir, endpoint, fmt, compression=compression, sharding=sharding)
+        try:
+            for shard, _ in shards:
+                batch: List[Any] = []
+                for row in read_rows(shard):
+                    batch.append(row)
+                    if len(batch) >= 1000:
+                        sink.write(batch)
+                        batch = []
+                sink.write(batch)
+            path = sink.close()
+        except BaseException:
+            sink.abort()
+            raise
+        count = sink.count
+    for shard, _ in shards:
+        shard.unlink(missing_ok=True)
+    return path, count
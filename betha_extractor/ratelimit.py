@@ -0,0 +1,259 @@
+from __future__ import annotations
+import fnmatch
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, List, Mapping, Optional, Tuple
+
+# on_change(bucket: str, rate: float, reason: str) -> None; rate 0 = sem limite
+RateCB = Callable[[str, float, str], None]
+
+THROTTLE_STATUS = (429, 503)
+# 429 sem cabeçalho de cota: a taxa cai para esta fração da vazão medida
+DECREASE_FACTOR = 0.9
+MIN_RATE = 0.1
+# taxa aprendida volta a subir (+25%) a cada RECOVER_EVERY s sem 429
+RECOVER_EVERY = 10.0
+RECOVER_FACTOR = 1.25
+# janela da vazão medida (s)
+MEASURE_WINDOW = 5.0
+# X-RateLimit-Reset acima disso é um epoch, não segundos
+_EPOCH = 10**9
+
+
+def parse_rules(spec: str) -> List[Tuple[str, float]]:
+    """`imoveis/*/proprietarios=20,bairros=5` -> [(padrão, req/s)], na ordem."""
+    rules: List[Tuple[str, float]] = []
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        pattern, sep, rate = item.rpartition("=")
+        try:
+            value = float(rate)
+        except ValueError:
+            value = -1.0
+        if not sep or not pattern.strip() or value < 0:
+            raise ValueError(f"Regra de taxa inválida: {item!r} (use padrão=req/s, ex.: imoveis/*/proprietarios=20)")
+        rules.append((pattern.strip().strip("/"), value))
+    return rules
+
+
+def retry_after(value: Optional[str]) -> Optional[float]:
+    """Segundos de um Retry-After (número ou data HTTP)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+def _number(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _quota(h: Mapping[str, Any]) -> Optional[Tuple[float, float]]:
+    """(restantes, segundos até renovar) de `X-RateLimit-*` ou `RateLimit-*`
+    (cabeçalhos com nomes em minúsculas)."""
+    for prefix in ("x-ratelimit-", "ratelimit-"):
+        remaining = _number(h.get(prefix + "remaining"))
+        reset = _number(h.get(prefix + "reset"))
+        if remaining is None or reset is None:
+            continue
+        if reset > _EPOCH:
+            reset -= time.time()
+        return max(0.0, remaining), max(0.0, reset)
+    return None
+
+
+class TokenBucket:
+    """Balde de tokens: `rate` req/s com rajada de até `burst`. rate 0 = sem
+    limite (até aprender um com a API). `ceiling` é a taxa configurada: o que
+    se aprende dos cabeçalhos nunca passa dela. Com burst 1 os requests saem
+    espaçados; rajadas maiores estouram cotas de janela fixa (burst + 1 s da
+    taxa cabem na mesma janela)."""
+
+    def __init__(self, name: str, rate: float = 0.0, burst: float = 1.0, listeners: Optional[List[RateCB]] = None):
+        self.name = name
+        self.ceiling = rate
+        self.rate = rate
+        self.reason = "configurada" if rate else "sem limite"
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        # refill até aqui; no futuro enquanto pausado (Retry-After/cota zerada)
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+        self._window_start = self._stamp
+        self._window_n = 0
+        self._measured: Optional[float] = None
+        self._last_learn = 0.0
+        self.throttled = 0
+        self.listeners: List[RateCB] = [] if listeners is None else listeners
+
+    def _refill(self, now: float) -> None:
+        if now > self._stamp:
+            if self.rate > 0:
+                self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+
+    def _count(self, now: float) -> None:
+        self._window_n += 1
+        elapsed = now - self._window_start
+        if elapsed >= MEASURE_WINDOW:
+            self._measured = self._window_n / elapsed
+            self._window_start, self._window_n = now, 0
+
+    def reserve(self) -> float:
+        """Tira um token e devolve quanto esperar por ele (s)."""
+        with self._lock:
+            now = time.monotonic()
+            self._count(now)
+            self._relax(now)
+            self._refill(now)
+            wait = max(0.0, self._stamp - now)
+            if self.rate > 0:
+                self._tokens -= 1.0
+                if self._tokens < 0:
+                    wait += -self._tokens / self.rate
+            return wait
+
+    # ---- aprendizado ----
+    def _set(self, rate: float, reason: str) -> None:
+        if self.ceiling:
+            rate = min(rate, self.ceiling)
+        if rate == self.rate:
+            return
+        self._refill(time.monotonic())
+        self.rate = rate
+        self.reason = reason
+        for cb in list(self.listeners):
+            try:
+                cb(self.name, rate, reason)
+            except Exception:
+                pass
+
+    def _pause(self, now: float, seconds: float) -> None:
+        self._refill(now)
+        self._stamp = max(self._stamp, now + seconds)
+        self._tokens = min(self._tokens, 0.0)
+
+    def _relax(self, now: float) -> None:
+        # taxa aprendida num 429: volta a subir aos poucos até o teto
+        if not self.rate or self.rate == self.ceiling or now - self._last_learn < RECOVER_EVERY:
+            return
+        self._last_learn = now
+        if not self.ceiling and self._measured is not None and self._measured * 4 < self.rate:
+            self._set(0.0, "sem 429: sem limite")
+        else:
+            self._set(self.rate * RECOVER_FACTOR, f"sem 429 há {RECOVER_EVERY:g}s")
+
+    def on_throttle(self, status: int, wait: Optional[float], adjust: bool = True) -> None:
+        """429/503: pausa pelo Retry-After e, sem cota nos cabeçalhos, reduz a
+        taxa para um pouco abaixo da vazão que a API estava aceitando. Sem
+        `adjust`, só conta."""
+        with self._lock:
+            now = time.monotonic()
+            self.throttled += 1
+            if not adjust:
+                return
+            if wait:
+                self._pause(now, wait)
+            if now - self._last_learn < 1.0:
+                return  # mesma rajada
+            self._last_learn = now
+            measured = self._measured
+            if measured is None and now - self._window_start >= 1.0:
+                measured = self._window_n / (now - self._window_start)
+            base = measured or self.rate
+            if base:
+                self._set(max(MIN_RATE, base * DECREASE_FACTOR), f"HTTP {status}")
+
+    def on_quota(self, remaining: float, reset: float) -> None:
+        """Cota informada pela API: espalha o que resta até a renovação; cota
+        zerada pausa até lá."""
+        with self._lock:
+            now = time.monotonic()
+            self._last_learn = now
+            if remaining < 1:
+                self._pause(now, reset)
+            elif reset > 0:
+                self._set(max(MIN_RATE, remaining / reset), "cota da API")
+
+
+class RateLimiter:
+    """Limite de requests por segundo antes de cada request (e não depois do
+    429): um balde global e um por padrão de endpoint (`fnmatch`, o primeiro
+    que casar). Cada request tira um token do global e do seu padrão.
+    Com `learn`, Retry-After e `X-RateLimit-*` ajustam o balde do request."""
+
+    def __init__(
+        self,
+        rate: float = 0.0,
+        rules: Optional[List[Tuple[str, float]]] = None,
+        burst: float = 1.0,
+        learn: bool = True,
+    ):
+        # compartilhada pelos baldes: avisa mudanças de taxa de qualquer um
+        self.listeners: List[RateCB] = []
+        self.global_bucket = TokenBucket("*", rate, burst, self.listeners)
+        # (padrão, padrão com */ na frente, balde): casa com o caminho
+        # relativo à base e com o caminho completo da URL
+        self.rules = [(p, f"*/{p}", TokenBucket(p, r, burst, self.listeners)) for p, r in (rules or [])]
+        self.learn = learn
+        self._lock = threading.Lock()
+        self.waited = 0.0
+        self.delayed = 0
+
+    @property
+    def buckets(self) -> List[TokenBucket]:
+        return [self.global_bucket] + [b for _, _, b in self.rules]
+
+    def _match(self, path: str) -> Optional[TokenBucket]:
+        path = path.split("?", 1)[0].strip("/")
+        for pattern, anywhere, bucket in self.rules:
+            if fnmatch.fnmatchcase(path, pattern) or fnmatch.fnmatchcase(path, anywhere):
+                return bucket
+        return None
+
+    def reserve(self, path: str) -> float:
+        """Tira os tokens do request e devolve a espera (s); quem chama dorme
+        (time.sleep ou asyncio.sleep)."""
+        wait = self.global_bucket.reserve()
+        bucket = self._match(path)
+        if bucket is not None:
+            wait = max(wait, bucket.reserve())
+        if wait > 0:
+            with self._lock:
+                self.waited += wait
+                self.delayed += 1
+        return wait
+
+    def acquire(self, path: str) -> None:
+        wait = self.reserve(path)
+        if wait > 0:
+            time.sleep(wait)
+
+    def observe(self, path: str, status: Optional[int], headers: Optional[Mapping[str, Any]]) -> None:
+        bucket = self._match(path) or self.global_bucket
+        h = {str(k).lower(): v for k, v in (headers or {}).items()}
+        if status in THROTTLE_STATUS:
+            # contado mesmo sem `learn` (resumo da execução); só o ajuste depende dele
+            bucket.on_throttle(status, retry_after(h.get("retry-after")), adjust=self.learn)
+        if not self.learn:
+            return
+        q = _quota(h)
+        if q is not None:
+            bucket.on_quota(*q)
+
+    @property
+    def throttled(self) -> int:
+        return sum(b.throttled for b in self.buckets)
+
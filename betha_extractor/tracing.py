@@ -0,0 +1,414 @@
+from __future__ import annotations
+import atexit
+import math
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from requests.adapters import HTTPAdapter
+
+from . import jsonlib
+from .endpoints import GROUP_A, GROUP_B
+
+TRACE_FILE = "_trace.jsonl"
+METRICS_FILE = "_metrics.prom"
+QUANTILES = (0.5, 0.95, 0.99)
+# fases de um request; dns só na engine async (no urllib3 fica dentro de connect)
+PHASES = ("queue", "dns", "connect", "tls", "ttfb", "body")
+# histograma em escala log: baldes de 2^(1/16) (~4,4%) a partir de 0,1 ms
+_MIN = 1e-4
+_LOG_STEP = math.log(2) / 16
+
+
+class Histogram:
+    """Latências em baldes logarítmicos: memória limitada (só os baldes
+    usados) e quantis com erro relativo de ~2%."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self._buckets: Dict[int, int] = {}
+
+    def add(self, seconds: float) -> None:
+        idx = int(math.log(seconds / _MIN) / _LOG_STEP) if seconds > _MIN else 0
+        self._buckets[idx] = self._buckets.get(idx, 0) + 1
+        self.count += 1
+        self.sum += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def merge(self, other: "Histogram") -> "Histogram":
+        # mesmos baldes em todos: a soma é exata
+        for idx, n in other._buckets.items():
+            self._buckets[idx] = self._buckets.get(idx, 0) + n
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for idx in sorted(self._buckets):
+            seen += self._buckets[idx]
+            if seen >= rank:
+                # meio geométrico do balde, dentro do mínimo/máximo observados
+                mid = _MIN * math.exp((idx + 0.5) * _LOG_STEP)
+                return min(self.max, max(self.min, mid))
+        return self.max
+
+
+@dataclass
+class Span:
+    """Um request lógico (com os retries) visto pelo cliente HTTP."""
+
+    endpoint: str
+    path: str
+    start: float                       # time.time()
+    t0: float = 0.0                    # monotonic do início
+    status: Optional[int] = None
+    bytes: int = 0
+    attempts: int = 0
+    error: str = ""
+    total: float = 0.0
+    # segundos por fase (PHASES); ausente = não medida neste request
+    phases: Dict[str, float] = field(default_factory=dict)
+    # marcas internas (monotonic) da tentativa corrente
+    sent: float = 0.0
+    headers_at: float = 0.0
+
+    @property
+    def retries(self) -> int:
+        return max(0, self.attempts - 1)
+
+
+@dataclass
+class EndpointTrace:
+    requests: int = 0
+    errors: int = 0
+    retries: int = 0
+    bytes: int = 0
+    first: float = 0.0
+    last: float = 0.0
+    status: Dict[str, int] = field(default_factory=dict)
+    total: Histogram = field(default_factory=Histogram)
+    phases: Dict[str, Histogram] = field(default_factory=dict)
+
+    @property
+    def elapsed(self) -> float:
+        return max(self.last - self.first, 1e-9)
+
+    @property
+    def rate(self) -> float:
+        return self.requests / self.elapsed if self.requests > 1 else 0.0
+
+
+def _templates() -> List[Tuple[re.Pattern, str]]:
+    out = [(re.compile(re.escape(path) + "$"), name) for name, path in GROUP_A.items()]
+    for c in GROUP_B:
+        pattern = re.escape(c.path).replace(re.escape("{id}"), "[^/]+")
+        out.append((re.compile(pattern + "$"), c.name))
+    return out
+
+
+_TEMPLATES = _templates()
+_ID_SEGMENT = re.compile(r"(?<=/)[^/]*\d[^/]*(?=/|$)")
+
+
+def endpoint_of(path: str) -> str:
+    """Nome do endpoint de um caminho (`imoveis/123/testadas` ->
+    `imoveis_testadas`); fora do catálogo, o caminho com ids trocados por {id}."""
+    path = path.strip("/")
+    for pattern, name in _TEMPLATES:
+        if pattern.match(path):
+            return name
+    return _ID_SEGMENT.sub("{id}", path) or "/"
+
+
+# span do request em andamento nesta thread (conexões do urllib3)
+_local = threading.local()
+
+
+def _current() -> Optional[Span]:
+    return getattr(_local, "span", None)
+
+
+def mark_start(span: Span, now: float) -> None:
+    # fim da fila (token, vaga em voo, pool): 1ª conexão ou 1º envio
+    if "queue" not in span.phases:
+        span.phases["queue"] = now - span.t0
+
+
+class _TracedConnectionMixin:
+    """Marca conexão, TLS, envio e cabeçalhos no span da thread. HTTPS
+    conecta antes do `request`; HTTP, dentro dele: o TTFB conta a partir do
+    que vier por último."""
+
+    def _new_conn(self):
+        t = time.monotonic()
+        span = _current()
+        if span is not None:
+            mark_start(span, t)
+        try:
+            return super()._new_conn()
+        finally:
+            if span is not None:
+                span.phases["connect"] = time.monotonic() - t
+
+    def connect(self) -> None:
+        t = time.monotonic()
+        super().connect()
+        span = _current()
+        if span is not None:
+            now = time.monotonic()
+            if isinstance(self, HTTPSConnection):
+                span.phases["tls"] = max(0.0, now - t - span.phases.get("connect", 0.0))
+            span.sent = max(span.sent, now)
+
+    def request(self, *args: Any, **kw: Any) -> None:
+        span = _current()
+        if span is not None:
+            now = time.monotonic()
+            mark_start(span, now)
+            span.attempts += 1
+            span.sent = now
+        super().request(*args, **kw)
+
+    def getresponse(self, *args: Any, **kw: Any):
+        resp = super().getresponse(*args, **kw)
+        span = _current()
+        if span is not None:
+            span.headers_at = time.monotonic()
+            span.phases["ttfb"] = span.headers_at - span.sent
+        return resp
+
+
+class _TracedHTTPConnection(_TracedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TracedHTTPSConnection(_TracedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TracedHTTPPool(HTTPConnectionPool):
+    ConnectionCls = _TracedHTTPConnection
+
+
+class _TracedHTTPSPool(HTTPSConnectionPool):
+    ConnectionCls = _TracedHTTPSConnection
+
+
+class TracedAdapter(HTTPAdapter):
+    """HTTPAdapter cujas conexões medem as fases do request da thread."""
+
+    def init_poolmanager(self, *args: Any, **kw: Any) -> None:
+        super().init_poolmanager(*args, **kw)
+        self.poolmanager.pool_classes_by_scheme = {"http": _TracedHTTPPool, "https": _TracedHTTPSPool}
+
+
+class Tracer:
+    """Tempo de cada request por endpoint: histogramas (p50/p95/p99) do total
+    e de cada fase, status, retries e bytes. Com `path`, cada request vira
+    uma linha em `_trace.jsonl`. `prometheus()` exporta tudo no formato
+    texto do Prometheus (arquivo no fim ou `/metrics` com `serve`)."""
+
+    def __init__(self, base_url: str = "", path: Optional[Path] = None):
+        self.base_path = urlsplit(base_url).path.rstrip("/")
+        self.path = path
+        self._lock = threading.Lock()
+        self._stats: Dict[str, EndpointTrace] = {}
+        self._f = None
+        self._server: Optional[ThreadingHTTPServer] = None
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._f = path.open("ab", buffering=1 << 20)
+            atexit.register(self.close)
+
+    def _relative(self, url: str) -> str:
+        path = urlsplit(url).path
+        if self.base_path and path.startswith(self.base_path):
+            path = path[len(self.base_path):]
+        return path.strip("/")
+
+    # ---- threads (HttpClient) ----
+    def begin(self, url: str) -> Span:
+        span = self.span(url)
+        _local.span = span
+        return span
+
+    def end(
+        self,
+        span: Span,
+        status: Optional[int] = None,
+        nbytes: int = 0,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        if getattr(_local, "span", None) is span:
+            _local.span = None
+        if span.headers_at and status is not None:
+            # requests lê o corpo inteiro antes de devolver a resposta
+            span.phases["body"] = time.monotonic() - span.headers_at
+        self.finish(span, status, nbytes, error)
+
+    # ---- comum (async preenche as fases pelo TraceConfig do aiohttp) ----
+    def span(self, url: str) -> Span:
+        path = self._relative(url)
+        return Span(endpoint_of(path), path, time.time(), time.monotonic())
+
+    def finish(
+        self,
+        span: Span,
+        status: Optional[int] = None,
+        nbytes: int = 0,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        span.total = time.monotonic() - span.t0
+        span.status = status
+        span.bytes = nbytes
+        if error is not None:
+            span.error = type(error).__name__
+        now = time.monotonic()
+        with self._lock:
+            st = self._stats.get(span.endpoint)
+            if st is None:
+                st = self._stats[span.endpoint] = EndpointTrace(first=span.t0)
+            st.requests += 1
+            st.retries += span.retries
+            st.bytes += nbytes
+            st.last = now
+            key = str(status) if status is not None else "error"
+            st.status[key] = st.status.get(key, 0) + 1
+            if error is not None or (status is not None and status >= 400):
+                st.errors += 1
+            st.total.add(span.total)
+            for phase, seconds in span.phases.items():
+                h = st.phases.get(phase)
+                if h is None:
+                    h = st.phases[phase] = Histogram()
+                h.add(seconds)
+            if self._f is not None:
+                self._f.write(jsonlib.dumps(self._line(span)) + b"\n")
+
+    @staticmethod
+    def _line(span: Span) -> Dict[str, Any]:
+        line: Dict[str, Any] = {
+            "ts": round(span.start, 3),
+            "endpoint": span.endpoint,
+            "path": span.path,
+            "status": span.status,
+            "bytes": span.bytes,
+            "retries": span.retries,
+            "total_ms": round(span.total * 1000, 3),
+        }
+        for phase in PHASES:
+            if phase in span.phases:
+                line[f"{phase}_ms"] = round(span.phases[phase] * 1000, 3)
+        if span.error:
+            line["error"] = span.error
+        return line
+
+    def snapshot(self) -> Dict[str, EndpointTrace]:
+        with self._lock:
+            return {k: _copy(v) for k, v in self._stats.items()}
+
+    # ---- exportação ----
+    def prometheus(self) -> str:
+        snap = self.snapshot()
+        out: List[str] = []
+
+        def family(name: str, kind: str, help_: str) -> None:
+            out.append(f"# HELP {name} {help_}")
+            out.append(f"# TYPE {name} {kind}")
+
+        family("betha_requests_total", "counter", "Requests HTTP por endpoint e status.")
+        for ep, st in sorted(snap.items()):
+            for status, n in sorted(st.status.items()):
+                out.append(f'betha_requests_total{{endpoint="{ep}",status="{status}"}} {n}')
+        family("betha_request_retries_total", "counter", "Retries (429/5xx/erro de rede) por endpoint.")
+        for ep, st in sorted(snap.items()):
+            out.append(f'betha_request_retries_total{{endpoint="{ep}"}} {st.retries}')
+        family("betha_response_bytes_total", "counter", "Bytes de corpo recebidos por endpoint.")
+        for ep, st in sorted(snap.items()):
+            out.append(f'betha_response_bytes_total{{endpoint="{ep}"}} {st.bytes}')
+        family("betha_request_duration_seconds", "summary", "Duração dos requests, com retries.")
+        for ep, st in sorted(snap.items()):
+            _summary(out, "betha_request_duration_seconds", f'endpoint="{ep}"', st.total)
+        family("betha_request_phase_seconds", "summary", "Duração por fase (queue/dns/connect/tls/ttfb/body).")
+        for ep, st in sorted(snap.items()):
+            for phase in PHASES:
+                if phase in st.phases:
+                    _summary(out, "betha_request_phase_seconds", f'endpoint="{ep}",phase="{phase}"', st.phases[phase])
+        return "\n".join(out) + "\n"
+
+    def write_prometheus(self, path: Path) -> Path:
+        tmp = path.with_name(path.name + ".part")
+        tmp.write_text(self.prometheus(), encoding="utf-8")
+        tmp.replace(path)
+        return path
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """`GET /metrics` numa thread própria, enquanto a extração roda; só
+        na máquina local, a não ser que `host` diga outra interface."""
+        tracer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = tracer.prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        return self._server
+
+    def close(self) -> None:
+        with self._lock:
+            if self._f is not None and not self._f.closed:
+                self._f.close()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def _copy(st: EndpointTrace) -> EndpointTrace:
+    return EndpointTrace(
+        st.requests, st.errors, st.retries, st.bytes, st.first, st.last, dict(st.status),
+        Histogram().merge(st.total), {k: Histogram().merge(v) for k, v in st.phases.items()},
+    )
+
+
+def _summary(out: List[str], name: str, labels: str, h: Histogram) -> None:
+    for q in QUANTILES:
+        out.append(f'{name}{{{labels},quantile="{q:g}"}} {h.quantile(q):.6f}')
+    out.append(f"{name}_sum{{{labels}}} {h.sum:.6f}")
+    out.append(f"{name}_count{{{labels}}} {h.count}")
+
+
+def ms(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "-"
+    return f"{seconds * 1000:.0f}ms" if seconds < 10 else f"{seconds:.1f}s"
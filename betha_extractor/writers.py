@@ -1,12 +1,772 @@
 from __future__ import annotations
+import gzip
+import hashlib
+import io
 import json
+import os
+import re
+import threading
+import zlib
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Iterable, List
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import jsonlib
+
+try:  # dependência opcional: pip install "betha_extractor[parquet]"
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depende do ambiente
+    pa = pq = None
+
+try:  # dependência opcional: pip install "betha_extractor[zstd]"
+    import zstandard
+except ImportError:  # pragma: no cover - depende do ambiente
+    zstandard = None
+
+COUNTS_FILE = "_counts.json"
+# saída em partes: <endpoint>/part-00001.jsonl, ... + <endpoint>/_manifest.json
+MANIFEST_FILE = "_manifest.json"
+PART_PREFIX = "part-"
+_counts_lock = threading.Lock()
+
+# json: array indentado (igual ao json.dump(indent=2) de sempre)
+# jsonl: um registro por linha
+# json-compact: array sem espaços
+# parquet: colunar (pyarrow), campos aninhados achatados
+FORMATS = ("json", "jsonl", "json-compact", "parquet")
+_EXT = {"json": ".json", "jsonl": ".jsonl", "json-compact": ".json", "parquet": ".parquet"}
+
+# compressão dos formatos de texto (o parquet comprime por dentro)
+COMPRESSIONS = ("none", "gzip", "zstd")
+_CEXT = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+@dataclass(frozen=True)
+class Compression:
+    codec: str = "none"
+    level: Optional[int] = None   # gzip 1–9 (padrão 6), zstd 1–22 (padrão 3)
+    threads: int = 0              # zstd: threads de compressão (0 = a que grava)
+
+    def __post_init__(self):
+        if self.codec not in COMPRESSIONS:
+            raise ValueError(f"Compressão inválida: {self.codec} (use {', '.join(COMPRESSIONS)})")
+
+    def compressor(self) -> "_Member":
+        return _Member(self)
+
+NO_COMPRESSION = Compression()
+
+@dataclass(frozen=True)
+class Sharding:
+    rows: int = 0   # registros por parte (0 = sem limite)
+    mb: int = 0     # MB por parte (0 = sem limite)
+
+    def __post_init__(self):
+        if self.rows < 0 or self.mb < 0:
+            raise ValueError("Limites de parte devem ser >= 0")
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.rows or self.mb)
+
+NO_SHARDING = Sharding()
+
+class _Member:
+    """Um membro gzip / frame zstd. O RowSink fecha um a cada flush(), então
+    todo ponto de checkpoint é uma fronteira válida do arquivo."""
+
+    def __init__(self, c: Compression):
+        if c.codec == "gzip":
+            # wbits=31: cabeçalho e trailer gzip
+            self._obj = zlib.compressobj(6 if c.level is None else c.level, zlib.DEFLATED, 31)
+            self._end = lambda: self._obj.flush()
+        else:
+            cctx = zstandard.ZstdCompressor(level=3 if c.level is None else c.level, threads=c.threads)
+            self._obj = cctx.compressobj()
+            self._end = lambda: self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def finish(self) -> bytes:
+        return self._end()
+
+def safe_name(name: str) -> str:
+    return "".join(ch if ch.isalnum() or ch in "._-" else "_" for ch in name)
+
+def file_name(name: str, fmt: str = "json", codec: str = "none") -> str:
+    if fmt not in _EXT:
+        raise ValueError(f"Formato de saída inválido: {fmt} (use {', '.join(FORMATS)})")
+    if codec not in _CEXT:
+        raise ValueError(f"Compressão inválida: {codec} (use {', '.join(COMPRESSIONS)})")
+    suffix = "" if fmt == "parquet" else _CEXT[codec]
+    return f"{safe_name(name)}{_EXT[fmt]}{suffix}"
+
+def _codec_of(path: Path) -> str:
+    return {".gz": "gzip", ".zst": "zstd"}.get(path.suffix, "none")
+
+def _decompress(codec: str, raw: bytes) -> bytes:
+    if codec == "gzip":
+        return gzip.decompress(raw)  # lê todos os membros
+    if codec == "zstd":
+        with zstandard.ZstdDecompressor().stream_reader(io.BytesIO(raw), read_across_frames=True) as r:
+            return r.read()
+    return raw
+
+def _open_text(path: Path):
+    codec = _codec_of(path)
+    if codec == "gzip":
+        return gzip.open(path, "rt", encoding="utf-8")
+    if codec == "zstd":
+        require_format("jsonl", "zstd")
+        raw = zstandard.ZstdDecompressor().stream_reader(path.open("rb"), read_across_frames=True, closefd=True)
+        return io.TextIOWrapper(raw, encoding="utf-8")
+    return path.open("r", encoding="utf-8")
 
 def write_json(output_dir: Path, name: str, rows: List[dict]) -> Path:
-    safe = "".join(ch if ch.isalnum() or ch in "._-" else "_" for ch in name)
-    path = output_dir / f"{safe}.json"
+    path = output_dir / file_name(name)
     path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding="utf-8") as f:
-        json.dump(rows, f, ensure_ascii=False, indent=2)
+    with path.open("wb") as f:
+        f.write(jsonlib.dumps_indent(rows))
+    return path
+
+class RowSink:
+    """Grava as páginas em disco conforme chegam, em `<arquivo>.part`, e só
+    troca pelo arquivo final (rename atômico) no close(). Com `resume_at`
+    (bytes, registros) reabre um `.part` de uma execução interrompida,
+    descartando o que veio depois do último checkpoint. Com `compression`,
+    os bytes passam por um compressor em streaming."""
+
+    def __init__(
+        self,
+        path: Path,
+        fmt: str = "json",
+        resume_at: Optional[Tuple[int, int]] = None,
+        compression: Compression = NO_COMPRESSION,
+    ):
+        if fmt not in _EXT:
+            raise ValueError(f"Formato de saída inválido: {fmt} (use {', '.join(FORMATS)})")
+        self.path = path
+        self.fmt = fmt
+        self.compression = compression
+        # membro/frame aberto desde o último flush()
+        self._member: Optional[_Member] = None
+        self.tmp_path = path.with_name(path.name + ".part")
+        self.count = 0
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if resume_at is not None and self.tmp_path.exists():
+            size, self.count = resume_at
+            self._f = self.tmp_path.open("r+b")
+            self._f.truncate(size)
+            self._f.seek(size)
+        else:
+            self._f = self.tmp_path.open("wb")
+
+    def _encode(self, row: Any) -> bytes:
+        if self.fmt == "json":
+            item = jsonlib.dumps_indent(row).replace(b"\n", b"\n  ")
+            return (b"[\n  " if self.count == 0 else b",\n  ") + item
+        if self.fmt == "json-compact":
+            return (b"[" if self.count == 0 else b",") + jsonlib.dumps(row)
+        return jsonlib.dumps(row) + b"\n"
+
+    def write(self, rows: Iterable[Any]) -> int:
+        with self._lock:
+            chunks = []
+            for row in rows:
+                chunks.append(self._encode(row))
+                self.count += 1
+            if chunks:
+                self._emit(b"".join(chunks))
+            return len(chunks)
+
+    def _emit(self, data: bytes) -> None:
+        if self.compression.codec == "none":
+            self._f.write(data)
+            return
+        if self._member is None:
+            self._member = self.compression.compressor()
+        self._f.write(self._member.compress(data))
+
+    def _end_member(self) -> None:
+        if self._member is not None:
+            self._f.write(self._member.finish())
+            self._member = None
+
+    def tell(self) -> int:
+        """Bytes já gravados (sem o que está no buffer do compressor)."""
+        with self._lock:
+            return self._f.tell()
+
+    def flush(self) -> int:
+        """Esvazia o buffer e devolve o tamanho gravado (ponto de checkpoint)."""
+        with self._lock:
+            self._end_member()
+            self._f.flush()
+            return self._f.tell()
+
+    def existing_rows(self) -> Iterator[Any]:
+        """Registros já gravados no `.part` (usado ao retomar uma execução)."""
+        with self._lock:
+            self._end_member()
+            self._f.flush()
+            size = self._f.tell()
+        if not size:
+            return iter(())
+        with self.tmp_path.open("rb") as f:
+            raw = _decompress(self.compression.codec, f.read(size))
+        if self.fmt == "jsonl":
+            return (jsonlib.loads(line) for line in raw.splitlines() if line.strip())
+        # array ainda aberto: fecha só para ler
+        return iter(jsonlib.loads(raw + b"]"))
+
+    def close(self) -> Path:
+        with self._lock:
+            if self.fmt == "json":
+                self._emit(b"\n]" if self.count else b"[]")
+            elif self.fmt == "json-compact":
+                self._emit(b"]" if self.count else b"[]")
+            self._end_member()
+            self._f.flush()
+            os.fsync(self._f.fileno())
+            self._f.close()
+            os.replace(self.tmp_path, self.path)
+        return self.path
+
+    def abort(self, keep: bool = False) -> None:
+        """Fecha sem publicar; `keep=True` preserva o `.part` para --resume."""
+        with self._lock:
+            if not self._f.closed:
+                self._f.close()
+            if not keep:
+                self.tmp_path.unlink(missing_ok=True)
+
+# Parquet: registros por row group; o schema sai do primeiro row group
+ROW_GROUP_ROWS = 50_000
+_COLUMNS_META = b"betha_extractor.columns"
+# campos fora do schema (ou com tipo diferente do inferido), em JSON
+EXTRA_COLUMN = "_extra"
+_ARROW_TYPES = {"bool": "bool_", "int": "int64", "float": "float64", "string": "string", "json": "string"}
+_JSON = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+def require_format(fmt: str, codec: str = "none") -> None:
+    """Falha logo no início se o formato depende de um extra não instalado."""
+    if fmt == "parquet" and pa is None:
+        raise RuntimeError(
+            "Formato parquet requer pyarrow. Instale com: pip install 'betha_extractor[parquet]'"
+        )
+    if codec == "zstd" and zstandard is None:
+        raise RuntimeError(
+            "Compressão zstd requer zstandard. Instale com: pip install 'betha_extractor[zstd]'"
+        )
+
+def _flatten(
+    rec: Any,
+    prefix: Tuple[str, ...] = (),
+    out: Optional[Dict[Tuple[str, ...], Any]] = None,
+) -> Dict[Tuple[str, ...], Any]:
+    out = {} if out is None else out
+    if not isinstance(rec, dict):
+        out[("_value",)] = rec
+        return out
+    for k, v in rec.items():
+        path = prefix + (str(k),)
+        if isinstance(v, dict) and v:
+            _flatten(v, path, out)
+        else:
+            out[path] = v
+    return out
+
+def _kind(values: List[Any]) -> str:
+    seen = {type(v) for v in values if v is not None}
+    if not seen:
+        return "string"
+    if seen <= {bool}:
+        return "bool"
+    if seen <= {int}:
+        return "int"
+    if seen <= {int, float}:
+        return "float"
+    if seen <= {str}:
+        return "string"
+    # listas e colunas de tipo misto: JSON, para o tipo voltar na leitura
+    return "json"
+
+def _fits(kind: str, v: Any) -> bool:
+    if kind == "bool":
+        return isinstance(v, bool)
+    if kind == "int":
+        return isinstance(v, int) and not isinstance(v, bool) and -2**63 <= v < 2**63
+    if kind == "float":
+        return isinstance(v, (int, float)) and not isinstance(v, bool)
+    if kind == "string":
+        return isinstance(v, str)
+    return True
+
+class ParquetSink:
+    """Mesma interface do RowSink, em Parquet: as linhas são achatadas
+    (`endereco.numero` vira a coluna `endereco_numero`) e gravadas em row
+    groups de ROW_GROUP_ROWS conforme chegam. O schema é inferido do
+    primeiro row group; campos novos ou de outro tipo depois disso vão,
+    em JSON, para a coluna `_extra`. Um Parquet só é legível depois do
+    rodapé, então não há retomada: com `resume_at` o endpoint recomeça."""
+
+    def __init__(
+        self,
+        path: Path,
+        resume_at: Optional[Tuple[int, int]] = None,
+        compression: Compression = NO_COMPRESSION,
+    ):
+        require_format("parquet")
+        # codec das páginas do parquet: o escolhido, ou zstd
+        self.compression = compression
+        self.path = path
+        self.fmt = "parquet"
+        self.tmp_path = path.with_name(path.name + ".part")
+        self.count = 0  # resume_at ignorado: count 0 faz o extrator recomeçar
+        self._lock = threading.Lock()
+        self._buf: List[Dict[Tuple[str, ...], Any]] = []
+        # (coluna, caminho no registro, tipo)
+        self._columns: Optional[List[Tuple[str, Tuple[str, ...], str]]] = None
+        self._schema = None
+        self._writer = None
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = self.tmp_path.open("wb")
+
+    def _infer(self) -> None:
+        values: Dict[Tuple[str, ...], List[Any]] = {}
+        for flat in self._buf:
+            for p, v in flat.items():
+                values.setdefault(p, []).append(v)
+        columns: List[Tuple[str, Tuple[str, ...], str]] = []
+        names = {EXTRA_COLUMN}
+        for p, vs in values.items():
+            name = "_".join(p)
+            while name in names:  # {"a_b"} e {"a": {"b"}} no mesmo endpoint
+                name += "_"
+            names.add(name)
+            columns.append((name, p, _kind(vs)))
+        self._columns = columns
+        fields = [pa.field(n, getattr(pa, _ARROW_TYPES[k])()) for n, _, k in columns]
+        fields.append(pa.field(EXTRA_COLUMN, pa.string()))
+        meta = {_COLUMNS_META: _JSON.encode([[n, list(p), k] for n, p, k in columns]).encode("utf-8")}
+        self._schema = pa.schema(fields, metadata=meta)
+        c = self.compression
+        self._writer = pq.ParquetWriter(
+            self._f,
+            self._schema,
+            compression="gzip" if c.codec == "gzip" else "zstd",
+            compression_level=c.level,
+        )
+
+    def _write_group(self) -> None:
+        if self._columns is None:
+            self._infer()
+        if not self._buf:
+            return
+        cols: List[List[Any]] = [[] for _ in self._columns]
+        extra: List[Optional[str]] = []
+        for flat in self._buf:
+            rest: Dict[str, Any] = {}
+            for i, (_, p, kind) in enumerate(self._columns):
+                v = flat.pop(p, None)
+                if v is not None and not _fits(kind, v):
+                    rest[".".join(p)] = v
+                    v = None
+                elif v is not None and kind == "json":
+                    v = _JSON.encode(v)
+                elif v is not None and kind == "float":
+                    v = float(v)
+                cols[i].append(v)
+            for p, v in flat.items():
+                rest[".".join(p)] = v
+            extra.append(_JSON.encode(rest) if rest else None)
+        arrays = [pa.array(c, type=f.type) for c, f in zip(cols, self._schema)]
+        arrays.append(pa.array(extra, type=pa.string()))
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self._schema))
+        self._buf = []
+
+    def write(self, rows: Iterable[Any]) -> int:
+        with self._lock:
+            n = 0
+            for row in rows:
+                self._buf.append(_flatten(row))
+                n += 1
+            self.count += n
+            if len(self._buf) >= ROW_GROUP_ROWS:
+                self._write_group()
+            return n
+
+    def tell(self) -> int:
+        # só os row groups já gravados
+        with self._lock:
+            return self._f.tell()
+
+    def flush(self) -> int:
+        # sem ponto de retomada (ver docstring)
+        return 0
+
+    def existing_rows(self) -> Iterator[Any]:
+        return iter(())
+
+    def close(self) -> Path:
+        with self._lock:
+            self._write_group()
+            self._writer.close()
+            self._f.flush()
+            os.fsync(self._f.fileno())
+            self._f.close()
+            os.replace(self.tmp_path, self.path)
+        return self.path
+
+    def abort(self, keep: bool = False) -> None:
+        """Fecha sem publicar. O `.part` nunca é mantido: não há como retomá-lo."""
+        with self._lock:
+            if self._writer is not None:
+                try:
+                    self._writer.close()
+                except Exception:
+                    pass
+                self._writer = None
+            if not self._f.closed:
+                self._f.close()
+            self.tmp_path.unlink(missing_ok=True)
+
+def _unflatten(row: Dict[str, Any], columns: List[Tuple[str, List[str], str]]) -> Any:
+    rec: Dict[str, Any] = {}
+    for name, path, kind in columns:
+        v = row.get(name)
+        if kind == "json" and isinstance(v, str):
+            v = json.loads(v)
+        node = rec
+        for k in path[:-1]:
+            node = node.setdefault(k, {})
+        node[path[-1]] = v
+    extra = row.get(EXTRA_COLUMN)
+    if extra:
+        for dotted, v in json.loads(extra).items():
+            node = rec
+            *parents, last = dotted.split(".")
+            for k in parents:
+                node = node.setdefault(k, {})
+            node[last] = v
+    if list(rec) == ["_value"]:
+        return rec["_value"]
+    return rec
+
+def _read_parquet(path: Path) -> Iterator[Any]:
+    require_format("parquet")
+    pf = pq.ParquetFile(path)
+    meta = (pf.schema_arrow.metadata or {}).get(_COLUMNS_META)
+    if meta is None:
+        # Parquet de outra origem: colunas como vieram
+        for batch in pf.iter_batches(batch_size=10_000):
+            yield from batch.to_pylist()
+        return
+    columns = json.loads(meta)
+    for batch in pf.iter_batches(batch_size=10_000):
+        for row in batch.to_pylist():
+            yield _unflatten(row, columns)
+
+def _file_sink(path: Path, fmt: str, resume_at: Optional[Tuple[int, int]], compression: Compression):
+    if fmt == "parquet":
+        return ParquetSink(path, resume_at=resume_at, compression=compression)
+    return RowSink(path, fmt, resume_at=resume_at, compression=compression)
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def read_manifest(directory: Path) -> Optional[Dict[str, Any]]:
+    try:
+        data = json.loads((directory / MANIFEST_FILE).read_text(encoding="utf-8"))
+    except Exception:
+        return None
+    return data if isinstance(data, dict) and isinstance(data.get("parts"), list) else None
+
+class ShardedSink:
+    """Mesma interface do RowSink, gravando em partes: `<endpoint>/part-00001.jsonl`,
+    `part-00002.jsonl`... Cada parte é um arquivo completo do formato (e da
+    compressão), publicado com rename atômico assim que passa de `rows`
+    registros ou de ~`mb` MB, e registrado em `_manifest.json` com registros,
+    bytes e sha256. O manifesto só leva `"complete": true` no close(); antes
+    disso lista as partes já publicadas, que podem ser carregadas em paralelo.
+
+    Checkpoint: `flush()` devolve a posição na parte aberta e `count` é o
+    total do endpoint. Ao retomar, as partes publicadas depois do checkpoint
+    voltam a ser `.part` (truncadas) ou são apagadas."""
+
+    def __init__(
+        self,
+        directory: Path,
+        fmt: str = "json",
+        sharding: Sharding = NO_SHARDING,
+        resume_at: Optional[Tuple[int, int]] = None,
+        compression: Compression = NO_COMPRESSION,
+    ):
+        if fmt not in _EXT:
+            raise ValueError(f"Formato de saída inválido: {fmt} (use {', '.join(FORMATS)})")
+        self.path = directory
+        self.fmt = fmt
+        self.sharding = sharding
+        self.compression = compression
+        self._lock = threading.Lock()
+        # partes publicadas: {"file", "rows", "bytes", "sha256"}
+        self._parts: List[Dict[str, Any]] = []
+        self._rows = 0  # registros das partes publicadas
+        directory.mkdir(parents=True, exist_ok=True)
+        self._cur = self._resume(resume_at) if resume_at is not None else None
+        if self._cur is None:
+            self._clear()
+            self._cur = self._open(1)
+
+    def _part(self, n: int) -> Path:
+        return self.path / file_name(f"{PART_PREFIX}{n:05d}", self.fmt, self.compression.codec)
+
+    def _open(self, n: int, resume_at: Optional[Tuple[int, int]] = None):
+        return _file_sink(self._part(n), self.fmt, resume_at, self.compression)
+
+    def _stale(self, keep: int) -> Iterator[Path]:
+        """Partes (publicadas ou .part) depois da n-ésima."""
+        for p in self.path.glob(f"{PART_PREFIX}*"):
+            if int(p.name[len(PART_PREFIX):].split(".", 1)[0]) > keep:
+                yield p
+
+    def _clear(self) -> None:
+        for p in self._stale(0):
+            p.unlink(missing_ok=True)
+        (self.path / MANIFEST_FILE).unlink(missing_ok=True)
+        self._parts, self._rows = [], 0
+
+    def _resume(self, resume_at: Tuple[int, int]):
+        size, count = resume_at
+        manifest = read_manifest(self.path) or {"parts": []}
+        for entry in manifest["parts"]:
+            # partes inteiras antes do checkpoint ficam como estão
+            if self._rows + int(entry["rows"]) > count:
+                break
+            self._parts.append(entry)
+            self._rows += int(entry["rows"])
+        n = len(self._parts) + 1
+        part = self._part(n)
+        if part.exists():
+            # publicada depois do checkpoint: volta a ser .part
+            os.replace(part, part.with_name(part.name + ".part"))
+        for p in self._stale(n):
+            p.unlink(missing_ok=True)
+        cur = self._open(n, (size, count - self._rows))
+        if cur.count != count - self._rows:
+            # .part perdido (ou parquet): recomeça o endpoint
+            cur.abort()
+            return None
+        self._write_manifest(False)
+        return cur
+
+    @property
+    def count(self) -> int:
+        return self._rows + self._cur.count
+
+    def _full(self) -> bool:
+        # `mb` é aproximado: vale o que já está no disco, sem o buffer do
+        # compressor nem o row group do parquet ainda em memória
+        s = self.sharding
+        return bool(
+            (s.rows and self._cur.count >= s.rows)
+            or (s.mb and self._cur.tell() >= s.mb * 2**20)
+        )
+
+    def write(self, rows: Iterable[Any]) -> int:
+        with self._lock:
+            pending = rows if isinstance(rows, list) else list(rows)
+            n = 0
+            while pending:
+                room = self.sharding.rows - self._cur.count if self.sharding.rows else len(pending)
+                n += self._cur.write(pending[:room])
+                pending = pending[room:]
+                if self._full():
+                    self._roll()
+            return n
+
+    def _publish(self) -> None:
+        path = self._cur.close()
+        rows = self._cur.count
+        self._parts.append(
+            {"file": path.name, "rows": rows, "bytes": path.stat().st_size, "sha256": _sha256(path)}
+        )
+        self._rows += rows
+
+    def _roll(self) -> None:
+        self._publish()
+        self._write_manifest(False)
+        self._cur = self._open(len(self._parts) + 1)
+
+    def _write_manifest(self, complete: bool) -> None:
+        data = {
+            "endpoint": self.path.name,
+            "format": self.fmt,
+            "compression": self.compression.codec if self.fmt != "parquet" else "none",
+            "complete": complete,
+            "rows": self._rows,
+            "bytes": sum(int(p["bytes"]) for p in self._parts),
+            "parts": self._parts,
+        }
+        path = self.path / MANIFEST_FILE
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def flush(self) -> int:
+        with self._lock:
+            return self._cur.flush()
+
+    def existing_rows(self) -> Iterator[Any]:
+        with self._lock:
+            parts = [self.path / p["file"] for p in self._parts]
+            tail = self._cur.existing_rows()
+        for p in parts:
+            yield from read_rows(p)
+        yield from tail
+
+    def close(self) -> Path:
+        with self._lock:
+            if self._cur.count or not self._parts:
+                self._publish()
+            else:
+                # parte aberta logo depois de um rolamento, vazia
+                self._cur.abort()
+            self._write_manifest(True)
+        return self.path
+
+    def abort(self, keep: bool = False) -> None:
+        """Fecha sem concluir; `keep=True` preserva partes e `.part` para --resume."""
+        with self._lock:
+            self._cur.abort(keep=keep)
+            if not keep:
+                self._clear()
+
+def output_path(
+    output_dir: Path,
+    name: str,
+    fmt: str = "json",
+    compression: Compression = NO_COMPRESSION,
+    sharding: Sharding = NO_SHARDING,
+) -> Path:
+    """Arquivo de saída de um endpoint, ou o diretório das partes."""
+    if sharding.enabled:
+        return output_dir / safe_name(name)
+    return output_dir / file_name(name, fmt, compression.codec)
+
+def output_stamp(path: Path) -> Tuple[int, int]:
+    """(tamanho, mtime) de uma saída; nas partes, os do manifesto."""
+    st = (path / MANIFEST_FILE).stat() if path.is_dir() else path.stat()
+    return st.st_size, st.st_mtime_ns
+
+def open_sink(
+    output_dir: Path,
+    name: str,
+    fmt: str = "json",
+    resume_at: Optional[Tuple[int, int]] = None,
+    compression: Compression = NO_COMPRESSION,
+    sharding: Sharding = NO_SHARDING,
+):
+    """RowSink (texto), ParquetSink ou, com `sharding`, ShardedSink."""
+    path = output_path(output_dir, name, fmt, compression, sharding)
+    if sharding.enabled:
+        return ShardedSink(path, fmt, sharding, resume_at=resume_at, compression=compression)
+    return _file_sink(path, fmt, resume_at, compression)
+
+def find_output(output_dir: Path, name: str) -> Optional[Path]:
+    """Saída mais recente de um endpoint, em qualquer formato (arquivo ou partes)."""
+    found = [
+        p
+        for p in {output_dir / file_name(name, f, c) for f in FORMATS for c in COMPRESSIONS}
+        if p.exists()
+    ]
+    manifest = output_dir / safe_name(name) / MANIFEST_FILE
+    if manifest.exists():
+        found.append(manifest)
+    if not found:
+        return None
+    latest = max(found, key=lambda p: p.stat().st_mtime)
+    return latest.parent if latest.name == MANIFEST_FILE else latest
+
+# leitura em streaming de um array .json: pedaços deste tamanho
+_JSON_CHUNK = 1 << 20
+# entre os registros do array: espaços e vírgulas
+_JSON_GAP = re.compile(r"[\s,]*")
+
+def _json_array_rows(f) -> Iterator[Any]:
+    """Registros de um array .json (indentado ou compacto) decodificados aos
+    pedaços, sem ler o arquivo inteiro; outra coisa que não um array não
+    tem registros."""
+    decode = json.JSONDecoder().raw_decode
+    buf, pos, eof, started = "", 0, False, False
+    while True:
+        pos = _JSON_GAP.match(buf, pos).end()
+        if pos < len(buf):
+            if not started:
+                if buf[pos] != "[":
+                    return
+                started, pos = True, pos + 1
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                row, end = decode(buf, pos)
+            except ValueError:
+                if eof:
+                    raise
+                end = None
+            # um valor que termina no fim do buffer pode continuar no próximo pedaço
+            if end is not None and (end < len(buf) or eof):
+                yield row
+                pos = end
+                continue
+        elif eof:
+            if started:
+                raise ValueError("array JSON incompleto")
+            return
+        chunk = f.read(_JSON_CHUNK)
+        eof = not chunk
+        buf, pos = buf[pos:] + chunk, 0
+
+def read_rows(path: Path) -> Iterator[Any]:
+    """Lê de volta uma saída (.json, .jsonl ou .parquet, com ou sem .gz/.zst,
+    ou o diretório das partes, na ordem do manifesto), em streaming."""
+    if path.is_dir():
+        manifest = read_manifest(path) or {"parts": []}
+        for part in manifest["parts"]:
+            yield from read_rows(path / part["file"])
+        return
+    if path.suffix == ".parquet":
+        yield from _read_parquet(path)
+        return
+    inner = path.with_suffix("") if _codec_of(path) != "none" else path
+    with _open_text(path) as f:
+        if inner.suffix == ".jsonl":
+            for line in f:
+                if line.strip():
+                    yield jsonlib.loads(line)
+            return
+        yield from _json_array_rows(f)
+
+def read_counts(output_dir: Path) -> Dict[str, int]:
+    """Quantidade de registros por endpoint gravada na última execução."""
+    try:
+        data = json.loads((output_dir / COUNTS_FILE).read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+    return {k: v for k, v in data.items() if isinstance(v, int)} if isinstance(data, dict) else {}
+
+def write_counts(output_dir: Path, counts: Dict[str, int]) -> Path:
+    path = output_dir / COUNTS_FILE
+    with _counts_lock:
+        merged = read_counts(output_dir)
+        merged.update(counts)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(merged, ensure_ascii=False, indent=2, sort_keys=True), encoding="utf-8")
     return path
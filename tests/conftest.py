@@ -0,0 +1,83 @@
+"""Mock-server em processo e a CLI (`run`) rodando contra ele."""
+import os
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from betha_extractor.mock_server import MockConfig, make_server
+
+ROOT = Path(__file__).resolve().parents[1]
+# pequeno o bastante para cada execução levar ~1 s
+SIZES = {
+    "imoveis": 120,
+    "contribuintes": 80,
+    "logradouros": 60,
+    "bairros": 10,
+    "distritos": 3,
+    "loteamentos": 5,
+    "secoes": 6,
+    "condominios": 4,
+}
+
+
+@pytest.fixture
+def mock():
+    """Mock com dados sintéticos; `paths` guarda cada request recebido e
+    os paths com um trecho de `fail` recebem 503."""
+    config = MockConfig(sizes=dict(SIZES))
+    server = make_server(config=config)
+    paths = []
+    fail = []
+    base = server.RequestHandlerClass
+
+    def do_GET(handler):
+        paths.append(handler.path)
+        if any(f in handler.path for f in fail):
+            handler._extra = {}
+            handler._send(503, {"message": "Service Unavailable"})
+            return
+        base.do_GET(handler)
+
+    server.RequestHandlerClass = type("CountingHandler", (base,), {"do_GET": do_GET})
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    yield SimpleNamespace(config=config, url=f"http://{host}:{port}", paths=paths, fail=fail)
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def cli(mock, tmp_path):
+    """argv de `betha_extractor.main run` com saída jsonl em `out`; o
+    subprocesso roda em tmp_path, longe do .env do desenvolvedor."""
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(ROOT),
+        "BETHA_BASE_URL": mock.url,
+        "BETHA_USER_ACCESS": "u",
+        "BETHA_BEARER": "b",
+        "PAGE_LIMIT": "20",
+        "CONCURRENCY": "4",
+        # falha injetada chega direto ao extrator
+        "MAX_RETRIES": "0",
+    }
+
+    def argv(out, *args):
+        return [
+            sys.executable, "-m", "betha_extractor.main", "run",
+            "--output", str(out), "--format", "jsonl", *args,
+        ]
+
+    def run(out, *args):
+        return subprocess.run(argv(out, *args), cwd=tmp_path, env=env, capture_output=True, text=True, timeout=300)
+
+    def start(out, *args):
+        return subprocess.Popen(
+            argv(out, *args), cwd=tmp_path, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+
+    return SimpleNamespace(run=run, start=start)
@@ -0,0 +1,124 @@
+"""CheckpointStore: estado do Grupo A, jobs concluídos e cursores do B."""
+from betha_extractor.checkpoint import CheckpointStore
+from betha_extractor.writers import open_sink
+
+
+def test_load_requires_the_same_format(tmp_path):
+    ck = CheckpointStore(tmp_path, "jsonl")
+    assert not ck.load()
+    ck.save_a("imoveis", {"offset": 40, "bytes": 10, "done": False})
+
+    other = CheckpointStore(tmp_path, "json")
+    assert not other.load()
+    assert other.stored_fmt() == "jsonl"
+
+    again = CheckpointStore(tmp_path, "jsonl")
+    assert again.load()
+    assert again.a_entry("imoveis") == {"offset": 40, "bytes": 10, "done": False}
+    assert again.a_entry("bairros") is None
+
+
+def test_reset_a_forgets_endpoints(tmp_path):
+    ck = CheckpointStore(tmp_path, "jsonl")
+    ck.save_a("imoveis", {"done": True, "count": 3})
+    ck.reset_a()
+    again = CheckpointStore(tmp_path, "jsonl")
+    assert again.load()
+    assert again.a_entry("imoveis") is None
+
+
+def test_b_save_waits_for_every_jobs(tmp_path):
+    ck = CheckpointStore(tmp_path, "jsonl", every=3, interval=3600)
+    sink = open_sink(tmp_path, "imoveis_testadas", "jsonl")
+    ck.mark_b("imoveis_testadas", "1")
+    ck.maybe_save_b({"imoveis_testadas": sink})
+    assert CheckpointStore(tmp_path, "jsonl").load() is False  # nada salvo ainda
+    ck.mark_b("imoveis_testadas", "2")
+    ck.mark_b("imoveis_testadas", "3")
+    ck.maybe_save_b({"imoveis_testadas": sink})
+    again = CheckpointStore(tmp_path, "jsonl")
+    assert again.load()
+    assert again.b_done() == {"imoveis_testadas": {"1", "2", "3"}}
+    sink.abort()
+
+
+def test_b_done_is_cut_back_to_the_last_save(tmp_path):
+    ck = CheckpointStore(tmp_path, "jsonl", every=1000, interval=3600)
+    sink = open_sink(tmp_path, "imoveis_testadas", "jsonl")
+    ck.mark_b("imoveis_testadas", "1")
+    ck.mark_b("imoveis_testadas", "2")
+    sink.write([{"id": 1}])
+    ck.maybe_save_b({"imoveis_testadas": sink}, force=True)
+    saved = sink.flush()
+    # depois do checkpoint: job concluído e linha gravada que não valem
+    sink.write([{"id": 2}])
+    sink.abort(keep=True)
+    with ck.done_path.open("ab") as f:
+        f.write(b"imoveis_testadas\t3\n")
+
+    again = CheckpointStore(tmp_path, "jsonl")
+    assert again.load()
+    assert again.b_done() == {"imoveis_testadas": {"1", "2"}}
+    assert ck.done_path.read_bytes() == b"imoveis_testadas\t1\nimoveis_testadas\t2\n"
+    assert again.b_sinks() == {"imoveis_testadas": {"bytes": saved, "count": 1}}
+
+
+def test_finish_and_reset_b(tmp_path):
+    ck = CheckpointStore(tmp_path, "jsonl")
+    ck.mark_b("imoveis_testadas", "1")
+    ck.finish_b({"imoveis_testadas": 4})
+    assert not ck.done_path.exists()
+    again = CheckpointStore(tmp_path, "jsonl")
+    assert again.load()
+    assert again.b_finished() == {"imoveis_testadas": 4}
+    again.reset_b()
+    assert again.b_finished() is None
+    assert again.b_done() == {}
+
+
+def test_failed_jobs_are_kept_apart(tmp_path):
+    ck = CheckpointStore(tmp_path, "jsonl")
+    ck.mark_b("imoveis_testadas", "1")
+    ck.mark_b_failed("http://api/imoveis/2/testadas")
+    ck.maybe_save_b({}, force=True)
+    assert ck.failed_path.read_text(encoding="utf-8").split() == ["http://api/imoveis/2/testadas"]
+    again = CheckpointStore(tmp_path, "jsonl")
+    assert again.load()
+    assert again.b_done() == {"imoveis_testadas": {"1"}}
+    ck.clear_b_failed()
+    assert not ck.failed_path.exists()
+
+
+def test_published_endpoints_survive_later_saves(tmp_path):
+    ck = CheckpointStore(tmp_path, "jsonl")
+    ck.publish_b({"imoveis_testadas": 4})
+    ck.maybe_save_b({}, force=True)
+    again = CheckpointStore(tmp_path, "jsonl")
+    assert again.load()
+    assert again.b_published() == {"imoveis_testadas": 4}
+    # os saves da execução retomada mantêm os já publicados
+    again.mark_b("imoveis_testadas", "1")
+    again.maybe_save_b({}, force=True)
+    third = CheckpointStore(tmp_path, "jsonl")
+    assert third.load()
+    assert third.b_published() == {"imoveis_testadas": 4}
+    third.finish_b({"imoveis_testadas": 4})
+    assert third.b_published() == {}
+
+
+def test_cursors_are_saved_with_the_sinks(tmp_path):
+    ck = CheckpointStore(tmp_path, "jsonl")
+    sink = open_sink(tmp_path, "imoveis_testadas", "jsonl")
+    sink.write([{"id": 1, "_parent_id": "7"}])
+    nxt = {
+        "endpoint": "imoveis_testadas",
+        "url": "http://api/imoveis/7/testadas",
+        "parent": "7",
+        "offset": 20,
+        "page": 1,
+    }
+    ck.maybe_save_b({"imoveis_testadas": sink}, force=True, cursors={("imoveis_testadas", "7"): nxt})
+    sink.abort(keep=True)
+    again = CheckpointStore(tmp_path, "jsonl")
+    assert again.load()
+    assert again.b_cursors() == {("imoveis_testadas", "7"): nxt}
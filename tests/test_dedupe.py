@@ -0,0 +1,46 @@
+"""Deduper: modos record, key e off."""
+import pytest
+
+from betha_extractor.dedupe import Deduper, fingerprint
+
+
+def test_fingerprint_ignores_key_order():
+    a = {"id": 1, "endereco": {"rua": "A", "numero": "1"}}
+    b = {"endereco": {"numero": "1", "rua": "A"}, "id": 1}
+    assert fingerprint(a) == fingerprint(b)
+    assert fingerprint(a) != fingerprint({**a, "id": 2})
+
+
+def test_record_mode_drops_exact_repeats():
+    d = Deduper("record")
+    rows = [{"id": 1, "v": "a"}, {"v": "a", "id": 1}, {"id": 1, "v": "b"}]
+    assert d.filter(rows) == [rows[0], rows[2]]
+    assert d.dropped == 1
+
+
+def test_key_mode_uses_natural_key_and_parent():
+    d = Deduper("key")
+    rows = [
+        {"id": 1, "_parent_id": 10, "v": "a"},
+        {"id": 1, "_parent_id": 10, "v": "b"},  # mesma chave, outro conteúdo
+        {"id": 1, "_parent_id": 11, "v": "a"},  # outro pai
+    ]
+    assert d.filter(rows) == [rows[0], rows[2]]
+
+
+def test_key_mode_without_key_falls_back_to_record():
+    d = Deduper("key")
+    rows = [{"nome": "x"}, {"nome": "x"}, {"nome": "y"}]
+    assert d.filter(rows) == [rows[0], rows[2]]
+
+
+def test_off_keeps_everything():
+    d = Deduper("off")
+    rows = [{"id": 1}, {"id": 1}]
+    assert d.filter(rows) == rows
+    assert d.dropped == 0
+
+
+def test_invalid_mode():
+    with pytest.raises(ValueError):
+        Deduper("linha")
@@ -0,0 +1,120 @@
+"""AdaptiveLimiter: aumento aditivo, corte multiplicativo e vagas."""
+import asyncio
+import threading
+
+from betha_extractor.limiter import AdaptiveLimiter
+
+
+def fill_window(lim: AdaptiveLimiter, latency: float = 0.01) -> None:
+    """Uma janela de respostas ok (limit respostas) com o limite saturado."""
+    n = lim.limit
+    for _ in range(n):
+        lim.try_acquire()
+    for _ in range(n):
+        lim.release(latency, status=200)
+
+
+def test_initial_limit_is_clamped():
+    assert AdaptiveLimiter(initial=100, maximum=10).limit == 10
+    assert AdaptiveLimiter(initial=0, minimum=2).limit == 2
+
+
+def test_stable_latency_while_saturated_adds_one():
+    lim = AdaptiveLimiter(initial=4, maximum=8)
+    fill_window(lim)
+    assert lim.limit == 5
+    fill_window(lim)
+    assert lim.limit == 6
+
+
+def test_no_increase_without_saturation():
+    lim = AdaptiveLimiter(initial=4)
+    for _ in range(8):
+        assert lim.try_acquire()
+        lim.release(0.01, status=200)
+    assert lim.limit == 4
+
+
+def test_throttle_halves_once_per_cooldown():
+    lim = AdaptiveLimiter(initial=16, cooldown=60)
+    lim.release(0.01, status=429)
+    assert lim.limit == 8
+    # mesma rajada: não corta de novo
+    lim.release(0.01, status=503)
+    lim.release(0.01, error=True)
+    assert lim.limit == 8
+    assert lim.reason == "HTTP 429"
+
+
+def test_decrease_respects_minimum():
+    lim = AdaptiveLimiter(initial=2, minimum=2, cooldown=0)
+    lim.release(0.01, error=True)
+    assert lim.limit == 2
+
+
+def test_rising_latency_takes_one_back():
+    lim = AdaptiveLimiter(initial=4, latency_tolerance=2.0)
+    fill_window(lim, 0.01)
+    assert lim.limit == 5
+    fill_window(lim, 1.0)
+    assert lim.limit == 4
+    assert lim.reason.startswith("latência subindo")
+
+
+def test_acquire_blocks_at_limit():
+    lim = AdaptiveLimiter(initial=1, maximum=1)
+    lim.acquire()
+    assert not lim.try_acquire()
+    got = threading.Event()
+
+    def waiter():
+        lim.acquire()
+        got.set()
+
+    t = threading.Thread(target=waiter)
+    t.start()
+    assert not got.wait(0.1)
+    lim.release(0.01, status=200)
+    assert got.wait(1)
+    t.join()
+
+
+def test_listeners_see_changes():
+    lim = AdaptiveLimiter(initial=8, cooldown=0)
+    seen = []
+    lim.listeners.append(lambda limit, reason: seen.append((limit, reason)))
+    lim.release(0.01, status=500)
+    assert seen == [(4, "HTTP 500")]
+
+
+def test_acquire_async_waits_for_release():
+    lim = AdaptiveLimiter(initial=1, maximum=1)
+    lim.acquire()
+
+    async def scenario():
+        task = asyncio.ensure_future(lim.acquire_async())
+        await asyncio.sleep(0.05)
+        assert not task.done()
+        # release de outra thread (como o engine threads faria)
+        threading.Thread(target=lim.release, args=(0.01,), kwargs={"status": 200}).start()
+        await asyncio.wait_for(task, 1)
+
+    asyncio.run(scenario())
+    assert lim.in_flight == 1
+
+
+def test_cancelled_async_waiter_passes_the_slot_on():
+    lim = AdaptiveLimiter(initial=1, maximum=1)
+    lim.acquire()
+
+    async def scenario():
+        first = asyncio.ensure_future(lim.acquire_async())
+        second = asyncio.ensure_future(lim.acquire_async())
+        await asyncio.sleep(0.01)
+        lim.release(0.01, status=200)
+        # o primeiro é acordado, mas cancelado antes de pegar a vaga
+        first.cancel()
+        await asyncio.wait_for(second, 1)
+
+    asyncio.run(scenario())
+    assert lim.in_flight == 1
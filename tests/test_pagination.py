@@ -0,0 +1,50 @@
+"""pick_rows, total_of, key_of e as guardas de next_page_state."""
+from betha_extractor.pagination import key_of, next_page_state, pick_rows, total_of
+
+
+def page(ids, **extra):
+    return {"content": [{"id": i} for i in ids], **extra}
+
+
+def test_pick_rows_accepts_list_and_known_envelopes():
+    assert pick_rows([{"id": 1}]) == [{"id": 1}]
+    assert pick_rows({"items": [{"id": 2}]}) == [{"id": 2}]
+    assert pick_rows({"outra": [{"id": 3}]}) == []
+    assert pick_rows("texto") == []
+
+
+def test_total_of_ignores_zero_and_non_int():
+    assert total_of({"totalElements": 120}) == 120
+    assert total_of({"total": 0, "totalCount": 7}) == 7
+    assert total_of({"total": "12"}) is None
+    assert total_of([{"id": 1}]) is None
+
+
+def test_key_of_uses_first_known_id_field():
+    assert key_of({"codigo": 5, "nome": "x"}) == "5"
+    assert key_of({"id": None, "uuid": "a"}) == "a"
+    assert key_of({"nome": "x"}) == ""
+
+
+def test_has_next_advances_offset_page_and_seq():
+    has, offset, pg, seq, sig, n = next_page_state(page([1, 2], hasNext=True), 2, 0, 1, 1, None)
+    assert (has, offset, pg, seq, n) == (True, 2, 2, 2, 2)
+    assert sig == "1|2|2"
+
+
+def test_without_has_next_a_full_page_means_more():
+    assert next_page_state(page([1, 2]), 2, 0, 1, 1, None)[0] is True
+    assert next_page_state(page([1]), 2, 0, 1, 1, None)[0] is False
+    assert next_page_state(page([1, 2], has_more=False), 2, 0, 1, 1, None)[0] is False
+
+
+def test_empty_page_stops_even_with_has_next():
+    has, offset, pg, seq, sig, n = next_page_state(page([], hasNext=True), 2, 4, 3, 3, "1|2|2")
+    assert (has, offset, pg, seq, sig, n) == (False, 4, 3, 3, None, 0)
+
+
+def test_repeated_page_stops_anti_loop():
+    # API que ignora o offset e devolve sempre a mesma página
+    first = next_page_state(page([1, 2], hasNext=True), 2, 0, 1, 1, None)
+    has, offset, pg, seq, sig, n = next_page_state(page([1, 2], hasNext=True), 2, *first[1:4], first[4])
+    assert (has, offset, pg, seq, sig, n) == (False, 2, 2, 2, None, 2)
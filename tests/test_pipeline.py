@@ -0,0 +1,44 @@
+"""Grupo B consumindo uma fonte que ainda não tem job pronto (pipeline)."""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from betha_extractor.async_client import AsyncHttpClient
+from betha_extractor.endpoints import jobs_for_rows
+from betha_extractor.extractors.group_b import IDLE, GroupBExtractor
+from betha_extractor.http_client import HttpClient
+from betha_extractor.writers import read_rows
+
+
+def staged_source(url, collected: threading.Event):
+    """Jobs do imóvel 1; o do imóvel 2 só depois que o B gravar o 1º job,
+    como no pipeline quando o A demora. Bloquear aqui travaria o B."""
+    yield from jobs_for_rows(url, "imoveis", [{"id": 1}])
+    deadline = time.monotonic() + 10
+    while not collected.is_set():
+        assert time.monotonic() < deadline, "o B parou de colher enquanto a fonte estava vazia"
+        yield IDLE
+    yield from jobs_for_rows(url, "imoveis", [{"id": 2}])
+
+
+@pytest.mark.parametrize("engine", ["threads", "async"])
+def test_group_b_keeps_collecting_while_source_is_idle(mock, tmp_path, engine):
+    gb = GroupBExtractor(
+        HttpClient(mock.url, "u", "b", max_retries=0), tmp_path, limit=20, fmt="jsonl", progress_hz=0
+    )
+    collected = threading.Event()
+
+    def progress(done_jobs, *_):
+        if done_jobs:
+            collected.set()
+
+    jobs = staged_source(mock.url, collected)
+    if engine == "threads":
+        out = gb.run_jobs(jobs, progress_cb=progress)
+    else:
+        aclient = AsyncHttpClient(mock.url, "u", "b", max_retries=0)
+        out = asyncio.run(gb.run_jobs_async(aclient, jobs, progress_cb=progress))
+    parents = {str(row["_parent_id"]) for r in out.values() for row in read_rows(r.path)}
+    assert parents == {"1", "2"}
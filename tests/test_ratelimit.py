@@ -0,0 +1,80 @@
+"""Token bucket, regras por padrão e aprendizado pelos cabeçalhos."""
+import time
+from email.utils import formatdate
+
+import pytest
+
+from betha_extractor.ratelimit import RateLimiter, TokenBucket, parse_rules, retry_after
+
+
+def test_parse_rules_keeps_order():
+    assert parse_rules("/imoveis/*/proprietarios=20, bairros=5") == [
+        ("imoveis/*/proprietarios", 20.0),
+        ("bairros", 5.0),
+    ]
+    assert parse_rules("") == []
+
+
+@pytest.mark.parametrize("spec", ["bairros", "=5", "bairros=x", "bairros=-1"])
+def test_parse_rules_rejects(spec):
+    with pytest.raises(ValueError):
+        parse_rules(spec)
+
+
+def test_retry_after_seconds_and_date():
+    assert retry_after("2") == 2.0
+    assert retry_after(None) is None
+    assert retry_after("amanhã") is None
+    assert 8 <= retry_after(formatdate(time.time() + 10, usegmt=True)) <= 10
+
+
+def test_bucket_spaces_requests():
+    bucket = TokenBucket("*", rate=10.0, burst=1.0)
+    waits = [bucket.reserve() for _ in range(4)]
+    assert waits[0] == 0.0
+    # um token a cada 0,1 s
+    for n, w in enumerate(waits[1:], 1):
+        assert w == pytest.approx(0.1 * n, abs=0.01)
+
+
+def test_unlimited_bucket_never_waits():
+    bucket = TokenBucket("*")
+    assert all(bucket.reserve() == 0.0 for _ in range(100))
+
+
+def test_rule_matches_relative_and_full_path():
+    lim = RateLimiter(rules=parse_rules("imoveis/*/proprietarios=20"))
+    bucket = lim.rules[0][2]
+    assert lim._match("imoveis/7/proprietarios?limit=50") is bucket
+    assert lim._match("/api/v1/imoveis/7/proprietarios") is bucket
+    assert lim._match("imoveis") is None
+
+
+def test_throttle_pauses_and_is_counted():
+    lim = RateLimiter()
+    lim.observe("bairros", 429, {"Retry-After": "1"})
+    assert lim.throttled == 1
+    assert lim.reserve("bairros") > 0.9
+
+
+def test_throttle_is_counted_without_learning():
+    lim = RateLimiter(rate=50.0, learn=False)
+    lim.observe("bairros", 429, {"Retry-After": "5"})
+    lim.observe("bairros", 200, {"X-RateLimit-Remaining": "1", "X-RateLimit-Reset": "10"})
+    assert lim.throttled == 1
+    # sem aprendizado: nem pausa nem taxa nova
+    assert lim.global_bucket.rate == 50.0
+    assert lim.reserve("bairros") == 0.0
+
+
+def test_quota_headers_set_rate_under_ceiling():
+    changes = []
+    lim = RateLimiter(rate=50.0)
+    lim.listeners.append(lambda name, rate, reason: changes.append((name, rate, reason)))
+    lim.observe("bairros", 200, {"X-RateLimit-Remaining": "20", "X-RateLimit-Reset": "2"})
+    assert lim.global_bucket.rate == 10.0
+    assert changes == [("*", 10.0, "cota da API")]
+    # a cota aprendida nunca passa da taxa configurada
+    lim.global_bucket._last_learn = 0.0
+    lim.observe("bairros", 200, {"RateLimit-Remaining": "1000", "RateLimit-Reset": "1"})
+    assert lim.global_bucket.rate == 50.0
@@ -0,0 +1,178 @@
+"""Retomada de ponta a ponta: a CLI contra o mock-server em processo."""
+import signal
+import time
+from typing import Dict, List
+from urllib.parse import urlparse
+
+import pytest
+
+from betha_extractor.checkpoint import CheckpointStore
+from betha_extractor.endpoints import GROUP_B
+from betha_extractor.ids import parent_inputs
+
+
+def rows(out) -> Dict[str, List[str]]:
+    """Linhas de cada saída; o B grava na ordem em que os jobs terminam."""
+    return {p.name: sorted(p.read_text(encoding="utf-8").splitlines()) for p in out.glob("*.jsonl")}
+
+
+def requested(paths, endpoint: str) -> bool:
+    return any(urlparse(p).path.rstrip("/").endswith("/" + endpoint) for p in paths)
+
+
+@pytest.fixture
+def reference(cli, tmp_path):
+    out = tmp_path / "ref"
+    assert cli.run(out, "--all").returncode == 0
+    return rows(out)
+
+
+def test_resume_after_group_a_failure(mock, cli, reference, tmp_path):
+    out = tmp_path / "run"
+    # endpoint fora do mock: 404 no meio do Grupo A
+    size = mock.config.sizes.pop("logradouros")
+    assert cli.run(out, "--all").returncode != 0
+    assert not (out / "logradouros.jsonl").exists()
+    ck = CheckpointStore(out, "jsonl")
+    assert ck.load()
+    finished = [ep for ep in reference if (ck.a_entry(ep[: -len(".jsonl")]) or {}).get("done")]
+
+    mock.config.sizes["logradouros"] = size
+    mock.paths.clear()
+    assert cli.run(out, "--all", "--resume").returncode == 0
+    assert rows(out) == reference
+    # endpoints concluídos antes da falha não são buscados de novo
+    for name in finished:
+        assert not requested(mock.paths, name[: -len(".jsonl")])
+
+
+def test_resume_after_group_a_failure_in_pipeline(mock, cli, reference, tmp_path):
+    out = tmp_path / "run"
+    # 404 no meio do A, com o B já consumindo os pais
+    size = mock.config.sizes.pop("logradouros")
+    assert cli.run(out, "--all", "--pipeline").returncode != 0
+    assert not (out / "imoveis_proprietarios.jsonl").exists()
+    ck = CheckpointStore(out, "jsonl")
+    assert ck.load()
+    assert ck.b_finished() is None
+
+    mock.config.sizes["logradouros"] = size
+    assert cli.run(out, "--all", "--pipeline", "--resume").returncode == 0
+    assert rows(out) == reference
+
+
+def test_resume_after_interrupting_group_b(mock, cli, reference, tmp_path):
+    out = tmp_path / "run"
+    assert cli.run(out, "--group", "A").returncode == 0
+    mock.config.latency = 0.01
+    proc = cli.start(out, "--group", "B")
+    deadline = time.monotonic() + 60
+    while sum("/" in urlparse(p).path.strip("/") for p in mock.paths) < 100:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    proc.send_signal(signal.SIGINT)
+    assert proc.wait(60) != 0
+    assert not (out / "imoveis_proprietarios.jsonl").exists()
+
+    mock.config.latency = 0.0
+    assert cli.run(out, "--group", "B", "--resume").returncode == 0
+    assert rows(out) == reference
+
+
+def test_resume_after_group_b_fetch_failure(mock, cli, reference, tmp_path):
+    out = tmp_path / "run"
+    assert cli.run(out, "--group", "A").returncode == 0
+    mock.config.error_rate = 0.2
+    assert cli.run(out, "--group", "B").returncode == 1
+    failed = (out / "_checkpoint_b_failed.txt").read_text(encoding="utf-8").split()
+    assert failed
+    # falhou: não conta como feito
+    paths = {c.name: c.path for c in GROUP_B}
+    done = CheckpointStore(out, "jsonl")
+    assert done.load()
+    urls = {f"{mock.url}/{paths[ep].format(id=p)}" for ep, ids in done.b_done().items() for p in ids}
+    assert urls and not urls & set(failed)
+
+    mock.config.error_rate = 0.0
+    assert cli.run(out, "--group", "B", "--resume").returncode == 0
+    assert not (out / "_checkpoint_b_failed.txt").exists()
+    assert rows(out) == reference
+
+
+@pytest.mark.parametrize("extra", [[], ["--engine", "async"], ["--post-workers", "2"]])
+def test_group_b_failure_publishes_the_other_endpoints(mock, cli, reference, tmp_path, extra):
+    out = tmp_path / "run"
+    assert cli.run(out, "--group", "A").returncode == 0
+    mock.fail.append("/imoveis/7/testadas")
+    assert cli.run(out, "--group", "B", *extra).returncode == 1
+    got = rows(out)
+    # só o endpoint com o job que falhou fica retido (no .part)
+    assert "imoveis_testadas.jsonl" not in got
+    assert {k: v for k, v in reference.items() if k in got} == got
+    assert {"imoveis_proprietarios.jsonl", "contribuintes_enderecos.jsonl"} <= set(got)
+
+    mock.fail.clear()
+    mock.paths.clear()
+    assert cli.run(out, "--group", "B", "--resume", *extra).returncode == 0
+    # só o job que falhou é refeito
+    children = [p for p in mock.paths if "/imoveis/" in p or "/contribuintes/" in p]
+    assert children and all("/imoveis/7/testadas" in p for p in children)
+    assert rows(out) == reference
+
+
+@pytest.mark.parametrize("extra", [[], ["--post-workers", "2"]])
+def test_resume_continues_a_job_from_its_next_page(mock, cli, reference, tmp_path, extra):
+    out = tmp_path / "run"
+    assert cli.run(out, "--group", "A").returncode == 0
+    # 5 campos adicionais em páginas de 2: a 2ª página falha
+    job = "/imoveis/5/campos-adicionais?limit=2&"
+    mock.fail.append(job + "offset=2&")
+    args = ["--group", "B", "--limit", "2", "--dedupe", "off", *extra]
+    assert cli.run(out, *args).returncode == 1
+
+    mock.fail.clear()
+    mock.paths.clear()
+    assert cli.run(out, *args, "--resume").returncode == 0
+    # a 1ª página já estava no .part: sem dedupe, repeti-la duplicaria as linhas
+    assert not any(job + "offset=0&" in p for p in mock.paths)
+    assert any(job + "offset=2&" in p for p in mock.paths)
+    assert rows(out) == reference
+
+
+def test_delta_fetches_only_new_parents(mock, cli, tmp_path):
+    out = tmp_path / "run"
+    assert cli.run(out, "--all", "--delta").returncode == 0
+    first = mock.config.sizes["imoveis"]
+
+    mock.config.sizes["imoveis"] += 4
+    mock.paths.clear()
+    assert cli.run(out, "--all", "--delta").returncode == 0
+    # o B só vai aos filhos dos imóveis novos
+    parents = {urlparse(p).path.strip("/").split("/")[-2] for p in mock.paths if urlparse(p).path.strip("/").count("/")}
+    assert parents and all(int(p) > first for p in parents)
+
+    fresh = tmp_path / "fresh"
+    assert cli.run(fresh, "--all").returncode == 0
+    assert rows(out) == rows(fresh)
+
+
+def test_delta_group_b_uses_the_hashed_index(mock, cli, tmp_path):
+    out = tmp_path / "run"
+    assert cli.run(out, "--all", "--delta").returncode == 0
+    first = mock.config.sizes["contribuintes"]
+
+    mock.config.sizes["contribuintes"] += 3
+    assert cli.run(out, "--group", "A", "--delta").returncode == 0
+    # id, key_of e hash: o B decide sem reler contribuintes.jsonl
+    line = (out / "_ids" / "contribuintes.ids").read_text(encoding="utf-8").splitlines()[0]
+    assert line.count("\t") == 2
+    _rows, ids, _counts = parent_inputs(out, {}, hashes=True)
+    assert set(ids) == {"imoveis", "contribuintes"}
+    mock.paths.clear()
+    assert cli.run(out, "--group", "B", "--delta").returncode == 0
+    parents = {urlparse(p).path.strip("/").split("/")[-2] for p in mock.paths if urlparse(p).path.strip("/").count("/")}
+    assert parents and all(int(p) > first for p in parents)
+
+    fresh = tmp_path / "fresh"
+    assert cli.run(fresh, "--all").returncode == 0
+    assert rows(out) == rows(fresh)
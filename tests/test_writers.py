@@ -0,0 +1,81 @@
+"""RowSink: gravação em streaming e publicação atômica."""
+import json
+
+import pytest
+
+from betha_extractor import writers
+from betha_extractor.writers import open_sink, read_rows
+
+ROWS = [{"id": 1, "nome": "Ação"}, {"id": 2, "endereco": {"numero": [1, 2]}}]
+
+
+@pytest.mark.parametrize("fmt", ["json", "jsonl", "json-compact"])
+def test_rows_round_trip(tmp_path, fmt):
+    sink = open_sink(tmp_path, "imoveis", fmt)
+    assert sink.write(ROWS[:1]) == 1
+    assert sink.write(ROWS[1:]) == 1
+    path = sink.close()
+    assert not sink.tmp_path.exists()
+    assert list(read_rows(path)) == ROWS
+
+
+@pytest.mark.parametrize("fmt", ["json", "json-compact"])
+def test_json_is_read_back_in_chunks(tmp_path, monkeypatch, fmt):
+    # pedaços menores que um registro: cada um atravessa vários
+    monkeypatch.setattr(writers, "_JSON_CHUNK", 5)
+    rows = ROWS * 3 + [{"texto": "a, ]\n}"}]
+    sink = open_sink(tmp_path, "imoveis", fmt, compression=writers.Compression("gzip"))
+    sink.write(rows)
+    assert list(read_rows(sink.close())) == rows
+
+
+@pytest.mark.parametrize("fmt", ["json", "json-compact"])
+def test_empty_output_is_an_empty_array(tmp_path, fmt):
+    path = open_sink(tmp_path, "vazio", fmt).close()
+    assert json.loads(path.read_text(encoding="utf-8")) == []
+
+
+def test_json_matches_indented_dump(tmp_path):
+    sink = open_sink(tmp_path, "imoveis", "json")
+    sink.write(ROWS)
+    path = sink.close()
+    assert path.read_text(encoding="utf-8") == json.dumps(ROWS, ensure_ascii=False, indent=2)
+
+
+def test_abort_publishes_nothing(tmp_path):
+    sink = open_sink(tmp_path, "imoveis", "jsonl")
+    sink.write(ROWS)
+    sink.abort()
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize("fmt", ["json", "jsonl", "json-compact"])
+def test_resume_truncates_back_to_checkpoint(tmp_path, fmt):
+    sink = open_sink(tmp_path, "imoveis", fmt)
+    sink.write(ROWS)
+    checkpoint = (sink.flush(), sink.count)
+    # gravado depois do checkpoint: a execução cai antes do próximo
+    sink.write([{"id": 99}])
+    sink.flush()
+    sink.abort(keep=True)
+    assert sink.tmp_path.exists()
+
+    resumed = open_sink(tmp_path, "imoveis", fmt, resume_at=checkpoint)
+    assert resumed.count == 2
+    resumed.write([{"id": 3}])
+    assert list(read_rows(resumed.close())) == ROWS + [{"id": 3}]
+
+
+def test_resume_without_part_starts_over(tmp_path):
+    sink = open_sink(tmp_path, "imoveis", "jsonl", resume_at=(123, 5))
+    assert sink.count == 0
+    sink.write(ROWS[:1])
+    assert list(read_rows(sink.close())) == ROWS[:1]
+
+
+@pytest.mark.parametrize("fmt", ["json", "jsonl"])
+def test_existing_rows_reads_the_open_part(tmp_path, fmt):
+    sink = open_sink(tmp_path, "imoveis", fmt)
+    sink.write(ROWS)
+    assert list(sink.existing_rows()) == ROWS
+    sink.abort()